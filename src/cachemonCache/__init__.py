@@ -1,8 +1,24 @@
 
 from .cache.fifo import FIFO
 from .cache.lru import LRU
+from .cache.fast import FastFIFO, FastLRU
 from .cache.s3fifo import S3FIFO
 from .cache.sieve import Sieve
+from .cache.arc import ARC
+from .cache.twoq import TwoQ
+from .cache.lirs import LIRS
+from .cache.tinylfu import WTinyLFU
+from .cache.gdsf import GDSF
+from .cache.sharedMemory import SharedMemoryCache
+from .cache.partition import PartitionedCache
+from .cache.metrics import MetricsRegistry
+from .cache.traceRecorder import TraceRecorder
+from .cache.shadow import ShadowSimulator
+from .cache.simulate import Simulator
+from .cache.analysis import TraceAnalyzer, HyperLogLog
+from .cache.governor import MemoryGovernor
+from .cache.hotkeys import HotKeyTracker
+from .cache.warmup import HotKeyPersister, Preloader, save_hot_keys, load_hot_keys, warm_up
 
 
 __version__ = "0.0.2"
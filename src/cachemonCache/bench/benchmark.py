@@ -22,7 +22,7 @@ def run_trace(cache, reader):
 
     end_time = time.time()
     print(
-        "trace {} {:16}, miss ratio {:.4f}, throughput {:.4f} req/s".format(
+        "trace {} {:16}, miss ratio {:.4f}, throughput {:10.0f} req/s".format(
             os.path.basename(reader.trace_path),
             cache.name,
             n_miss / n_req,
@@ -39,19 +39,27 @@ if __name__ == "__main__":
         12000,
     )
 
-    reader2, cache_size2 = (
-        traceReaderCSV("{}/../../data/twitter_cluster52.csv".format(BASEPATH)),
-        10000,
-    )
+    # the twitter trace is not shipped with the repo
+    twitter_trace_path = "{}/../../data/twitter_cluster52.csv".format(BASEPATH)
+    if os.path.exists(twitter_trace_path):
+        reader2, cache_size2 = traceReaderCSV(twitter_trace_path), 10000
 
     reader = reader1
     cache_size = cache_size1
 
     for cache_type in [
         FIFO,
+        FastFIFO,
         LRU,
+        FastLRU,
         Clock,
         S3FIFO,
+        Sieve,
+        ARC,
+        TwoQ,
+        LIRS,
+        WTinyLFU,
+        GDSF,
     ]:
         run_trace(cache_type(cache_size), reader)
         reader.reset()
@@ -0,0 +1,98 @@
+"""
+    hit ratio and cpu cost of value compression at a fixed memory budget
+
+    values are JSON-like blobs of the object size in the trace, the same
+    memory budget is given to a plain byte-bounded cache and to compressed
+    caches, the compressed ones hold more objects but pay for decompression
+    on every hit
+"""
+
+import os
+import sys
+import time
+import json
+import random
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from cache.compression import CompressedCache
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def make_value_pool(pool_size: int = 1 << 21) -> bytes:
+    """JSON records with random numbers, compress about 4x with zlib"""
+    rng = random.Random(42)
+    records = []
+    n_bytes = 0
+    while n_bytes < pool_size:
+        record = json.dumps(
+            {
+                "id": rng.randint(0, 1 << 40),
+                "name": "user_{}".format(rng.randint(0, 100000)),
+                "score": round(rng.random() * 1000, 3),
+                "tags": ["tag{}".format(rng.randint(0, 50)) for _ in range(3)],
+                "active": rng.random() > 0.5,
+            }
+        )
+        records.append(record)
+        n_bytes += len(record) + 1
+    return ("\n".join(records)).encode()
+
+
+def run_trace(cache, reader, pool):
+    pool_len = len(pool)
+    n_req, n_miss = 0, 0
+    hit_time, n_hit = 0.0, 0
+
+    start_time = time.time()
+    for r in reader:
+        _timestamp, obj_id, size = r
+        n_req += 1
+        t = time.perf_counter()
+        value = cache.get(obj_id)
+        if value is None:
+            n_miss += 1
+            offset = (obj_id * 7919) % (pool_len - size)
+            cache.put(obj_id, pool[offset : offset + size])
+        else:
+            hit_time += time.perf_counter() - t
+            n_hit += 1
+    end_time = time.time()
+
+    print(
+        "trace {} {:24}, miss ratio {:.4f}, throughput {:8.0f} req/s, {:6.1f} us/hit, objects {:6d}".format(
+            os.path.basename(reader.trace_path),
+            "{}-{}{}".format(
+                cache.name,
+                cache.codec if cache.threshold < sys.maxsize else "none",
+                "-side" if cache.side_cache is not None else "",
+            ),
+            n_miss / n_req,
+            n_req / (end_time - start_time),
+            hit_time / max(n_hit, 1) * 1e6,
+            len(cache),
+        )
+    )
+
+
+if __name__ == "__main__":
+    reader = traceReaderLibcachesim(
+        "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH),
+        n_max_req=int(sys.argv[1]) if len(sys.argv) > 1 else -1,
+    )
+    pool = make_value_pool()
+    max_bytes = 64 * 1024 * 1024
+
+    # the object limit is large enough that the byte budget decides
+    # lzma compresses more but costs ~10x the cpu of zlib per miss
+    for cache in [
+        CompressedCache(LRU(1 << 20), threshold=sys.maxsize, max_bytes=max_bytes),
+        CompressedCache(LRU(1 << 20), threshold=1024, codec="zlib", max_bytes=max_bytes),
+        CompressedCache(
+            LRU(1 << 20), threshold=1024, codec="zlib", max_bytes=max_bytes, side_cache_size=100
+        ),
+    ]:
+        run_trace(cache, reader, pool)
+        reader.reset()
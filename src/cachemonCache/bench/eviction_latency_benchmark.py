@@ -0,0 +1,86 @@
+"""
+    tail latency of a request with bounded eviction work (max_evict_scan)
+
+    replays the cloudphysics trace and a synthetic trace in which every object
+    of a full cache is requested a few times (a hot phase) before a scan of new
+    objects, the first put of the scan has to clear every visited bit (Clock)
+    or demote every object (S3FIFO), prints the miss ratio and the latency
+    percentiles of a request (get, and put on a miss), the garbage collector
+    is disabled during a replay, so its pauses do not hide the eviction work,
+    each percentile is the min over 3 replays, so a scheduling hiccup of the
+    machine does not show up as the max
+
+    usage: python3 eviction_latency_benchmark.py
+"""
+
+import gc
+import os
+import sys
+import time
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def replay(cache, requests):
+    clock = time.perf_counter_ns
+    latencies = [0] * len(requests)
+    n_miss = 0
+    gc.collect()
+    gc.disable()
+    for i, obj_id in enumerate(requests):
+        start = clock()
+        if cache.get(obj_id) is None:
+            cache.put(obj_id, obj_id)
+            n_miss += 1
+        latencies[i] = clock() - start
+    gc.enable()
+    latencies.sort()
+    return n_miss / len(requests), latencies
+
+
+def hot_phase_then_scan(cache_size, n_round=3):
+    requests = list(range(cache_size))
+    for _ in range(n_round):
+        requests.extend(range(cache_size))
+    requests.extend(range(cache_size, cache_size * 2))
+    return requests
+
+
+if __name__ == "__main__":
+    trace_path = "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH)
+    workloads = [
+        ("cloudphysics", [obj_id for _, obj_id, _ in traceReaderLibcachesim(trace_path)], 12000),
+        ("hot-then-scan", hot_phase_then_scan(100000), 100000),
+    ]
+
+    for name, requests, cache_size in workloads:
+        for cache_type in [Clock, S3FIFO]:
+            for max_evict_scan in [None, 256, 32]:
+                percentiles = []
+                for _ in range(3):
+                    miss_ratio, latencies = replay(
+                        cache_type(cache_size, max_evict_scan=max_evict_scan), requests
+                    )
+                    n = len(latencies)
+                    percentiles.append(
+                        [latencies[int(n * q)] / 1000 for q in (0.5, 0.99, 0.999)]
+                        + [latencies[-1] / 1000]
+                    )
+                p50, p99, p999, p_max = [min(values) for values in zip(*percentiles)]
+                print(
+                    "{:14} {:8} max_evict_scan {:>5}, miss ratio {:.4f}, "
+                    "p50 {:6.2f} us, p99 {:6.2f} us, p999 {:7.2f} us, max {:9.2f} us".format(
+                        name,
+                        cache_type.__name__,
+                        str(max_evict_scan),
+                        miss_ratio,
+                        p50,
+                        p99,
+                        p999,
+                        p_max,
+                    )
+                )
@@ -0,0 +1,59 @@
+"""
+    overhead and accuracy of hot-key tracking
+
+    replays a trace through a cache with and without track_hot_keys at several
+    sampling rates, and compares the reported top keys with the exact counts
+
+    usage: python3 hot_keys_benchmark.py [n_repeat]
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def replay(cache, requests):
+    start_time = time.perf_counter()
+    for obj_id in requests:
+        if cache.get(obj_id) is None:
+            cache.put(obj_id, obj_id)
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    n_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    trace_path = "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH)
+    requests = [obj_id for _, obj_id, _ in traceReaderLibcachesim(trace_path)]
+
+    # the gets and the puts of misses are counted
+    exact = Counter(requests)
+    true_top = [key for key, _ in exact.most_common(10)]
+
+    for cache_type in [LRU, S3FIFO]:
+        base = min(replay(cache_type(12000), requests) for _ in range(n_repeat))
+        print("{:8} no tracker {:8.0f} ns/req".format(cache_type.__name__, base / len(requests) * 1e9))
+
+        for rate in [1.0, 0.1, 0.01]:
+            elapsed = []
+            for _ in range(n_repeat):
+                cache = cache_type(12000)
+                cache.track_hot_keys(capacity=256, sample_rate=rate, window_sec=None)
+                elapsed.append(replay(cache, requests))
+            top = [key for key, _, _ in cache.top_keys(10)]
+            print(
+                "{:8} rate {:4}  {:8.0f} ns/req, overhead {:+5.1f}%, {}/10 of the top 10 found".format(
+                    cache_type.__name__,
+                    rate,
+                    min(elapsed) / len(requests) * 1e9,
+                    (min(elapsed) - base) / base * 100,
+                    len(set(top) & set(true_top)),
+                )
+            )
+        print()
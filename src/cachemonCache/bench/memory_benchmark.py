@@ -0,0 +1,52 @@
+"""
+    memory overhead per cached object of each policy
+
+    each cache is filled with 2x its size of distinct int keys so that it is in
+    steady state (S3FIFO has its ghost entries), all values are the same object,
+    keys are created before tracing starts, so the memory traced by tracemalloc
+    is the metadata of the policy, it is compared with memory_usage()
+
+    usage: python3 memory_benchmark.py [n_object ...], defaults to 10K 1M 10M
+"""
+
+import os
+import sys
+import tracemalloc
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+
+
+def measure(cache_type, n_object, keys, value=b"v"):
+    tracemalloc.start()
+    start_mem, _ = tracemalloc.get_traced_memory()
+    cache = cache_type(n_object)
+    for key in keys:
+        cache.put(key, value)
+    end_mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = cache.memory_usage()
+    traced = end_mem - start_mem
+    print(
+        "{:10} {:>10} objects, traced {:7.1f} B/obj, estimated {:7.1f} B/obj, error {:+5.1f}%".format(
+            cache.name,
+            usage["n_object"],
+            traced / usage["n_object"],
+            usage["metadata_bytes_per_object"],
+            (usage["metadata_bytes"] - traced) / traced * 100,
+        )
+    )
+
+
+if __name__ == "__main__":
+    n_objects = [int(n) for n in sys.argv[1:]] or [10_000, 1_000_000, 10_000_000]
+
+    for n_object in n_objects:
+        # ints above 256 are not shared, create them outside of tracing
+        keys = list(range(1000, 1000 + n_object * 2))
+        for cache_type in [FIFO, FastFIFO, LRU, FastLRU, Clock, S3FIFO]:
+            measure(cache_type, n_object, keys)
+        print()
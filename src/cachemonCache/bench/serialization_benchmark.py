@@ -0,0 +1,113 @@
+"""
+    throughput of the value serializers across value sizes
+
+    each value is encoded and decoded with every serializer that takes it, on
+    its own and through put and get of a SharedMemoryCache, "inband" is plain
+    pickle registered as a custom serializer, the baseline that copies large
+    buffers into the pickle stream, numpy arrays are used if numpy is
+    installed, otherwise a bytearray wrapped in a PickleBuffer
+
+    usage: python3 serialization_benchmark.py [n_repeat]
+"""
+
+import os
+import sys
+import time
+import pickle
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from cache.serialization import SERIALIZERS, frame_size
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+register_serializer(
+    "inband",
+    lambda value: [pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)],
+    pickle.loads,
+)
+
+
+def make_values(size):
+    values = {"bytes": os.urandom(size)}
+    if np is not None:
+        values["ndarray"] = np.random.random(max(1, size // 8))
+    else:
+        values["buffer"] = pickle.PickleBuffer(bytearray(os.urandom(size)))
+    # small objects, about size bytes once pickled
+    values["dict"] = {"key{}".format(i): i * 0.5 for i in range(max(1, size // 16))}
+    return values
+
+
+def bench_codec(name, value, n_iter):
+    encode, decode = SERIALIZERS[name]
+    try:
+        frames = encode(value)
+    except TypeError:
+        return None
+    data = bytearray(b"".join(frames))
+
+    start_time = time.perf_counter()
+    for _ in range(n_iter):
+        frame_size(encode(value))
+    encode_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(n_iter):
+        decode(data)
+    decode_time = time.perf_counter() - start_time
+    return len(data), encode_time / n_iter, decode_time / n_iter
+
+
+def bench_cache(name, value, size, n_iter):
+    cache = SharedMemoryCache(4, item_size=size * 2 + 4096, serializer=name)
+    try:
+        cache.put(0, value)
+        start_time = time.perf_counter()
+        for _ in range(n_iter):
+            cache.put(0, value)
+            cache.get(0)
+        return (time.perf_counter() - start_time) / n_iter
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+if __name__ == "__main__":
+    n_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    names = [name for name in ["raw", "inband", "pickle", "auto", "msgpack"] if name in SERIALIZERS]
+
+    print(
+        "{:>8} {:>8} {:>8} {:>10} {:>12} {:>12} {:>12}".format(
+            "size", "value", "codec", "encoded", "encode MB/s", "decode MB/s", "shm MB/s"
+        )
+    )
+    for size in [64, 4096, 262144, 4194304]:
+        n_iter = max(4, 2 ** 24 // size)
+        for kind, value in make_values(size).items():
+            for name in names:
+                results = [bench_codec(name, value, n_iter) for _ in range(n_repeat)]
+                if results[0] is None:
+                    continue
+                encoded = results[0][0]
+                encode_time = min(r[1] for r in results)
+                decode_time = min(r[2] for r in results)
+                cache_time = min(bench_cache(name, value, encoded, n_iter) for _ in range(n_repeat))
+                print(
+                    "{:>8} {:>8} {:>8} {:>10} {:>12.0f} {:>12.0f} {:>12.0f}".format(
+                        size,
+                        kind,
+                        name,
+                        encoded,
+                        size / encode_time / 1e6,
+                        size / decode_time / 1e6,
+                        size / cache_time / 1e6,
+                    )
+                )
+        print()
@@ -0,0 +1,150 @@
+"""
+    load generator for the memcached server
+
+    each connection sends batches of pipelined get (and set on miss) requests
+    over a zipf-like key space and waits for all responses of a batch,
+    the latency of a request is the latency of its batch
+
+    usage: python3 server_benchmark.py [--policy S3FIFO] [--unix PATH | --port PORT] [--external]
+    without --external a server is started in a child process
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+from cache import *
+from server.memcached import MemcachedServer
+
+
+def run_server(policy, size, host, port, unix_path):
+    cache = globals()[policy](size)
+    MemcachedServer(cache, host, port, unix_path).run()
+
+
+def make_keys(n_req, n_key, alpha=1.0, seed=42):
+    """zipf-like keys, the i-th most popular key has weight 1 / i^alpha"""
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) ** alpha for i in range(n_key)]
+    return [b"key:%d" % k for k in rng.choices(range(n_key), weights, k=n_req)]
+
+
+async def read_get_response(reader):
+    """return True if the response has a value"""
+    hit = False
+    line = await reader.readline()
+    while line.startswith(b"VALUE"):
+        n_byte = int(line.split()[3])
+        await reader.readexactly(n_byte + 2)
+        hit = True
+        line = await reader.readline()
+    assert line == b"END\r\n", line
+    return hit
+
+
+async def run_connection(args, keys, value, latencies, counters):
+    if args.unix is not None:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    for start in range(0, len(keys), args.depth):
+        batch = keys[start : start + args.depth]
+        t = time.perf_counter()
+        writer.write(b"".join(b"get %s\r\n" % key for key in batch))
+        misses = []
+        for key in batch:
+            if not await read_get_response(reader):
+                misses.append(key)
+        if len(misses) > 0:
+            writer.write(
+                b"".join(
+                    b"set %s 0 0 %d noreply\r\n%s\r\n" % (key, len(value), value)
+                    for key in misses
+                )
+            )
+        batch_latency = time.perf_counter() - t
+        latencies.extend([batch_latency] * len(batch))
+        counters[0] += len(batch)
+        counters[1] += len(misses)
+
+    writer.write(b"quit\r\n")
+    await writer.drain()
+    writer.close()
+
+
+async def run_load(args):
+    keys = make_keys(args.n_req, args.n_key)
+    per_conn = len(keys) // args.n_conn
+    value = os.urandom(args.value_size // 2).hex().encode()
+    latencies, counters = [], [0, 0]
+
+    start_time = time.time()
+    await asyncio.gather(
+        *[
+            run_connection(
+                args, keys[i * per_conn : (i + 1) * per_conn], value, latencies, counters
+            )
+            for i in range(args.n_conn)
+        ]
+    )
+    elapsed = time.time() - start_time
+
+    latencies.sort()
+    n = len(latencies)
+    print(
+        "{} {:8}, {} conn, depth {}, miss ratio {:.4f}, throughput {:8.0f} req/s, "
+        "latency p50 {:.3f} ms, p99 {:.3f} ms, p999 {:.3f} ms".format(
+            "unix" if args.unix else "tcp",
+            args.policy,
+            args.n_conn,
+            args.depth,
+            counters[1] / counters[0],
+            counters[0] / elapsed,
+            latencies[n // 2] * 1000,
+            latencies[int(n * 0.99)] * 1000,
+            latencies[int(n * 0.999)] * 1000,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="memcached load generator")
+    parser.add_argument("--policy", default="S3FIFO")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11311)
+    parser.add_argument("--unix", default=None)
+    parser.add_argument("--external", action="store_true", help="use a running server")
+    parser.add_argument("--n-conn", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=16, help="requests per pipelined batch")
+    parser.add_argument("--n-req", type=int, default=200000)
+    parser.add_argument("--n-key", type=int, default=100000)
+    parser.add_argument("--value-size", type=int, default=100)
+    args = parser.parse_args()
+
+    proc = None
+    if not args.external:
+        if args.unix is None and args.port == 0:
+            args.unix = os.path.join(tempfile.mkdtemp(), "cachemon.sock")
+        proc = multiprocessing.Process(
+            target=run_server,
+            args=(args.policy, args.size, args.host, args.port, args.unix),
+            daemon=True,
+        )
+        proc.start()
+        # wait for the server to listen
+        time.sleep(1)
+
+    try:
+        asyncio.run(run_load(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
@@ -0,0 +1,65 @@
+"""
+    accuracy of the shadow (what-if) miss ratio estimates
+
+    replays a trace through full caches of each (policy, size) and through
+    ShadowSimulator at several sampling rates, and prints the estimate error
+
+    usage: python3 shadow_benchmark.py
+"""
+
+import os
+import sys
+import time
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def true_miss_ratio(cache, requests):
+    for obj_id in requests:
+        if cache.get(obj_id) is None:
+            cache.put(obj_id, obj_id)
+    return 1 - cache.n_hit / cache.n_get
+
+
+if __name__ == "__main__":
+    trace_path = "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH)
+    requests = [obj_id for _, obj_id, _ in traceReaderLibcachesim(trace_path)]
+    cache_sizes = [2000, 5000, 12000, 20000]
+    policies = [FIFO, LRU, Clock, S3FIFO, Sieve]
+
+    truth = {
+        (policy.__name__, size): true_miss_ratio(policy(size), requests)
+        for policy in policies
+        for size in cache_sizes
+    }
+
+    for sample_rate in [0.1, 0.05]:
+        simulator = ShadowSimulator(cache_sizes, policies, sample_rate)
+        start_time = time.time()
+        for obj_id in requests:
+            simulator.access(obj_id)
+        elapsed = time.time() - start_time
+
+        result = simulator.recommend()
+        errors = []
+        for (policy, size), mr in sorted(result["miss_ratio"].items()):
+            errors.append(abs(mr - truth[(policy, size)]))
+            print(
+                "rate {:.2f} {:8} {:>6} true {:.4f} estimated {:.4f}".format(
+                    sample_rate, policy, size, truth[(policy, size)], mr
+                )
+            )
+        print(
+            "rate {:.2f}: mean abs error {:.4f}, max {:.4f}, {:.0f} ns/req, {} KB, best {}\n".format(
+                sample_rate,
+                sum(errors) / len(errors),
+                max(errors),
+                elapsed / len(requests) * 1e9,
+                result["memory_bytes"] // 1024,
+                result["best"],
+            )
+        )
@@ -0,0 +1,59 @@
+"""
+    replay speed of the simulation engine against the cache classes
+
+    replays a trace through each policy with both, checks that the hits are
+    the same and prints the time of each and the speedup
+
+    usage: python3 simulate_benchmark.py
+"""
+
+import os
+import sys
+import time
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def replay(cache, requests):
+    hits = bytearray(len(requests))
+    for i, obj_id in enumerate(requests):
+        if cache.get(obj_id) is None:
+            cache.put(obj_id, obj_id)
+        else:
+            hits[i] = 1
+    return hits
+
+
+if __name__ == "__main__":
+    trace_path = "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH)
+    requests = [obj_id for _, obj_id, _ in traceReaderLibcachesim(trace_path)]
+
+    start_time = time.time()
+    simulator = Simulator(requests)
+    print("remap {} requests: {:.3f} s".format(len(requests), time.time() - start_time))
+
+    for policy in [FIFO, LRU, Clock, S3FIFO, Sieve]:
+        for cache_size in [1000, 12000]:
+            start_time = time.time()
+            hits = replay(policy(cache_size), requests)
+            cache_time = time.time() - start_time
+
+            start_time = time.time()
+            result = simulator.run(policy.__name__, cache_size)
+            simulate_time = time.time() - start_time
+
+            assert bytes(result["hits"]) == bytes(hits)
+            print(
+                "{:8} {:>6} miss ratio {:.4f}, cache {:.3f} s, simulate {:.3f} s, {:.1f}x".format(
+                    policy.__name__,
+                    cache_size,
+                    result["miss_ratio"],
+                    cache_time,
+                    simulate_time,
+                    cache_time / simulate_time,
+                )
+            )
@@ -0,0 +1,132 @@
+"""
+    one-pass analysis of a trace, popularity, reuse, one-hit wonders, sizes and rate
+
+    the trace is streamed in chunks through TraceAnalyzer, the report is
+    written as JSON, or as CSV tables with --csv, --plot draws the
+    distributions if matplotlib is installed, use --sample-rate or
+    --max-tracked to bound the memory on traces with many objects
+
+    usage: python3 trace_analysis.py TRACE [--format libcachesim|csv] [--json OUT.json] [--csv PREFIX] [--plot OUT.png]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim, traceReaderCSV
+
+try:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+
+_READERS = {"libcachesim": traceReaderLibcachesim, "csv": traceReaderCSV}
+
+
+def analyze(reader, analyzer, chunk_size=65536):
+    while True:
+        timestamps, obj_ids, sizes = reader.read_chunk(chunk_size)
+        if len(obj_ids) == 0:
+            return analyzer
+        analyzer.feed(timestamps, obj_ids, sizes)
+
+
+def plot(report, path):
+    fig, axes = plt.subplots(2, 3, figsize=(15, 8))
+
+    ax = axes[0][0]
+    ranks, counts = zip(*report["popularity"])
+    ax.loglog(ranks, counts, marker=".")
+    ax.set_title("popularity, zipf alpha {:.3f}".format(report["zipf_alpha"] or 0))
+    ax.set_xlabel("rank")
+    ax.set_ylabel("requests")
+
+    for ax, name, xlabel in [
+        (axes[0][1], "reuse_time_hist", "reuse time (s)"),
+        (axes[0][2], "reuse_distance_hist", "reuse distance (objects)"),
+        (axes[1][0], "object_size_hist", "object size (bytes)"),
+    ]:
+        rows = report[name]
+        ax.bar(range(len(rows)), [count for _, _, count in rows])
+        ax.set_xticks(range(len(rows)))
+        ax.set_xticklabels([str(hi) for _, hi, _ in rows], rotation=90, fontsize=6)
+        ax.set_xlabel(xlabel)
+
+    ax = axes[1][1]
+    ax.plot(report["one_hit_wonder_windows"], marker=".")
+    ax.set_title("one-hit-wonder ratio per window")
+
+    ax = axes[1][2]
+    ax.plot([ts for ts, _, _ in report["request_rate"]], [n for _, n, _ in report["request_rate"]])
+    ax.set_title("requests per interval")
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="one-pass trace analysis")
+    parser.add_argument(
+        "trace",
+        nargs="?",
+        default="{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH),
+    )
+    parser.add_argument("--format", default="libcachesim", choices=sorted(_READERS))
+    parser.add_argument("--n-req", type=int, default=-1, help="the max number of requests")
+    parser.add_argument("--sample-rate", type=float, default=1.0)
+    parser.add_argument("--max-tracked", type=int, default=None)
+    parser.add_argument("--window-size", type=int, default=1000000)
+    parser.add_argument("--rate-interval", type=int, default=3600)
+    parser.add_argument("--json", default=None, help="write the report to a JSON file")
+    parser.add_argument("--csv", default=None, help="write the tables to PREFIX_<table>.csv")
+    parser.add_argument("--plot", default=None, help="draw the distributions to a PNG file")
+    args = parser.parse_args()
+
+    reader = _READERS[args.format](args.trace, args.n_req)
+    analyzer = TraceAnalyzer(
+        args.sample_rate, args.max_tracked, args.window_size, args.rate_interval
+    )
+    start = time.time()
+    analyze(reader, analyzer)
+    elapsed = time.time() - start
+
+    if args.json is not None:
+        report = analyzer.to_json(args.json)
+    else:
+        report = analyzer.report()
+    if args.csv is not None:
+        analyzer.to_csv(args.csv)
+    if args.plot is not None:
+        if plt is None:
+            print("matplotlib is not installed, skip the plot")
+        else:
+            plot(report, args.plot)
+
+    print(
+        "{} requests in {:.2f} s, {} objects (estimate), {} tracked at sample rate {:.4f}".format(
+            report["n_req"],
+            elapsed,
+            report["n_obj_estimate"],
+            report["n_obj_tracked"],
+            report["sample_rate"],
+        )
+    )
+    print(
+        "zipf alpha {:.3f}, one-hit wonders {:.3f}, mean request size {:.0f} B".format(
+            report["zipf_alpha"] or 0,
+            report["one_hit_wonder_ratio"],
+            report["mean_request_size"],
+        )
+    )
+    print("reuse distance (lo, hi, requests):")
+    for lo, hi, count in report["reuse_distance_hist"]:
+        print("    {:>10} {:>10} {:>12.0f}".format(lo, hi, count))
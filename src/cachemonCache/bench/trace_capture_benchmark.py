@@ -0,0 +1,58 @@
+"""
+    overhead of recording a live trace with TraceRecorder
+
+    replays a trace through a cache with and without a recorder attached at
+    several sampling rates, and checks that the recorded trace can be read back
+
+    usage: python3 trace_capture_benchmark.py [n_repeat]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+sys.path.append(BASEPATH)
+sys.path.append(BASEPATH + "/../../")
+from cache import *
+from bench.trace_reader import traceReaderLibcachesim
+
+
+def replay(cache, requests):
+    start_time = time.perf_counter()
+    for obj_id in requests:
+        if cache.get(obj_id) is None:
+            cache.put(obj_id, obj_id)
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    n_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    trace_path = "{}/../../data/cloudphysics.oracleGeneral.bin".format(BASEPATH)
+    requests = [obj_id for _, obj_id, _ in traceReaderLibcachesim(trace_path)]
+    out_path = os.path.join(tempfile.mkdtemp(), "capture.oracleGeneral.bin")
+
+    for cache_type in [FIFO, LRU, S3FIFO]:
+        base = min(replay(cache_type(12000), requests) for _ in range(n_repeat))
+        print("{:8} no recorder {:8.0f} ns/req".format(cache_type.__name__, base / len(requests) * 1e9))
+
+        for spatial, rate in [(True, 0.01), (True, 0.1), (True, 1.0), (False, 0.01)]:
+            elapsed, n_record = [], 0
+            for _ in range(n_repeat):
+                cache = cache_type(12000)
+                recorder = TraceRecorder(out_path, rate, spatial).attach(cache)
+                elapsed.append(replay(cache, requests))
+                recorder.close()
+                n_record = sum(1 for _ in traceReaderLibcachesim(out_path))
+            print(
+                "{:8} {:7} {:4}  {:8.0f} ns/req, overhead {:+5.1f}%, {} records".format(
+                    cache_type.__name__,
+                    "spatial" if spatial else "random",
+                    rate,
+                    min(elapsed) / len(requests) * 1e9,
+                    (min(elapsed) - base) / base * 100,
+                    n_record,
+                )
+            )
+        print()
@@ -28,6 +28,21 @@ class traceReader:
         self.trace_file.seek(0)
         self.n_read_req = 0
 
+    def read_chunk(self, n_req: int):
+        """read up to n_req requests as (timestamps, obj_ids, sizes) lists, empty lists at the end"""
+        timestamps, obj_ids, sizes = [], [], []
+        for _ in range(n_req):
+            try:
+                data = self.read()
+            except StopIteration:
+                break
+            if data is None:
+                break
+            timestamps.append(int(data[0]))
+            obj_ids.append(data[1])
+            sizes.append(int(data[2]))
+        return timestamps, obj_ids, sizes
+
     
 
 class traceReaderMeta(traceReader):
@@ -77,6 +92,19 @@ class traceReaderLibcachesim(traceReader):
 
         return self.s.unpack(b)[:3]
 
+    def read_chunk(self, n_req: int):
+        if self.n_max_req > 0:
+            n_req = min(n_req, self.n_max_req - self.n_read_req)
+        b = self.trace_file.read(self.s.size * max(0, n_req))
+        b = b[: len(b) - len(b) % self.s.size]
+        records = list(self.s.iter_unpack(b))
+        self.n_read_req += len(records)
+        return (
+            [r[0] for r in records],
+            [r[1] for r in records],
+            [r[2] for r in records],
+        )
+
     # def reset(self):
     #     self.trace_file.seek(0)
     #     self.n_read_req = 0
@@ -2,6 +2,28 @@
 from .fifo import FIFO
 from .lru import LRU
 from .clock import Clock
+from .fast import FastFIFO, FastLRU
 from .s3fifo import S3FIFO
-# from .sieve import Sieve
+from .sieve import Sieve
+from .arc import ARC
+from .twoq import TwoQ
+from .lirs import LIRS
+from .tinylfu import WTinyLFU
+from .gdsf import GDSF
+from .sharedMemory import SharedMemoryCache
+from .evictionQueue import DeferredEvictionCallback
+from .refresh import RefreshAheadLoader
+from .compression import CompressedCache, register_codec
+from .serialization import register_serializer
+from .fingerprint import KeyBuilder, register_key_function
+from .slab import SlabAllocator, SlabCache
+from .partition import PartitionedCache, Namespace
+from .metrics import MetricsRegistry, Histogram
+from .traceRecorder import TraceRecorder, annotate_next_access
+from .shadow import ShadowSimulator
+from .simulate import Simulator
+from .analysis import TraceAnalyzer, HyperLogLog
+from .governor import MemoryGovernor
+from .hotkeys import HotKeyTracker
+from .warmup import HotKeyPersister, Preloader, save_hot_keys, load_hot_keys, warm_up
 from .cacheDecorator import cacheDecorator
@@ -0,0 +1,369 @@
+"""
+    one-pass trace analysis, popularity, reuse, one-hit wonders, sizes and rate
+
+    a TraceAnalyzer is fed chunks of (timestamp, obj_id, size) columns and
+    keeps everything it reports in one pass, the number of objects is a
+    HyperLogLog estimate, the per-object statistics (popularity, reuse time,
+    reuse distance, one-hit wonders, object sizes) come from spatially sampled
+    keys, a sampled key keeps all its requests, so the sampled trace has the
+    popularity and the reuse pattern of the full one [Waldspurger et al.,
+    SHARDS, FAST'15], with max_tracked the sampling rate is lowered whenever
+    more keys are tracked (fixed-size SHARDS), so the memory stays bounded on
+    traces with billions of objects
+
+    reuse distances are the number of distinct sampled objects since the last
+    request of an object, counted in a Fenwick tree over the last access time
+    of each object, then scaled by 1 / sampling rate, the histograms have
+    power-of-two buckets, bucket b holds [2^(b-1), 2^b), bucket 0 holds 0
+"""
+
+import csv
+import json
+import math
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+_MASK64 = (1 << 64) - 1
+# same modulus as the trace recorder and the shadow simulator
+_SAMPLE_MODULUS = 10007
+
+
+def _hash64(key: Any) -> int:
+    # the murmur3 finalizer, hash((key,)) alone does not mix the high bits enough for HyperLogLog
+    h = hash((key,)) & _MASK64
+    h ^= h >> 33
+    h = (h * 0xFF51AFD7ED558CCD) & _MASK64
+    h ^= h >> 33
+    h = (h * 0xC4CEB9FE1A85EC53) & _MASK64
+    return h ^ (h >> 33)
+
+
+class HyperLogLog(object):
+    def __init__(self, precision: int = 14) -> None:
+        """estimate the number of distinct keys with 2^precision one-byte registers,
+        the standard error is 1.04 / sqrt(2^precision), 0.8% by default
+
+        Args:
+            precision (int, optional): 4 to 18. Defaults to 14.
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add_hash(self, h: int) -> None:
+        """add a 64-bit hash"""
+        p = self.precision
+        idx = h >> (64 - p)
+        # the guard bit bounds the rank when the remaining bits are all zero
+        w = ((h << p) & _MASK64) | (1 << (p - 1))
+        rank = 65 - w.bit_length()
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add(self, key: Any) -> None:
+        self.add_hash(_hash64(key))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs of different precisions")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> float:
+        m = self.m
+        estimate = self.alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        n_zero = self.registers.count(0)
+        if estimate <= 2.5 * m and n_zero > 0:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / n_zero)
+        return estimate
+
+
+def _histogram(buckets: Dict[int, float]) -> List[List[float]]:
+    """[lo, hi, count] rows of a power-of-two histogram"""
+    return [
+        [0 if b == 0 else 1 << (b - 1), 0 if b == 0 else (1 << b) - 1, buckets[b]]
+        for b in sorted(buckets)
+    ]
+
+
+class TraceAnalyzer(object):
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        max_tracked: int = None,
+        window_size: int = 1000000,
+        rate_interval_sec: int = 3600,
+        hll_precision: int = 14,
+    ) -> None:
+        """create a trace analyzer, feed it chunks of requests, then call report
+
+        Args:
+            sample_rate (float, optional): the fraction of keys tracked for the per-object statistics. Defaults to 1.0.
+            max_tracked (int, optional): the max number of tracked keys, the sampling rate is lowered to stay
+                under it. Defaults to None (no limit).
+            window_size (int, optional): the number of requests of a one-hit-wonder window. Defaults to 1000000.
+            rate_interval_sec (int, optional): the width of a request rate bucket. Defaults to 3600.
+            hll_precision (int, optional): the precision of the distinct key estimate. Defaults to 14.
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+
+        self.threshold = max(1, int(sample_rate * _SAMPLE_MODULUS))
+        self.max_tracked = max_tracked
+        self.window_size = window_size
+        self.rate_interval_sec = rate_interval_sec
+        self.hll = HyperLogLog(hll_precision)
+
+        self.n_req = 0
+        self.n_bytes = 0
+        self.start_ts = None
+        self.end_ts = None
+
+        # tracked key -> [n_req, last timestamp, last position in the tree, size]
+        self.objects = {}
+        # a Fenwick tree with a 1 at the last position of each tracked key
+        self.tree = [0] * 1025
+        self.n_pos = 0
+
+        self.reuse_time = {}
+        self.reuse_distance = {}
+        self.request_size = {}
+        self.object_size = {}
+        # interval -> [n_req, n_bytes]
+        self.rate = {}
+        self.window_counts = {}
+        self.n_window_req = 0
+        self.one_hit_wonder_windows = []
+
+    @property
+    def sample_rate(self) -> float:
+        return self.threshold / _SAMPLE_MODULUS
+
+    def _compact(self) -> None:
+        """renumber the last positions 1..n_tracked and rebuild the tree"""
+        objects = self.objects
+        entries = sorted(objects.values(), key=lambda entry: entry[2])
+        for i, entry in enumerate(entries):
+            entry[2] = i + 1
+        n = len(entries)
+        capacity = max(1024, 2 * n)
+        tree = [0] * (capacity + 1)
+        for i in range(1, n + 1):
+            tree[i] += 1
+            j = i + (i & -i)
+            if j <= capacity:
+                tree[j] += tree[i]
+        for i in range(n + 1, capacity + 1):
+            j = i + (i & -i)
+            if j <= capacity:
+                tree[j] += tree[i]
+        self.tree = tree
+        self.n_pos = n
+
+    def _lower_rate(self) -> None:
+        """drop the tracked keys above a lower threshold until max_tracked is met"""
+        objects = self.objects
+        while len(objects) > self.max_tracked and self.threshold > 1:
+            self.threshold = max(1, int(self.threshold * 0.9))
+            threshold = self.threshold
+            for key in [k for k in objects if _hash64(k) % _SAMPLE_MODULUS >= threshold]:
+                del objects[key]
+                self.window_counts.pop(key, None)
+        self._compact()
+
+    def _end_window(self) -> None:
+        counts = self.window_counts
+        if len(counts) > 0:
+            n_one = sum(1 for count in counts.values() if count == 1)
+            self.one_hit_wonder_windows.append(n_one / len(counts))
+        counts.clear()
+        self.n_window_req = 0
+
+    def feed(self, timestamps: List[int], obj_ids: List[Any], sizes: List[int]) -> None:
+        """analyze a chunk of requests, the columns are lists or ndarrays of the same length"""
+        if hasattr(obj_ids, "tolist"):
+            timestamps, obj_ids, sizes = timestamps.tolist(), obj_ids.tolist(), sizes.tolist()
+        if len(obj_ids) == 0:
+            return
+        if self.start_ts is None:
+            self.start_ts = timestamps[0]
+        self.end_ts = timestamps[-1]
+
+        hll, objects, rate = self.hll, self.objects, self.rate
+        request_size, reuse_time, reuse_distance = (
+            self.request_size,
+            self.reuse_time,
+            self.reuse_distance,
+        )
+        window_counts, window_size = self.window_counts, self.window_size
+        interval = self.rate_interval_sec
+        n_bytes = 0
+
+        for ts, obj_id, size in zip(timestamps, obj_ids, sizes):
+            n_bytes += size
+            b = size.bit_length()
+            request_size[b] = request_size.get(b, 0) + 1
+            r = rate.get(ts // interval)
+            if r is None:
+                rate[ts // interval] = [1, size]
+            else:
+                r[0] += 1
+                r[1] += size
+
+            h = _hash64(obj_id)
+            hll.add_hash(h)
+
+            self.n_window_req += 1
+            if h % _SAMPLE_MODULUS < self.threshold:
+                scale = _SAMPLE_MODULUS / self.threshold
+                window_counts[obj_id] = window_counts.get(obj_id, 0) + 1
+
+                if self.n_pos == len(self.tree) - 1:
+                    self._compact()
+                tree = self.tree
+                self.n_pos += 1
+                pos = self.n_pos
+
+                entry = objects.get(obj_id)
+                if entry is None:
+                    objects[obj_id] = entry = [0, ts, pos, size]
+                    b = size.bit_length()
+                    self.object_size[b] = self.object_size.get(b, 0) + scale
+                else:
+                    b = max(0, ts - entry[1]).bit_length()
+                    reuse_time[b] = reuse_time.get(b, 0) + scale
+
+                    # the tracked keys requested after the last request of this one
+                    i, n_before = entry[2], 0
+                    while i > 0:
+                        n_before += tree[i]
+                        i -= i & -i
+                    distance = len(objects) - n_before
+                    b = int(distance * scale).bit_length()
+                    reuse_distance[b] = reuse_distance.get(b, 0) + scale
+
+                    i = entry[2]
+                    while i < len(tree):
+                        tree[i] -= 1
+                        i += i & -i
+                    entry[1] = ts
+                    entry[2] = pos
+
+                entry[0] += 1
+                i = pos
+                while i < len(tree):
+                    tree[i] += 1
+                    i += i & -i
+
+                if self.max_tracked is not None and len(objects) > self.max_tracked:
+                    self._lower_rate()
+
+            if self.n_window_req >= window_size:
+                self._end_window()
+
+        self.n_req += len(obj_ids)
+        self.n_bytes += n_bytes
+
+    def _popularity(self, max_points: int = 100) -> Tuple[List[List[float]], Optional[float]]:
+        """log-spaced (rank, count) points and the Zipf alpha fitted on them"""
+        counts = sorted((entry[0] for entry in self.objects.values()), reverse=True)
+        if len(counts) == 0:
+            return [], None
+
+        scale = _SAMPLE_MODULUS / self.threshold
+        ranks, r = [], 1
+        while r <= len(counts):
+            ranks.append(r)
+            r = max(r + 1, int(r * len(counts) ** (1 / max_points)))
+        points = [[rank * scale, counts[rank - 1]] for rank in ranks]
+
+        if len(points) < 2:
+            return points, None
+        xs = [math.log(rank) for rank, _ in points]
+        ys = [math.log(count) for _, count in points]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+        return points, -cov / var_x
+
+    def report(self) -> Dict[str, Any]:
+        """the statistics of the requests fed so far"""
+        popularity, zipf_alpha = self._popularity()
+        counts = [entry[0] for entry in self.objects.values()]
+        windows = list(self.one_hit_wonder_windows)
+        if len(self.window_counts) > 0:
+            # the last window is partial
+            n_one = sum(1 for count in self.window_counts.values() if count == 1)
+            windows.append(n_one / len(self.window_counts))
+
+        return {
+            "n_req": self.n_req,
+            "n_bytes": self.n_bytes,
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts,
+            "n_obj_estimate": round(self.hll.estimate()),
+            "sample_rate": self.sample_rate,
+            "n_obj_tracked": len(counts),
+            "zipf_alpha": zipf_alpha,
+            "popularity": popularity,
+            "one_hit_wonder_ratio": (
+                sum(1 for count in counts if count == 1) / len(counts) if counts else 0.0
+            ),
+            "one_hit_wonder_windows": windows,
+            "reuse_time_hist": _histogram(self.reuse_time),
+            "reuse_distance_hist": _histogram(self.reuse_distance),
+            "request_size_hist": _histogram(self.request_size),
+            "object_size_hist": _histogram(self.object_size),
+            "mean_request_size": self.n_bytes / self.n_req if self.n_req else 0.0,
+            "request_rate": [
+                [interval * self.rate_interval_sec, n_req, n_bytes]
+                for interval, (n_req, n_bytes) in sorted(self.rate.items())
+            ],
+        }
+
+    def to_json(self, path: str) -> Dict[str, Any]:
+        report = self.report()
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def to_csv(self, prefix: str) -> List[str]:
+        """write each table of the report to <prefix>_<table>.csv and the scalars to <prefix>_summary.csv
+
+        Returns:
+            List[str]: the paths written
+        """
+        report = self.report()
+        tables = {
+            "popularity": (["rank", "count"], report["popularity"]),
+            "one_hit_wonder": (
+                ["window", "ratio"],
+                list(enumerate(report["one_hit_wonder_windows"])),
+            ),
+            "request_rate": (["start_ts", "n_req", "n_bytes"], report["request_rate"]),
+        }
+        for name in ("reuse_time", "reuse_distance", "request_size", "object_size"):
+            tables[name] = (["lo", "hi", "count"], report[name + "_hist"])
+
+        paths = []
+        for name, (header, rows) in tables.items():
+            path = "{}_{}.csv".format(prefix, name)
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+            paths.append(path)
+
+        path = "{}_summary.csv".format(prefix)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["metric", "value"])
+            for name, value in report.items():
+                if not isinstance(value, list):
+                    writer.writerow([name, value])
+        paths.append(path)
+        return paths
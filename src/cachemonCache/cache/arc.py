@@ -0,0 +1,215 @@
+"""
+    ARC, adaptive replacement cache [Megiddo and Modha, FAST'03]
+
+    T1 holds objects seen once recently, T2 objects seen at least twice, B1 and
+    B2 are the ghosts (keys only) of objects evicted from T1 and T2, a miss on
+    a ghost moves the target size p of T1 towards the list that would have hit
+
+    all lists are OrderedDicts (the least recent key first), the table maps a
+    resident key to a (value, exp_time) tuple
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS
+from .fast import _TupleCache
+
+
+class ARC(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        *args,
+        **kwargs
+    ):
+        """create an ARC cache
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            "ARC",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        # the target size of t1
+        self.p = 0
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        table = self.table
+        entry = (value, time.time() + ttl_sec)
+        if key in table:
+            # an update is an access
+            table[key] = entry
+            self._hit(key)
+            return
+
+        c = self.cache_size
+        t1, b1, b2 = self.t1, self.b1, self.b2
+        if key in b1:
+            self.p = min(c, self.p + max(len(b2) / len(b1), 1))
+            del b1[key]
+            if len(table) >= c:
+                self._replace(False)
+            self.t2[key] = None
+        elif key in b2:
+            self.p = max(0, self.p - max(len(b1) / len(b2), 1))
+            del b2[key]
+            if len(table) >= c:
+                self._replace(True)
+            self.t2[key] = None
+        else:
+            if len(t1) + len(b1) >= c:
+                if len(t1) < c:
+                    b1.popitem(last=False)
+                    if len(table) >= c:
+                        self._replace(False)
+                else:
+                    # t1 is the whole cache, evict without a ghost
+                    self._evict_from(t1, None)
+            else:
+                # b2 can be empty when the directory is over 2 * c after a resize
+                if len(b2) > 0 and len(t1) + len(b1) + len(self.t2) + len(b2) >= 2 * c:
+                    b2.popitem(last=False)
+                if len(table) >= c:
+                    self._replace(False)
+            t1[key] = None
+
+        table[key] = entry
+        if self.shrinking:
+            self._shrink_step()
+
+    def _hit(self, key: Any) -> None:
+        t1 = self.t1
+        if key in t1:
+            del t1[key]
+            self.t2[key] = None
+        else:
+            self.t2.move_to_end(key)
+
+    def _evict_from(self, queue: OrderedDict, ghost: Optional[OrderedDict]) -> Any:
+        self.n_evict += 1
+
+        key, _ = queue.popitem(last=False)
+        value, _ = self.table.pop(key)
+        if ghost is not None:
+            ghost[key] = None
+        if self.eviction_callback is not None:
+            self.eviction_callback(key, value)
+
+        return key
+
+    def _replace(self, in_b2: bool) -> Any:
+        t1 = self.t1
+        if len(t1) > 0 and (len(t1) > self.p or (in_b2 and len(t1) == self.p)):
+            return self._evict_from(t1, self.b1)
+        if len(self.t2) > 0:
+            return self._evict_from(self.t2, self.b2)
+        return self._evict_from(t1, self.b1)
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            self._remove(key)
+            return default
+
+        self._hit(key)
+        self.n_hit += 1
+        return entry[0]
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key, None if the cache is empty
+        """
+
+        if len(self.table) == 0:
+            return None
+        key = self._replace(False)
+        # keep the ghosts within the directory size of 2 * cache_size, a few at a
+        # time, so the ghosts of a cache that shrinks are dropped gradually
+        for _ in range(2):
+            if len(self.b1) > 0 and len(self.t1) + len(self.b1) > self.cache_size:
+                self.b1.popitem(last=False)
+            elif len(self.b2) > 0 and len(self.table) + len(self.b1) + len(self.b2) > 2 * self.cache_size:
+                self.b2.popitem(last=False)
+        return key
+
+    def _resize_queues(self, new_size: int) -> None:
+        self.p = min(self.p, new_size)
+
+    def _remove(self, key: Any) -> None:
+        del self.table[key]
+        if key in self.t1:
+            del self.t1[key]
+        else:
+            del self.t2[key]
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        self._remove(key)
+
+    def keys_by_hotness(self) -> List[Any]:
+        """T2 (requested at least twice), then T1, each the most recent first"""
+        return list(reversed(self.t2)) + list(reversed(self.t1))
+
+    def clear(self):
+        for queue in (self.table, self.t1, self.t2, self.b1, self.b2):
+            queue.clear()
+        self.p = 0
+
+    def _metadata_bytes(self) -> int:
+        return super()._metadata_bytes() + sum(
+            sys.getsizeof(queue) for queue in (self.t1, self.t2, self.b1, self.b2)
+        )
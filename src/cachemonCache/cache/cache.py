@@ -1,5 +1,6 @@
 import sys
 import time
+import itertools
 
 if sys.version_info < (3, 3):
     from collections import Mapping
@@ -7,6 +8,16 @@ else:
     from collections.abc import Mapping
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .evictionQueue import DeferredEvictionCallback
+from .refresh import RefreshAheadLoader
+from .hotkeys import HotKeyTracker
+
+
+# returned by dict.get and Cache.get on a miss, None is a valid cached value
+_MISS = object()
+
+# every node holds its own exp_time float
+_FLOAT_SIZE = sys.getsizeof(1.0)
 
 
 class Cache(object):
@@ -44,10 +55,20 @@ class Cache(object):
         self.n_put = 0
         self.n_delete = 0
         self.n_evict = 0
+        self.n_expire = 0
+
+        # set by resize, a cache over its capacity evicts resize_batch objects per put
+        self.shrinking = False
+        self.resize_batch = 64
 
         # Create an empty hash table.
         self.table = {}
 
+        # created on the first get_or_load
+        self.refresher = None
+        # set by track_hot_keys
+        self.hot_keys = None
+
     def __len__(self):
         return len(self.table)
 
@@ -55,8 +76,8 @@ class Cache(object):
         return key in self.table
 
     def __getitem__(self, key):
-        value = self.get(key, None)
-        if value is None:
+        value = self.get(key, _MISS)
+        if value is _MISS:
             raise KeyError(key)
         return value
 
@@ -109,9 +130,206 @@ class Cache(object):
         for key, value in kwargs.items():
             self[key] = value
 
+    def keys_by_hotness(self) -> List[Any]:
+        """the cached keys, the ones the policy would keep longest first, e.g., to warm up
+        another cache, policies without an order return the table order"""
+        return list(self.keys())
+
+    def get_exp_time(self, key, default=None):
+        """return the expiration time of the key, or default if the key is not in the cache"""
+        node = self.table.get(key, _MISS)
+        if node is _MISS:
+            return default
+        return node.exp_time
+
+    def get_or_load(
+        self,
+        key: Any,
+        loader: Callable,
+        ttl_sec: Optional[int] = None,
+        beta: float = 1.0,
+    ) -> Any:
+        """get the value of the key, call loader(key) and insert the result on a miss,
+        hot entries are reloaded in the background shortly before they expire
+
+        Args:
+            key (Any): the key
+            loader (Callable): computes the value of a key
+            ttl_sec (int, optional): the retention time of loaded values. Defaults to the cache ttl.
+            beta (float, optional): how early entries are refreshed, larger is earlier, 0 disables refresh-ahead. Defaults to 1.0.
+
+        Returns:
+            the cached or loaded value
+        """
+
+        if self.refresher is None:
+            self.refresher = RefreshAheadLoader(self)
+        if ttl_sec is None:
+            ttl_sec = self.ttl_sec
+        return self.refresher.get_or_load(key, loader, ttl_sec, beta)
+
+    def track_hot_keys(
+        self,
+        capacity: int = 256,
+        sample_rate: float = 1.0,
+        window_sec: float = 60.0,
+        decay: float = 0.5,
+    ) -> HotKeyTracker:
+        """count the gets and puts of the most requested keys in fixed memory (Space-Saving),
+        see top_keys, untrack_hot_keys removes the tracker
+
+        Args:
+            capacity (int, optional): the number of counters. Defaults to 256.
+            sample_rate (float, optional): the fraction of requests counted. Defaults to 1.0.
+            window_sec (float, optional): the counts decay every window_sec, None disables decay. Defaults to 60.0.
+            decay (float, optional): the factor applied to the counts at the end of a window. Defaults to 0.5.
+
+        Returns:
+            HotKeyTracker: the attached tracker
+        """
+        if self.hot_keys is not None:
+            self.untrack_hot_keys()
+        self.hot_keys = HotKeyTracker(capacity, sample_rate, window_sec, decay).attach(self)
+        return self.hot_keys
+
+    def untrack_hot_keys(self) -> None:
+        if self.hot_keys is not None:
+            self.hot_keys.detach()
+            self.hot_keys = None
+
+    def top_keys(self, k: int = 10) -> List[Tuple[Any, float, float]]:
+        """the k most requested keys as (key, count, error) tuples, the most requested first,
+        the true count is between count - error and count, up to the sampling error
+
+        Raises:
+            RuntimeError: track_hot_keys has not been called
+        """
+        if self.hot_keys is None:
+            raise RuntimeError("hot keys are not tracked, call track_hot_keys first")
+        return self.hot_keys.top_keys(k)
+
+    def resize(self, new_size: int, evict_batch: int = 64, defer: bool = False) -> None:
+        """change the capacity of the cache, growing takes effect immediately, when
+        shrinking, the objects over the new capacity are evicted evict_batch at a time,
+        now and on the following puts, so no call evicts the whole difference
+
+        Args:
+            new_size (int): the new cache size in objects
+            evict_batch (int, optional): the max number of extra evictions per call. Defaults to 64.
+            defer (bool, optional): evict nothing now, only on the following puts, which allows
+                resizing from a thread that does not serve requests. Defaults to False.
+        """
+        if new_size <= 0:
+            raise ValueError("cache size must be positive")
+        if evict_batch <= 0:
+            raise ValueError("evict_batch must be positive")
+
+        old_size = self.cache_size
+        self._resize_queues(new_size)
+        self.cache_size = new_size
+        self.resize_batch = evict_batch
+        if not defer:
+            self._shrink_step()
+        elif new_size < old_size:
+            # the next eviction on the request path starts shrinking
+            self.shrinking = True
+
+    def _resize_queues(self, new_size: int) -> None:
+        """update the structures sized from cache_size, called before cache_size changes"""
+        pass
+
+    def _shrink_step(self) -> None:
+        """evict up to resize_batch objects while the cache is over its capacity"""
+        for _ in range(self.resize_batch):
+            if self._n_object() <= self.cache_size or self.evict() is None:
+                break
+        self.shrinking = self._n_object() > self.cache_size
+
     def add_eviction_callback(self, eviction_callback):
         self.eviction_callback = eviction_callback
 
+    def _on_remove(self, key: Any, value: Any, reason: str) -> None:
+        """report an expiration or a delete to an eviction callback that takes a reason
+        (a DeferredEvictionCallback or a wrapper), plain callbacks only see evictions"""
+        callback = self.eviction_callback
+        if callback is not None and getattr(callback, "takes_reason", False):
+            callback(key, value, reason)
+
+    def _n_object(self) -> int:
+        """the number of cached objects, without ghost entries"""
+        return len(self)
+
+    def _metadata_bytes(self) -> int:
+        """estimate the bytes of the policy structures, keys and values are not included"""
+        n_node = len(self.table)
+        if n_node == 0:
+            return sys.getsizeof(self.table)
+        node = next(iter(self.table.values()))
+        return sys.getsizeof(self.table) + n_node * (sys.getsizeof(node) + _FLOAT_SIZE)
+
+    def _payload_bytes(self, n_sample: int) -> Tuple[int, int]:
+        """estimate the bytes of keys and values from the first n_sample items"""
+        sampled = list(itertools.islice(self.items(), n_sample))
+        if len(sampled) == 0:
+            return 0, 0
+        scale = self._n_object() / len(sampled)
+        key_bytes = sum(sys.getsizeof(key) for key, _ in sampled)
+        value_bytes = sum(sys.getsizeof(value) for _, value in sampled)
+        return int(key_bytes * scale), int(value_bytes * scale)
+
+    def memory_usage(self, n_sample: int = 1000) -> Dict[str, Union[int, float]]:
+        """estimate the memory used by the cache, the metadata estimate is computed
+        from the size of each structure (see bench/memory_benchmark.py for the
+        comparison with tracemalloc), keys and values are estimated from a sample
+        and do not include the objects they reference
+
+        Args:
+            n_sample (int, optional): the number of items used to estimate keys and values. Defaults to 1000.
+
+        Returns:
+            Dict: n_object, metadata_bytes, key_bytes, value_bytes, total_bytes, metadata_bytes_per_object
+        """
+        n_object = self._n_object()
+        metadata_bytes = self._metadata_bytes()
+        key_bytes, value_bytes = self._payload_bytes(n_sample)
+        return {
+            "n_object": n_object,
+            "metadata_bytes": metadata_bytes,
+            "key_bytes": key_bytes,
+            "value_bytes": value_bytes,
+            "total_bytes": metadata_bytes + key_bytes + value_bytes,
+            "metadata_bytes_per_object": metadata_bytes / max(n_object, 1),
+        }
+
+    def add_deferred_eviction_callback(
+        self,
+        batch_callback: Callable,
+        max_queue_size: int = 10000,
+        batch_size: int = 128,
+        overflow: str = "block",
+    ) -> DeferredEvictionCallback:
+        """deliver evictions to batch_callback on a background thread instead of inside put
+
+        Args:
+            batch_callback (Callable): called with a list of (key, value, reason) tuples
+            max_queue_size (int, optional): the max number of pending evictions. Defaults to 10000.
+            batch_size (int, optional): the max number of evictions per batch. Defaults to 128.
+            overflow (str, optional): block, drop or inline when the queue is full. Defaults to "block".
+
+        Returns:
+            DeferredEvictionCallback: the installed callback
+        """
+
+        self.eviction_callback = DeferredEvictionCallback(
+            batch_callback, max_queue_size, batch_size, overflow
+        )
+        return self.eviction_callback
+
+    def flush(self) -> None:
+        """wait until deferred eviction callbacks are delivered, call it before shutdown"""
+        if isinstance(self.eviction_callback, DeferredEvictionCallback):
+            self.eviction_callback.flush()
+
     def __repr__(self):
         for key, node in self.table.items():
             print("{:<8} {}".format(key, node))
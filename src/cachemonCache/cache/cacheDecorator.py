@@ -1,14 +1,70 @@
+import time
 import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .fifo import FIFO
 from .lru import LRU
 from .clock import Clock
 from .s3fifo import S3FIFO
+from .sieve import Sieve
+from .arc import ARC
+from .twoq import TwoQ
+from .lirs import LIRS
+from .tinylfu import WTinyLFU
+from .gdsf import GDSF
+from .cache import _MISS
+from .fingerprint import KeyBuilder
 
-# from .sieve import Sieve
+
+# the freshness and cost of a value without metadata
+_NO_META = (float("inf"), 0.0)
+
+
+class _CachedException(object):
+    """an exception raised by the function, cached as the result of a call"""
+
+    __slots__ = ("exception",)
+
+    def __init__(self, exception):
+        self.exception = exception
 
 
 class cacheDecorator(object):
-    def __init__(self, size, eviction="S3FIFO", callback=None):
+    def __init__(
+        self,
+        size,
+        eviction="S3FIFO",
+        callback=None,
+        ttl_sec=None,
+        stale_ttl=0,
+        stale_if_error=0,
+        revalidate_workers=4,
+        negative_ttl=None,
+        cache_exceptions=(),
+        digest_threshold=256,
+        digest_memo_size=0,
+    ):
+        """memoize a function, the compute time of every call is recorded as the cost of
+        its result, GDSF keeps the expensive results, stats() reports the time saved
+
+        Args:
+            size (int): cache size in objects
+            eviction (str, optional): the eviction policy, GDSF is cost-aware. Defaults to "S3FIFO".
+            callback (Callable, optional): eviction callback. Defaults to None.
+            ttl_sec (int, optional): how long a result is fresh. Defaults to the cache ttl.
+            stale_ttl (int, optional): how long after ttl_sec a stale result is returned
+                while it is recomputed in the background. Defaults to 0.
+            stale_if_error (int, optional): how long after ttl_sec a stale result is returned
+                when the function raises. Defaults to 0.
+            revalidate_workers (int, optional): the number of threads that recompute stale results. Defaults to 4.
+            negative_ttl (int, optional): how long a None result or a cached exception is fresh. Defaults to ttl_sec.
+            cache_exceptions (tuple, optional): exception types that are cached and re-raised
+                for negative_ttl instead of calling the function again. Defaults to ().
+            digest_threshold (int, optional): str and bytes arguments longer than this, buffers (bytearray,
+                memoryview, numpy arrays) and pandas objects are keyed by a digest, see fingerprint.py. Defaults to 256.
+            digest_memo_size (int, optional): memoize this many digests by id(), only for arguments
+                that are not modified in place. Defaults to 0.
+        """
         if eviction == "FIFO":
             self.cache = FIFO(size)
         elif eviction == "LRU":
@@ -17,29 +73,197 @@ class cacheDecorator(object):
             self.cache = Clock(size)
         elif eviction == "S3FIFO":
             self.cache = S3FIFO(size)
-        # elif eviction == "SIEVE":
-        #     self.cache = Sieve(size)
+        elif eviction == "SIEVE" or eviction == "Sieve":
+            self.cache = Sieve(size)
+        elif eviction == "ARC":
+            self.cache = ARC(size)
+        elif eviction == "2Q" or eviction == "TwoQ":
+            self.cache = TwoQ(size)
+        elif eviction == "LIRS":
+            self.cache = LIRS(size)
+        elif eviction == "WTinyLFU" or eviction == "W-TinyLFU":
+            self.cache = WTinyLFU(size)
+        elif eviction == "GDSF" or eviction == "GreedyDual":
+            self.cache = GDSF(size)
         else:
             raise ValueError("invalid eviction policy {}".format(eviction))
 
-        if callback is not None:
-            self.cache.add_eviction_callback(callback)
+        # the user callback sees the values, the cost and freshness of a result are
+        # kept in self.meta, which the evictions of the cache clean up
+        self.callback = callback
+        self.cache.add_eviction_callback(self._on_evict)
+
+        self.ttl_sec = ttl_sec if ttl_sec is not None else self.cache.ttl_sec
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = stale_if_error
+        self.revalidate_workers = revalidate_workers
+        self.negative_ttl = negative_ttl if negative_ttl is not None else self.ttl_sec
+        self.cache_exceptions = cache_exceptions
+        self.key_builder = KeyBuilder(digest_threshold, digest_memo_size)
+
+        # key -> cost, or (the time the result stops being fresh, cost) with stale windows
+        self.meta = {}
+        # key -> future of a background recomputation
+        self.inflight = {}
+        self.executor = None
+        # held by the stale path and by the write-back of recomputations
+        self.lock = threading.RLock()
+
+        self.n_stale_hit = 0
+        self.n_stale_error_hit = 0
+
+        # GDSF takes the cost of each result
+        self.cost_aware = isinstance(self.cache, GDSF)
+        # seconds spent in the function, and not spent thanks to hits
+        self.compute_time_sec = 0.0
+        self.time_saved_sec = 0.0
+
+    def _ttl_of(self, value):
+        if value is None or type(value) is _CachedException:
+            return self.negative_ttl
+        return self.ttl_sec
+
+    @staticmethod
+    def _unwrap(value):
+        if type(value) is _CachedException:
+            raise value.exception.with_traceback(None)
+        return value
+
+    def _on_evict(self, key, value, reason="evict"):
+        self.meta.pop(key, None)
+        callback = self.callback
+        if callback is None or type(value) is _CachedException:
+            return
+        if getattr(callback, "takes_reason", False):
+            callback(key, value, reason)
+        elif reason == "evict":
+            callback(key, value)
+
+    _on_evict.takes_reason = True
+
+    def _put(self, key, value, ttl_sec, cost, meta):
+        self.compute_time_sec += cost
+        # before the put, in case it evicts the key
+        self.meta[key] = meta
+        if self.cost_aware:
+            self.cache.put(key, value, ttl_sec, cost)
+        else:
+            self.cache.put(key, value, ttl_sec)
+
+    def clear(self):
+        self.cache.clear()
+        self.meta.clear()
+
+    def _put_fresh(self, key, value, cost, end_time=None):
+        # the value stays in the cache until its stale windows are over,
+        # it is fresh for ttl_sec from the end of the call
+        now = time.time()
+        fresh_until = (end_time if end_time is not None else now) + self._ttl_of(value)
+        keep_sec = fresh_until + max(self.stale_ttl, self.stale_if_error) - now
+        if keep_sec > 0:
+            self._put(key, value, keep_sec, cost, (fresh_until, cost))
+
+    @staticmethod
+    def _timed_call(func, args, kwargs):
+        """returns (value, compute time, the time the call finished)"""
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        return value, time.perf_counter() - start, time.time()
+
+    def _finish(self, key, future):
+        """the done-callback of a background recomputation, writes the result into the cache"""
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if future.exception() is None:
+                self._put_fresh(key, *future.result())
+
+    def _revalidate(self, key, func, args, kwargs):
+        """the caller holds the lock"""
+        if key in self.inflight:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                self.revalidate_workers, thread_name_prefix="cachemon-revalidate"
+            )
+        future = self.executor.submit(self._timed_call, func, args, kwargs)
+        self.inflight[key] = future
+        future.add_done_callback(functools.partial(self._finish, key))
+
+    def _call_stale(self, func, key, args, kwargs):
+        with self.lock:
+            cached = self.cache.get(key, _MISS)
+            now = time.time()
+            if cached is not _MISS:
+                # a value put directly into the cache is fresh
+                fresh_until, cost = self.meta.get(key, _NO_META)
+                if now < fresh_until:
+                    self.time_saved_sec += cost
+                    return self._unwrap(cached)
+                if now - fresh_until < self.stale_ttl:
+                    self.n_stale_hit += 1
+                    self.time_saved_sec += cost
+                    self._revalidate(key, func, args, kwargs)
+                    return self._unwrap(cached)
+
+        start = time.perf_counter()
+        try:
+            value = func(*args, **kwargs)
+        except Exception as e:
+            if cached is not _MISS and now - fresh_until < self.stale_if_error:
+                self.n_stale_error_hit += 1
+                return self._unwrap(cached)
+            if isinstance(e, self.cache_exceptions):
+                with self.lock:
+                    self._put_fresh(key, _CachedException(e), time.perf_counter() - start)
+            raise
+
+        with self.lock:
+            self._put_fresh(key, value, time.perf_counter() - start)
+        return value
+
+    def stats(self):
+        """the calls, hits and the seconds spent in the function and saved by hits"""
+        n_call, n_hit = self.cache.n_get, self.cache.n_hit
+        return {
+            "n_call": n_call,
+            "n_hit": n_hit,
+            "hit_ratio": n_hit / max(n_call, 1),
+            "n_stale_hit": self.n_stale_hit,
+            "n_stale_error_hit": self.n_stale_error_hit,
+            "compute_time_sec": self.compute_time_sec,
+            "time_saved_sec": self.time_saved_sec,
+        }
 
     def __call__(self, func):
+        stale = self.stale_ttl > 0 or self.stale_if_error > 0
+        make_key = self.key_builder.make_key
+
         def wrapper(*args, **kwargs):
-            kwtuple = tuple((key, kwargs[key]) for key in sorted(kwargs.keys()))
-            key = (args, kwtuple)
+            key = make_key(args, kwargs)
+            if stale:
+                return self._call_stale(func, key, args, kwargs)
+
+            value = self.cache.get(key, _MISS)
+            if value is not _MISS:
+                self.time_saved_sec += self.meta.get(key, 0.0)
+                return self._unwrap(value)
+
+            start = time.perf_counter()
             try:
-                value = self.cache[key]
-                return value
-            except KeyError:
-                pass
+                value = func(*args, **kwargs)
+            except self.cache_exceptions as e:
+                cost = time.perf_counter() - start
+                self._put(key, _CachedException(e), self.negative_ttl, cost, cost)
+                raise
 
-            value = func(*args, **kwargs)
-            self.cache[key] = value
+            cost = time.perf_counter() - start
+            self._put(key, value, self._ttl_of(value), cost, cost)
             return value
 
         wrapper.cache = self.cache
+        wrapper.decorator = self
         wrapper.size = self.cache.cache_size
-        wrapper.clear = self.cache.clear
+        wrapper.clear = self.clear
+        wrapper.stats = self.stats
         return functools.update_wrapper(wrapper, func)
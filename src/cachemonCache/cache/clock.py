@@ -3,7 +3,7 @@ import time
 
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
-from .cache import Cache
+from .cache import Cache, _MISS, _FLOAT_SIZE
 
 
 # Class for the doubly-linked-list node objects.
@@ -34,6 +34,7 @@ class Clock(Cache):
         flash_path: str = None,
         ttl_sec: int = sys.maxsize // 10,
         eviction_callback: Callable = None,
+        max_evict_scan: int = None,
         *args,
         **kwargs
     ):
@@ -46,6 +47,8 @@ class Clock(Cache):
             flash_path (str, optional): path to a file on the flash. Defaults to None.
             ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize.
             eviction_callback (Callable, optional): eviction callback. Defaults to None.
+            max_evict_scan (int, optional): the max number of visited bits an eviction clears before it evicts
+                the object at the hand, it bounds the work of a put. Defaults to None (unbounded).
 
         Raises:
             ValueError: _description_
@@ -65,11 +68,18 @@ class Clock(Cache):
         self.clock_buffer = [ClockValueNode() for _ in range(cache_size)]
         self.clock_pointer = 0
 
+        self.max_evict_scan = max_evict_scan
+        self._evict_budget = max_evict_scan if max_evict_scan is not None else sys.maxsize
+
         if flash_size_mb > 0 or flash_path is not None:
             raise ValueError("S3Clock is the only supported flash cache")
 
     def _find_next_available_slot(self):
-        while self.clock_buffer[self.clock_pointer].visited:
+        # past the budget, the hand stops at a visited object and it is evicted,
+        # the bits cleared so far stay cleared for the next puts
+        budget = self._evict_budget
+        while self.clock_buffer[self.clock_pointer].visited and budget > 0:
+            budget -= 1
             self.clock_buffer[self.clock_pointer].visited = False
             self.clock_pointer = (self.clock_pointer + 1) % self.cache_size
 
@@ -79,8 +89,8 @@ class Clock(Cache):
         """
         self.n_put += 1
 
-        if key in self.table:
-            buf_idx = self.table[key]
+        buf_idx = self.table.get(key, _MISS)
+        if buf_idx is not _MISS:
             node = self.clock_buffer[buf_idx]
 
             # Replace the value.
@@ -96,9 +106,14 @@ class Clock(Cache):
         node.value = value
         node.exp_time = time.time() + ttl_sec
 
+        if self.shrinking:
+            # before the new object takes a slot, so the second chances of the
+            # drained objects never evict it, this also brings the hand back
+            # into the ring
+            self._shrink_step()
         self._find_next_available_slot()
         if self.clock_buffer[self.clock_pointer].key is not None:
-            self.evict()
+            self._evict_node(self.clock_buffer[self.clock_pointer])
 
         self.clock_buffer[self.clock_pointer] = node
         self.table[key] = self.clock_pointer
@@ -107,17 +122,16 @@ class Clock(Cache):
     def get(self, key, default=None):
         self.n_get += 1
 
-        if key not in self.table:
+        node_idx = self.table.get(key, _MISS)
+        if node_idx is _MISS:
             return default
-
-        node_idx = self.table[key]
         node = self.clock_buffer[node_idx]
         node.visited = True
 
         if node.exp_time < time.time():
-            del self[key]
-            node.key = None
-            node.value = None
+            self.n_expire += 1
+            self._on_remove(key, node.value, "expire")
+            self._remove(key)
             return default
 
         self.n_hit += 1
@@ -130,19 +144,78 @@ class Clock(Cache):
             the evicted key
         """
 
-        self.n_evict += 1
+        if len(self.table) == 0:
+            return None
+
+        buffer = self.clock_buffer
+        if self.shrinking:
+            # the objects in the slots past the new size go first
+            while len(buffer) > self.cache_size:
+                node = buffer.pop()
+                if node.key is not None:
+                    self.shrinking = len(buffer) > self.cache_size
+                    return self._evict_node(node)
+            self.shrinking = False
+            if self.clock_pointer >= self.cache_size:
+                self.clock_pointer = 0
+
+        # put has already moved the hand to a victim, a direct call has not
+        node = buffer[self.clock_pointer]
+        budget = self._evict_budget
+        while node.key is None or (node.visited and budget > 0):
+            budget -= 1
+            node.visited = False
+            self.clock_pointer = (self.clock_pointer + 1) % self.cache_size
+            node = buffer[self.clock_pointer]
+
+        return self._evict_node(node)
 
-        assert self.clock_buffer[self.clock_pointer].key is not None
+    def _evict_node(self, node: ClockValueNode) -> Any:
+        self.n_evict += 1
 
-        node = self.clock_buffer[self.clock_pointer]
         key_to_evict = node.key
         if self.eviction_callback is not None:
             self.eviction_callback(node.key, node.value)
 
         del self.table[key_to_evict]
+        node.key = None
+        node.value = None
 
         return key_to_evict
 
+    def _resize_queues(self, new_size: int) -> None:
+        # new slots are appended to the ring, the slots past a smaller size are
+        # drained by _shrink_step, the hand is only moved by the request path
+        buffer = self.clock_buffer
+        if len(buffer) < new_size:
+            buffer.extend(ClockValueNode() for _ in range(new_size - len(buffer)))
+
+    def _shrink_step(self) -> None:
+        """remove up to resize_batch slots past the new size, an object in such a slot is
+        evicted, or moved into the ring if it is visited (its second chance)"""
+        buffer = self.clock_buffer
+        if self.clock_pointer >= self.cache_size:
+            self.clock_pointer = 0
+        for _ in range(self.resize_batch):
+            if len(buffer) <= self.cache_size:
+                break
+            node = buffer.pop()
+            if node.key is None:
+                continue
+            if not node.visited:
+                self._evict_node(node)
+                continue
+
+            node.visited = False
+            self._find_next_available_slot()
+            slot = buffer[self.clock_pointer]
+            if slot.key is not None:
+                self._evict_node(slot)
+            buffer[self.clock_pointer] = node
+            self.table[node.key] = self.clock_pointer
+            self.clock_pointer = (self.clock_pointer + 1) % self.cache_size
+        self.shrinking = len(buffer) > self.cache_size
+
     def delete(self, key: Any) -> None:
         """remove the key from the cache
 
@@ -153,13 +226,45 @@ class Clock(Cache):
         self.n_delete += 1
 
         node_idx = self.table[key]
+        self._on_remove(key, self.clock_buffer[node_idx].value, "delete")
+        self._remove(key)
+
+    def _remove(self, key: Any) -> None:
+        node = self.clock_buffer[self.table.pop(key)]
+        node.key = None
+        node.value = None
+        node.exp_time = sys.maxsize
+        node.visited = False
+
+    def clear(self):
+        # a deferred shrink is dropped with the slots past the size
+        self.table.clear()
+        self.clock_buffer = [ClockValueNode() for _ in range(self.cache_size)]
+        self.clock_pointer = 0
+        self.shrinking = False
 
-        if node_idx is not None:
-            self.clock_buffer[node_idx].key = None
-            self.clock_buffer[node_idx].value = None
-            self.clock_buffer[node_idx].exp_time = sys.maxsize
-            self.clock_buffer[node_idx].visited = False
-            del self.table[key]
+    def get_exp_time(self, key, default=None):
+        node_idx = self.table.get(key, _MISS)
+        if node_idx is _MISS:
+            return default
+        return self.clock_buffer[node_idx].exp_time
+
+    def _metadata_bytes(self) -> int:
+        # all slots are preallocated, each table entry holds a buffer index
+        return (
+            sys.getsizeof(self.table)
+            + sys.getsizeof(self.clock_buffer)
+            + len(self.clock_buffer) * sys.getsizeof(ClockValueNode())
+            + len(self.table) * (_FLOAT_SIZE + sys.getsizeof(self.cache_size))
+        )
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the visited keys, then the others"""
+        buffer = self.clock_buffer
+        visited, others = [], []
+        for key, node_idx in self.table.items():
+            (visited if buffer[node_idx].visited else others).append(key)
+        return visited + others
 
     def items(self):
         for key, node_idx in self.table.items():
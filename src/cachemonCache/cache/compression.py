@@ -0,0 +1,217 @@
+"""
+    transparent value compression on top of any cache
+
+    bytes and str values larger than a threshold are stored compressed and
+    decompressed on get, the capacity can be given in bytes of stored values so
+    that the same memory holds more objects, the eviction order is the one of
+    the wrapped cache
+"""
+
+import sys
+import bz2
+import lzma
+import zlib
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache, _MISS
+from .lru import LRU
+from .wrapper import CacheWrapper
+
+
+# name -> (compress, decompress)
+CODECS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+}
+
+
+def register_codec(name: str, compress: Callable, decompress: Callable) -> None:
+    """register a compression codec, both functions take and return bytes"""
+    CODECS[name] = (compress, decompress)
+
+
+class _Compressed(object):
+    """a compressed value, is_str records whether the original value was a str"""
+
+    __slots__ = ("data", "is_str")
+
+    def __init__(self, data: bytes, is_str: bool):
+        self.data = data
+        self.is_str = is_str
+
+
+class CompressedCache(CacheWrapper):
+    def __init__(
+        self,
+        cache: Cache,
+        threshold: int = 1024,
+        codec: str = "zlib",
+        max_bytes: int = 0,
+        side_cache_size: int = 0,
+        sizeof: Callable = sys.getsizeof,
+    ) -> None:
+        """compress the values of a cache
+
+        Args:
+            cache (Cache): the cache that stores the (compressed) values and decides what to evict
+            threshold (int, optional): values of at least this many bytes are compressed. Defaults to 1024.
+            codec (str, optional): a codec registered in CODECS. Defaults to "zlib".
+            max_bytes (int, optional): the capacity in bytes of stored values, 0 to only use the object limit of cache. Defaults to 0.
+            side_cache_size (int, optional): the number of decompressed values of hot objects to keep. Defaults to 0.
+            sizeof (Callable, optional): the size of values that are not bytes or str. Defaults to sys.getsizeof.
+
+        Raises:
+            ValueError: unknown codec
+        """
+        if codec not in CODECS:
+            raise ValueError("unknown codec {}".format(codec))
+
+        super().__init__("Compressed" + cache.name, cache)
+
+        self.threshold = threshold
+        self.codec = codec
+        self.compress, self.decompress = CODECS[codec]
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        # key -> stored size, used for byte accounting
+        self.stored_size = {}
+        self.curr_bytes = 0
+        # the uncompressed size of the values that are stored compressed
+        self.raw_bytes = 0
+
+        self.side_cache = LRU(side_cache_size) if side_cache_size > 0 else None
+
+        self.n_compress = 0
+        self.n_decompress = 0
+        self.n_side_hit = 0
+
+    def _encode(self, value: Any) -> Tuple[Any, int, int]:
+        """
+        Returns:
+            (stored value, stored size, uncompressed size of compressed values)
+        """
+        if isinstance(value, str):
+            if len(value) < self.threshold:
+                return value, self.sizeof(value), 0
+            raw = value.encode("utf-8")
+            is_str = True
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            if len(value) < self.threshold:
+                return value, len(value), 0
+            raw = value
+            is_str = False
+        else:
+            return value, self.sizeof(value), 0
+
+        self.n_compress += 1
+        data = self.compress(raw)
+        if len(data) >= len(raw):
+            # not compressible, keep the original
+            return value, len(raw), 0
+        return _Compressed(data, is_str), len(data), len(raw)
+
+    def _decode(self, stored: Any) -> Any:
+        if type(stored) is not _Compressed:
+            return stored
+        self.n_decompress += 1
+        raw = self.decompress(stored.data)
+        return raw.decode("utf-8") if stored.is_str else raw
+
+    def _forget(self, key: Any) -> None:
+        size = self.stored_size.pop(key, None)
+        if size is not None:
+            self.curr_bytes -= size[0]
+            self.raw_bytes -= size[1]
+        if self.side_cache is not None and key in self.side_cache:
+            self.side_cache.delete(key)
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        stored, size, raw_size = self._encode(value)
+        self._forget(key)
+        self.cache.put(key, stored, ttl_sec)
+        self.stored_size[key] = (size, raw_size)
+        self.curr_bytes += size
+        self.raw_bytes += raw_size
+
+        if self.max_bytes > 0:
+            # stored_size only has live objects, len(cache) may count S3FIFO ghosts
+            while self.curr_bytes > self.max_bytes and len(self.stored_size) > 1:
+                if self.cache.evict() is None:
+                    break
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        if self.side_cache is not None:
+            value = self.side_cache.get(key, _MISS)
+            if value is not _MISS:
+                # the side cache does not know the ttl, ask the wrapped cache
+                if self.cache.get(key, _MISS) is not _MISS:
+                    self.n_hit += 1
+                    self.n_side_hit += 1
+                    return value
+                self._forget(key)
+                return default
+
+        stored = self.cache.get(key, _MISS)
+        if stored is _MISS:
+            # the wrapped cache reports expirations to _on_evict, this only catches
+            # a cache that drops them without calling _on_remove
+            if key in self.stored_size:
+                self._forget(key)
+            return default
+
+        self.n_hit += 1
+        value = self._decode(stored)
+        if self.side_cache is not None and type(stored) is _Compressed:
+            self.side_cache.put(key, value)
+        return value
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+        self.n_delete += 1
+        self.cache.delete(key)
+        self._forget(key)
+
+    def _metadata_bytes(self) -> int:
+        # stored_size maps each key to a (size, raw size) tuple
+        return (
+            super()._metadata_bytes()
+            + sys.getsizeof(self.stored_size)
+            + len(self.stored_size) * sys.getsizeof((0, 0))
+        )
+
+    def _payload_bytes(self, n_sample: int) -> Tuple[int, int]:
+        key_bytes, _ = super()._payload_bytes(n_sample)
+        return key_bytes, self.curr_bytes
+
+    def compression_ratio(self) -> float:
+        """the uncompressed size over the stored size of the compressed values"""
+        compressed_bytes = sum(s for s, raw in self.stored_size.values() if raw > 0)
+        if compressed_bytes == 0:
+            return 1.0
+        return self.raw_bytes / compressed_bytes
+
+    def clear(self):
+        self.cache.clear()
+        self.stored_size.clear()
+        self.curr_bytes = 0
+        self.raw_bytes = 0
+        if self.side_cache is not None:
+            self.side_cache = LRU(self.side_cache.cache_size)
+
+    def __repr__(self):
+        return "CompressedCache({}, codec: {}, bytes: {}/{})".format(
+            self.cache.name, self.codec, self.curr_bytes, self.max_bytes
+        )
@@ -0,0 +1,143 @@
+"""
+    deliver eviction callbacks off the request path
+
+    the cache calls the eviction callback inside put, a DeferredEvictionCallback
+    only appends (key, value, reason) to a bounded queue, a background thread
+    drains the queue and hands the events to the batch callback in batches
+
+    the reason is evict, expire (an expired object found by get) or delete,
+    plain eviction callbacks are only called on evict
+"""
+
+import queue
+import threading
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+OVERFLOW_POLICIES = ("block", "drop", "inline")
+
+
+class DeferredEvictionCallback(object):
+    # the cache also reports expirations and deletes
+    takes_reason = True
+
+    def __init__(
+        self,
+        batch_callback: Callable,
+        max_queue_size: int = 10000,
+        batch_size: int = 128,
+        overflow: str = "block",
+    ) -> None:
+        """create a deferred eviction callback, it can be used anywhere an
+        eviction callback is accepted
+
+        Args:
+            batch_callback (Callable): called with a list of (key, value, reason) tuples on the background thread
+            max_queue_size (int, optional): the max number of pending events. Defaults to 10000.
+            batch_size (int, optional): the max number of events per batch. Defaults to 128.
+            overflow (str, optional): what to do when the queue is full,
+                block: wait for space, drop: discard the event, inline: call the batch callback in the caller. Defaults to "block".
+
+        Raises:
+            ValueError: invalid overflow policy
+        """
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("invalid overflow policy {}".format(overflow))
+
+        self.batch_callback = batch_callback
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.queue = queue.Queue(max_queue_size)
+
+        self.n_event = 0
+        self.n_batch = 0
+        self.n_drop = 0
+        self.n_inline = 0
+        self.n_error = 0
+        self.last_error = None
+
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._drain, name="cachemon-eviction", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, key: Any, value: Any, reason: str = "evict") -> None:
+        self.n_event += 1
+        event = (key, value, reason)
+
+        if self.overflow == "block":
+            self.queue.put(event)
+            return
+
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow == "drop":
+                self.n_drop += 1
+            else:
+                self.n_inline += 1
+                self._deliver([event])
+
+    def _deliver(self, batch: List[Tuple[Any, Any, str]]) -> None:
+        self.n_batch += 1
+        try:
+            self.batch_callback(batch)
+        except Exception as e:
+            # a failing callback must not kill the drain thread
+            self.n_error += 1
+            self.last_error = e
+
+    def _drain(self) -> None:
+        while True:
+            event = self.queue.get()
+            if event is None:
+                self.queue.task_done()
+                return
+
+            batch = [event]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+
+            self._deliver(batch)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def pending(self) -> int:
+        """the number of events waiting in the queue"""
+        return self.queue.qsize()
+
+    def flush(self) -> None:
+        """block until every queued event has been delivered"""
+        if not self._closed:
+            self.queue.join()
+
+    def close(self) -> None:
+        """deliver the pending events and stop the background thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "n_event": self.n_event,
+            "n_batch": self.n_batch,
+            "n_drop": self.n_drop,
+            "n_inline": self.n_inline,
+            "n_error": self.n_error,
+            "n_pending": self.pending(),
+        }
@@ -0,0 +1,186 @@
+"""
+    LRU and FIFO on top of collections.OrderedDict
+
+    the OrderedDict keeps the order in C, move_to_end and popitem(last=False)
+    replace the hand-written linked list, each key maps to a (value, exp_time)
+    tuple instead of a node object
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache, _MISS, _FLOAT_SIZE
+
+
+class _TupleCache(Cache):
+    """a cache whose table maps each key to a (value, exp_time) tuple"""
+
+    def get_exp_time(self, key, default=None):
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+        return entry[1]
+
+    def _metadata_bytes(self) -> int:
+        # each entry is a (value, exp_time) tuple
+        return sys.getsizeof(self.table) + len(self.table) * (
+            sys.getsizeof((None, None)) + _FLOAT_SIZE
+        )
+
+    def items(self):
+        for key, entry in self.table.items():
+            yield key, entry[0]
+
+    def values(self):
+        for entry in self.table.values():
+            yield entry[0]
+
+    def __repr__(self):
+        return "\n".join(
+            "{:<8} value: {}, exp_time: {}".format(key, entry[0], entry[1])
+            for key, entry in self.table.items()
+        )
+
+
+class FastFIFO(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        *args,
+        **kwargs
+    ):
+        """create a FIFO cache backed by an OrderedDict
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            self.__class__.__name__,
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        # key -> (value, exp_time), the oldest key first
+        self.table = OrderedDict()
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        # updating a key keeps its position
+        self.table[key] = (value, time.time() + ttl_sec)
+
+        if len(self.table) > self.cache_size:
+            self.evict()
+            if self.shrinking:
+                self._shrink_step()
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            del self.table[key]
+            return default
+
+        self.n_hit += 1
+        return entry[0]
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key
+        """
+
+        self.n_evict += 1
+
+        key, entry = self.table.popitem(last=False)
+        if self.eviction_callback is not None:
+            self.eviction_callback(key, entry[0])
+
+        return key
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        del self.table[key]
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the most recently inserted (FIFO) or used (LRU) key first"""
+        return list(reversed(self.table))
+
+
+class FastLRU(FastFIFO):
+    """an LRU cache backed by an OrderedDict, the least recently used key first"""
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        table = self.table
+        table[key] = (value, time.time() + ttl_sec)
+        # a new key is already at the end, an updated key becomes the most recent
+        table.move_to_end(key)
+
+        if len(table) > self.cache_size:
+            self.evict()
+            if self.shrinking:
+                self._shrink_step()
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            del self.table[key]
+            return default
+
+        self.table.move_to_end(key)
+        self.n_hit += 1
+        return entry[0]
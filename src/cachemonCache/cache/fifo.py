@@ -3,7 +3,7 @@ import time
 
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
-from .cache import Cache
+from .cache import Cache, _MISS
 
 
 # Class for the doubly-linked-list node objects.
@@ -81,8 +81,8 @@ class FIFO(Cache):
         """
         self.n_put += 1
 
-        if key in self.table:
-            node = self.table[key]
+        node = self.table.get(key, _MISS)
+        if node is not _MISS:
 
             # Replace the value.
             node.key = key
@@ -103,18 +103,20 @@ class FIFO(Cache):
 
         if len(self.table) > self.cache_size:
             self.evict()
+            if self.shrinking:
+                self._shrink_step()
 
     def get(self, key, default=None):
         self.n_get += 1
 
-        if key not in self.table:
+        node = self.table.get(key, _MISS)
+        if node is _MISS:
             return default
 
-        node = self.table[key]
-
         if node.exp_time < time.time():
-            del self[key]
-            self.remove_from_list(node)
+            self.n_expire += 1
+            self._on_remove(key, node.value, "expire")
+            self._remove(key)
             return default
 
         self.n_hit += 1
@@ -154,10 +156,26 @@ class FIFO(Cache):
         self.n_delete += 1
 
         node = self.table[key]
+        self._on_remove(key, node.value, "delete")
+        self._remove(key)
+
+    def _remove(self, key: Any) -> None:
+        node = self.table.pop(key)
+        self.remove_from_list(node)
+
+    def clear(self):
+        self.table.clear()
+        self.head = None
+        self.tail = None
 
-        if node is not None:
-            self.remove_from_list(node)
-            del self.table[key]
+    def keys_by_hotness(self) -> List[Any]:
+        """the keys from the head to the tail"""
+        keys = []
+        node = self.head
+        while node is not None:
+            keys.append(node.key)
+            node = node.next
+        return keys
 
     # Increases the size of the cache by inserting n empty nodes at the tail
     # of the list.
@@ -177,8 +195,9 @@ class FIFO(Cache):
         self.head = node
 
     def remove_from_list(self, node):
-        if node.prev is not None and node.next is not None:
+        if node.prev is not None:
             node.prev.next = node.next
+        if node.next is not None:
             node.next.prev = node.prev
 
         if self.head == node:
@@ -0,0 +1,214 @@
+"""
+    fixed-size keys for large or unhashable function arguments
+
+    cacheDecorator builds the key of a call from its arguments, a large bytes
+    argument would stay in the table as part of the key and a numpy array or a
+    bytearray is not hashable, a KeyBuilder replaces such an argument by a
+    (type, ..., digest) tuple, the digest is a 128-bit hash (xxh3 if xxhash is
+    installed, blake2b otherwise) of a memoryview of the buffer, so the bytes
+    are not copied (unless a numpy array is not contiguous), numpy arrays also
+    keep their dtype and shape, pandas objects are hashed with
+    hash_pandas_object, without importing pandas unless one is passed
+
+    numbers, None and short str and bytes are used as they are, other types get
+    a key function with register_key_function, any other hashable argument is
+    used as it is, and an unhashable one that supports the buffer protocol is
+    digested
+
+    digests can be memoized by id() for inputs that are not modified in place,
+    an entry keeps a weak reference to its object (or the object itself if it
+    does not support weak references, e.g., bytes), so a reused id() never
+    returns the digest of another object
+"""
+
+import array
+import hashlib
+import weakref
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+if xxhash is not None:
+
+    def digest(buffer) -> bytes:
+        """the 128-bit digest of a bytes-like object"""
+        return xxhash.xxh3_128_digest(buffer)
+
+else:
+
+    def digest(buffer) -> bytes:
+        """the 128-bit digest of a bytes-like object"""
+        return hashlib.blake2b(buffer, digest_size=16).digest()
+
+
+# used as they are
+_PLAIN = frozenset((int, float, bool, complex, type(None)))
+
+# type -> key function
+KEY_FUNCTIONS = {}
+# type -> the key function of the type or of its closest registered base, None if there is none
+_RESOLVED = {}
+
+
+def register_key_function(type_: type, func: Callable) -> None:
+    """use func(arg) as the key of arguments of type_ and its subclasses, func returns a hashable"""
+    KEY_FUNCTIONS[type_] = func
+    _RESOLVED.clear()
+
+
+def _resolve(type_: type) -> Optional[Callable]:
+    func = _RESOLVED.get(type_, _RESOLVED)
+    if func is _RESOLVED:
+        func = None
+        for base in type_.__mro__:
+            if base in KEY_FUNCTIONS:
+                func = KEY_FUNCTIONS[base]
+                break
+        _RESOLVED[type_] = func
+    return func
+
+
+def _buffer_key(arg: Any) -> Tuple:
+    view = memoryview(arg)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    # bytes, bytearray and memoryview of the same bytes compare equal, so their keys do too
+    return ("buffer", view.format, view.shape, digest(view))
+
+
+def _ndarray_key(arr) -> Tuple:
+    if not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    # a uint8 view also covers dtypes that memoryview rejects, e.g., datetime64
+    return ("ndarray", arr.dtype.str, arr.shape, digest(arr.reshape(-1).view(np.uint8)))
+
+
+def _pandas_key(obj) -> Tuple:
+    import pandas
+
+    row_hashes = pandas.util.hash_pandas_object(obj, index=True).to_numpy()
+    if isinstance(obj, pandas.DataFrame):
+        schema = tuple((str(name), str(dtype)) for name, dtype in obj.dtypes.items())
+    else:
+        schema = (str(obj.name), str(obj.dtype))
+    return (type(obj).__name__, schema, digest(row_hashes))
+
+
+for _type in (bytes, bytearray, memoryview, array.array):
+    register_key_function(_type, _buffer_key)
+if np is not None:
+    register_key_function(np.ndarray, _ndarray_key)
+
+
+class KeyBuilder(object):
+    def __init__(self, digest_threshold: int = 256, memo_size: int = 0) -> None:
+        """build the keys of function calls
+
+        Args:
+            digest_threshold (int, optional): str and bytes longer than this are digested. Defaults to 256.
+            memo_size (int, optional): the number of digests memoized by id(), only for arguments
+                that are not modified in place, 0 disables it. Defaults to 0.
+        """
+        self.digest_threshold = digest_threshold
+        self.memo_size = memo_size
+        # id -> (weak or strong reference, key)
+        self.memo = {}
+        self.n_digest = 0
+        self.n_memo_hit = 0
+
+    def make_key(self, args: Tuple, kwargs: Dict) -> Tuple:
+        """the key of a call, (args, sorted kwargs items), with large arguments digested"""
+        arg_key = self.arg_key
+        args = tuple([arg if type(arg) in _PLAIN else arg_key(arg) for arg in args])
+        if not kwargs:
+            return args, ()
+        return args, tuple(
+            (name, value if type(value) in _PLAIN else arg_key(value))
+            for name, value in sorted(kwargs.items())
+        )
+
+    def arg_key(self, arg: Any) -> Any:
+        """the part of the key for one argument"""
+        type_ = type(arg)
+        if type_ in _PLAIN:
+            return arg
+        if type_ is str:
+            if len(arg) <= self.digest_threshold:
+                return arg
+            return self._memoized(arg, lambda s: ("str", digest(s.encode("utf-8", "surrogatepass"))))
+        if type_ is bytes and len(arg) <= self.digest_threshold:
+            return arg
+        if type_ is tuple:
+            return tuple([self.arg_key(item) for item in arg])
+
+        func = _resolve(type_)
+        if func is _ndarray_key and arg.dtype.hasobject:
+            # the elements are python objects, there is no buffer to hash
+            items = tuple([self.arg_key(item) for item in arg.ravel().tolist()])
+            return ("ndarray", arg.dtype.str, arg.shape, items)
+        if func is not None:
+            return self._memoized(arg, func)
+        if type_.__module__.startswith("pandas."):
+            return self._memoized(arg, _pandas_key)
+        if type_ is list:
+            return ("list", tuple([self.arg_key(item) for item in arg]))
+        if type_ is dict:
+            # equal dicts built in another order have the same key
+            items = [(key, self.arg_key(value)) for key, value in arg.items()]
+            try:
+                items.sort(key=lambda item: item[0])
+            except TypeError:
+                # keys of mixed types
+                items.sort(key=lambda item: (type(item[0]).__name__, repr(item[0])))
+            return ("dict", tuple(items))
+
+        try:
+            hash(arg)
+            return arg
+        except TypeError:
+            pass
+        try:
+            memoryview(arg).release()
+        except TypeError:
+            raise TypeError(
+                "unhashable argument of type {}, use register_key_function".format(type_.__name__)
+            ) from None
+        return self._memoized(arg, _buffer_key)
+
+    def _memoized(self, arg: Any, func: Callable) -> Any:
+        if self.memo_size <= 0:
+            self.n_digest += 1
+            return func(arg)
+
+        memo = self.memo
+        entry = memo.get(id(arg))
+        if entry is not None:
+            ref = entry[0]
+            if (ref() if type(ref) is weakref.ref else ref) is arg:
+                self.n_memo_hit += 1
+                return entry[1]
+
+        self.n_digest += 1
+        key = func(arg)
+        try:
+            ref = weakref.ref(arg)
+        except TypeError:
+            ref = arg
+        memo[id(arg)] = (ref, key)
+        if len(memo) > self.memo_size:
+            # the oldest entry leaves
+            del memo[next(iter(memo))]
+        return key
+
+    def clear(self) -> None:
+        self.memo.clear()
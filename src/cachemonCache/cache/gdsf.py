@@ -0,0 +1,193 @@
+"""
+    GreedyDual-Size-Frequency [Cherkasova, HP Labs'98], keeps the objects that
+    are expensive to recompute
+
+    every object has a priority L + freq * cost / size, the object with the
+    lowest priority is evicted and its priority becomes the new L, so the
+    objects that are not requested again age out however expensive they were,
+    the cache size is in objects, so the size of every object is 1
+
+    the priorities are kept in a heap, a hit pushes a new (priority, seq, key)
+    and the old one is skipped when it is popped, the heap is rebuilt when it
+    holds twice as many items as the table, the table maps a key to a
+    [value, exp_time, cost, freq, priority, seq] list
+"""
+
+import sys
+import time
+import heapq
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS, _FLOAT_SIZE
+from .fast import _TupleCache
+
+
+class GDSF(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        *args,
+        **kwargs
+    ):
+        """create a GDSF cache, put takes the cost of an object
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            "GDSF",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        self.heap = []
+        # the priority of the last evicted object
+        self.inflation = 0.0
+        self.seq = 0
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def _push(self, key: Any, entry: list) -> None:
+        self.seq += 1
+        entry[5] = self.seq
+        heapq.heappush(self.heap, (entry[4], self.seq, key))
+        if len(self.heap) > 2 * len(self.table) + 64:
+            self.heap = [(e[4], e[5], k) for k, e in self.table.items()]
+            heapq.heapify(self.heap)
+
+    def _hit(self, key: Any, entry: list) -> None:
+        entry[3] += 1
+        entry[4] = self.inflation + entry[3] * entry[2]
+        self._push(key, entry)
+
+    def put(
+        self,
+        key: Any,
+        value: Any,
+        ttl_sec: int = sys.maxsize // 10,
+        cost: float = 1.0,
+    ) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+
+        Args:
+            cost (float, optional): the cost of recomputing the value, e.g., in seconds. Defaults to 1.0.
+        """
+        self.n_put += 1
+
+        table = self.table
+        entry = table.get(key, _MISS)
+        if entry is not _MISS:
+            entry[0] = value
+            entry[1] = time.time() + ttl_sec
+            entry[2] = cost
+            self._hit(key, entry)
+            return
+
+        if len(table) >= self.cache_size:
+            self.evict()
+
+        entry = [value, time.time() + ttl_sec, cost, 1, self.inflation + cost, 0]
+        table[key] = entry
+        self._push(key, entry)
+        if self.shrinking:
+            self._shrink_step()
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            del self.table[key]
+            return default
+
+        self._hit(key, entry)
+        self.n_hit += 1
+        return entry[0]
+
+    def get_cost(self, key, default=None):
+        """return the cost of the key, or default if the key is not in the cache"""
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+        return entry[2]
+
+    def evict(self) -> Any:
+        """evict the object with the lowest priority
+
+        Returns:
+            the evicted key, None if the cache is empty
+        """
+
+        table, heap = self.table, self.heap
+        while len(heap) > 0:
+            priority, seq, key = heapq.heappop(heap)
+            entry = table.get(key, _MISS)
+            if entry is _MISS or entry[5] != seq:
+                # the object has been hit, deleted or evicted since
+                continue
+
+            self.inflation = priority
+            self.n_evict += 1
+            del table[key]
+            if self.eviction_callback is not None:
+                self.eviction_callback(key, entry[0])
+            return key
+
+        return None
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the highest priority first"""
+        return sorted(self.table, key=lambda key: self.table[key][4], reverse=True)
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        # the heap item is skipped when it is popped
+        del self.table[key]
+
+    def clear(self):
+        self.table.clear()
+        self.heap.clear()
+        self.inflation = 0.0
+
+    def _metadata_bytes(self) -> int:
+        # each entry is a list of 6 and has at least one (priority, seq, key) heap item
+        return (
+            sys.getsizeof(self.table)
+            + len(self.table) * (sys.getsizeof([None] * 6) + 3 * _FLOAT_SIZE)
+            + sys.getsizeof(self.heap)
+            + len(self.heap) * sys.getsizeof((None, None, None))
+        )
@@ -0,0 +1,279 @@
+"""
+    shed cache entries when the process is running out of memory
+
+    object-count capacities do not track the bytes of the values, a
+    MemoryGovernor polls the memory of the process (the RSS from
+    /proc/self/statm, the cgroup memory.current, or any probe) on a background
+    thread, above the soft watermark the caches with the lowest priority shed a
+    fraction of their objects, above the hard watermark every cache does, when
+    the memory is back under the soft watermark the capacities grow back
+
+    the governor never touches the cache structures, it lowers the capacity
+    with resize(defer=True) and the request threads evict, in the order of
+    each policy and a batch at a time, on their next puts, freed memory is not
+    always returned to the OS, so the capacity stays lowered until the memory
+    is back under the watermark
+"""
+
+import os
+import threading
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+_CGROUP_V2 = "/sys/fs/cgroup"
+_CGROUP_V1 = "/sys/fs/cgroup/memory"
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    # memory.max is "max" without a limit
+    return int(value) if value.isdigit() else None
+
+
+def rss_bytes() -> int:
+    """the resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError) as e:
+        if psutil is None:
+            raise RuntimeError("/proc/self/statm is not available, install psutil") from e
+        return psutil.Process().memory_info().rss
+
+
+def cgroup_memory_bytes() -> int:
+    """the memory charged to the cgroup of this process (v2 memory.current or v1 memory.usage_in_bytes)"""
+    for path in (
+        _CGROUP_V2 + "/memory.current",
+        _CGROUP_V1 + "/memory.usage_in_bytes",
+    ):
+        value = _read_int(path)
+        if value is not None:
+            return value
+    raise RuntimeError("cgroup memory accounting is not available")
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    """the memory limit of the cgroup, None if there is no limit"""
+    for path in (_CGROUP_V2 + "/memory.max", _CGROUP_V1 + "/memory.limit_in_bytes"):
+        value = _read_int(path)
+        # v1 reports a huge number without a limit
+        if value is not None and value < 1 << 60:
+            return value
+    return None
+
+
+_PROBES = {"rss": rss_bytes, "cgroup": cgroup_memory_bytes}
+
+
+class MemoryGovernor(object):
+    def __init__(
+        self,
+        soft_limit_bytes: int = None,
+        hard_limit_bytes: int = None,
+        probe: Union[str, Callable] = "rss",
+        interval_sec: float = 1.0,
+        soft_fraction: float = 0.05,
+        hard_fraction: float = 0.2,
+        restore_fraction: float = 0.05,
+        evict_batch: int = 64,
+    ) -> None:
+        """create a memory governor, register caches and call start
+
+        Args:
+            soft_limit_bytes (int, optional): above it, the lowest priority caches shed. Defaults to 80% of the cgroup limit.
+            hard_limit_bytes (int, optional): above it, all caches shed. Defaults to 90% of the cgroup limit.
+            probe (Union[str, Callable], optional): rss, cgroup, or a function that returns the used bytes. Defaults to "rss".
+            interval_sec (float, optional): the time between two checks. Defaults to 1.0.
+            soft_fraction (float, optional): the fraction of objects shed per check above the soft watermark. Defaults to 0.05.
+            hard_fraction (float, optional): the fraction of objects shed per check above the hard watermark. Defaults to 0.2.
+            restore_fraction (float, optional): the fraction of the registered capacity given back per check
+                under the soft watermark. Defaults to 0.05.
+            evict_batch (int, optional): the max number of evictions per put while a cache sheds. Defaults to 64.
+
+        Raises:
+            ValueError: no limits and no cgroup limit, or an unknown probe
+        """
+        if soft_limit_bytes is None or hard_limit_bytes is None:
+            limit = cgroup_memory_limit()
+            if limit is None:
+                raise ValueError("no cgroup memory limit, set soft_limit_bytes and hard_limit_bytes")
+            if soft_limit_bytes is None:
+                soft_limit_bytes = int(limit * 0.8)
+            if hard_limit_bytes is None:
+                hard_limit_bytes = int(limit * 0.9)
+        if soft_limit_bytes > hard_limit_bytes:
+            raise ValueError("soft_limit_bytes must not exceed hard_limit_bytes")
+
+        if not callable(probe):
+            if probe not in _PROBES:
+                raise ValueError("unknown probe {}, use rss, cgroup or a callable".format(probe))
+            probe = _PROBES[probe]
+
+        self.soft_limit_bytes = soft_limit_bytes
+        self.hard_limit_bytes = hard_limit_bytes
+        self.probe = probe
+        self.interval_sec = interval_sec
+        self.soft_fraction = soft_fraction
+        self.hard_fraction = hard_fraction
+        self.restore_fraction = restore_fraction
+        self.evict_batch = evict_batch
+
+        # cache -> [priority, registered capacity, min size]
+        self.caches = {}
+        self._lock = threading.Lock()
+
+        self.level = "ok"
+        self.used_bytes = 0
+        self.n_check = 0
+        self.n_soft = 0
+        self.n_hard = 0
+        self.n_restore = 0
+        self.n_shed = 0
+        self.n_error = 0
+        self.last_error = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, cache, priority: int = 0, min_size: int = None) -> "MemoryGovernor":
+        """let the governor shed the objects of a cache
+
+        Args:
+            cache (Cache): the cache
+            priority (int, optional): caches with a lower priority shed first. Defaults to 0.
+            min_size (int, optional): the capacity is never lowered below it. Defaults to min(cache_size, 100).
+        """
+        if min_size is None:
+            min_size = min(cache.cache_size, 100)
+        with self._lock:
+            self.caches[cache] = [priority, cache.cache_size, min_size]
+        return self
+
+    def unregister(self, cache, restore: bool = True) -> None:
+        """stop governing a cache, its registered capacity is given back if restore"""
+        with self._lock:
+            entry = self.caches.pop(cache, None)
+        if entry is not None and restore and cache.cache_size != entry[1]:
+            cache.resize(entry[1], self.evict_batch, defer=True)
+
+    def _resize(self, cache, new_size: int) -> bool:
+        # a cache that fails to resize must not stop the other caches from shedding
+        try:
+            cache.resize(new_size, self.evict_batch, defer=True)
+        except Exception as e:
+            self.n_error += 1
+            self.last_error = e
+            return False
+        return True
+
+    def _shed(self, cache, fraction: float, min_size: int) -> int:
+        n_object = cache._n_object()
+        target = max(min_size, min(cache.cache_size, int(n_object * (1 - fraction))))
+        if target >= cache.cache_size and target >= n_object:
+            return 0
+        if not self._resize(cache, target):
+            return 0
+        return max(0, n_object - target)
+
+    def check(self) -> str:
+        """probe the memory once and shed or restore, the background thread calls it
+        every interval_sec
+
+        Returns:
+            str: the level, ok, soft or hard
+        """
+        self.n_check += 1
+        self.used_bytes = used = self.probe()
+        with self._lock:
+            caches = sorted(self.caches.items(), key=lambda item: item[1][0])
+
+        if used >= self.hard_limit_bytes:
+            self.level = "hard"
+            self.n_hard += 1
+            for cache, (_, _, min_size) in caches:
+                self.n_shed += self._shed(cache, self.hard_fraction, min_size)
+        elif used >= self.soft_limit_bytes:
+            self.level = "soft"
+            self.n_soft += 1
+            # the lowest priority that still has objects to shed
+            for priority in sorted({entry[0] for _, entry in caches}):
+                n_shed = 0
+                for cache, (p, _, min_size) in caches:
+                    if p == priority:
+                        n_shed += self._shed(cache, self.soft_fraction, min_size)
+                if n_shed > 0:
+                    self.n_shed += n_shed
+                    break
+        else:
+            self.level = "ok"
+            # the highest priority grows back first
+            for cache, (_, capacity, _) in reversed(caches):
+                if cache.cache_size < capacity:
+                    step = max(1, int(capacity * self.restore_fraction))
+                    if self._resize(cache, min(capacity, cache.cache_size + step)):
+                        self.n_restore += 1
+        return self.level
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self.check()
+            except Exception as e:
+                # a failing probe must not kill the governor
+                self.n_error += 1
+                self.last_error = e
+
+    def start(self) -> "MemoryGovernor":
+        """start the background thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="cachemon-governor", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """stop the background thread, the capacities stay where they are"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            caches = list(self.caches.items())
+        return {
+            "level": self.level,
+            "used_bytes": self.used_bytes,
+            "soft_limit_bytes": self.soft_limit_bytes,
+            "hard_limit_bytes": self.hard_limit_bytes,
+            "n_check": self.n_check,
+            "n_soft": self.n_soft,
+            "n_hard": self.n_hard,
+            "n_shed": self.n_shed,
+            "n_restore": self.n_restore,
+            "n_error": self.n_error,
+            "caches": [
+                {
+                    "name": cache.name,
+                    "priority": priority,
+                    "cache_size": cache.cache_size,
+                    "registered_size": capacity,
+                    "n_object": cache._n_object(),
+                }
+                for cache, (priority, capacity, _) in caches
+            ],
+        }
@@ -0,0 +1,214 @@
+"""
+    find the hot keys of a live cache with Space-Saving
+
+    Space-Saving [Metwally et al., ICDT'05] keeps at most capacity counters,
+    a key without a counter takes over the counter of the least counted key and
+    inherits its count as the error, so the count of a tracked key overestimates
+    its frequency by at most its error, and a key that is not tracked has been
+    requested at most min_count times, any key requested more than
+    n / capacity times is tracked
+
+    the counters are kept in buckets of equal counts (a dict of dicts), so an
+    increment and a takeover are O(1), the tracker replaces get and put of the
+    cache instance, a request is counted with probability sample_rate (the gaps
+    between counted requests are drawn from a geometric distribution) and the
+    counts are scaled back by 1 / sample_rate, every window_sec the counts
+    (and errors) are multiplied by decay, so old hot keys fade
+"""
+
+import sys
+import math
+import time
+import random
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+class HotKeyTracker(object):
+    def __init__(
+        self,
+        capacity: int = 256,
+        sample_rate: float = 1.0,
+        window_sec: float = 60.0,
+        decay: float = 0.5,
+    ) -> None:
+        """create a tracker, attach it to a cache or call access for each request
+
+        Args:
+            capacity (int, optional): the number of counters, the memory is fixed. Defaults to 256.
+            sample_rate (float, optional): the fraction of requests counted. Defaults to 1.0.
+            window_sec (float, optional): the counts decay every window_sec, None disables decay. Defaults to 60.0.
+            decay (float, optional): the factor applied to the counts at the end of a window. Defaults to 0.5.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if not 0 <= decay < 1:
+            raise ValueError("decay must be in [0, 1)")
+
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.window_sec = window_sec
+        self.decay = decay
+
+        # key -> [count, error]
+        self.counters = {}
+        # count -> {key: None}, the keys with this count
+        self.buckets = {}
+        self.min_count = 0
+        self.window_end = (
+            time.monotonic() + window_sec if window_sec is not None else float("inf")
+        )
+
+        self.cache = None
+        self.n_sampled = 0
+
+    def access(self, key: Any) -> None:
+        """count a request of key"""
+        self.n_sampled += 1
+        # the window is checked every 1024 requests, reading the clock costs as much as counting
+        if self.n_sampled & 1023 == 0 and time.monotonic() >= self.window_end:
+            self._decay()
+
+        counters, buckets = self.counters, self.buckets
+        counter = counters.get(key)
+        if counter is not None:
+            count = counter[0]
+            bucket = buckets[count]
+            if len(bucket) == 1:
+                del buckets[count]
+                if count == self.min_count:
+                    self.min_count = count + 1
+            else:
+                del bucket[key]
+        elif len(counters) < self.capacity:
+            counter = counters[key] = [0, 0]
+            count = 0
+            if len(counters) == self.capacity:
+                # the least count is tracked once every counter is used,
+                # it is the count of this key after the increment
+                self.min_count = 1
+        else:
+            # take over the counter of a least counted key
+            count = self.min_count
+            bucket = buckets[count]
+            victim = bucket.popitem()[0]
+            counter = counters.pop(victim)
+            counter[1] = count
+            counters[key] = counter
+            if len(bucket) == 0:
+                del buckets[count]
+                self.min_count = count + 1
+
+        count += 1
+        counter[0] = count
+        bucket = buckets.get(count)
+        if bucket is None:
+            buckets[count] = {key: None}
+        else:
+            bucket[key] = None
+
+    def _decay(self) -> None:
+        """scale the counts at the end of a window, keys whose count reaches 0 are dropped"""
+        now = time.monotonic()
+        n_window = 1 + int((now - self.window_end) // self.window_sec)
+        self.window_end += n_window * self.window_sec
+        factor = self.decay**n_window
+
+        counters, buckets = {}, {}
+        for key, (count, error) in self.counters.items():
+            count = int(count * factor)
+            if count > 0:
+                counters[key] = [count, int(error * factor)]
+                buckets.setdefault(count, {})[key] = None
+        self.counters, self.buckets = counters, buckets
+        self.min_count = min(buckets) if len(counters) == self.capacity else 0
+
+    def attach(self, cache) -> "HotKeyTracker":
+        """count the gets and puts of a cache, get and put of the instance are replaced"""
+        if self.cache is not None:
+            raise RuntimeError("the tracker is attached to {}".format(self.cache.name))
+        self.cache = cache
+        self._saved = {name: cache.__dict__.get(name) for name in ("get", "put")}
+
+        cache_get = cache.get
+        cache_put = cache.put
+        access = self.access
+
+        if self.sample_rate >= 1:
+
+            def get(key, default=None):
+                access(key)
+                return cache_get(key, default)
+
+            def put(key, value, ttl_sec=sys.maxsize // 10, *args, **kwargs):
+                access(key)
+                return cache_put(key, value, ttl_sec, *args, **kwargs)
+
+        else:
+            # the gap between two sampled requests is geometric, a request that is
+            # not sampled costs the extra call and a decrement, no random number
+            log_skip = math.log(1 - self.sample_rate)
+            rand = random.random
+            countdown = 1
+
+            def sample():
+                nonlocal countdown
+                countdown = int(math.log(1 - rand()) / log_skip) + 1
+
+            def get(key, default=None):
+                nonlocal countdown
+                countdown -= 1
+                if countdown == 0:
+                    sample()
+                    access(key)
+                return cache_get(key, default)
+
+            def put(key, value, ttl_sec=sys.maxsize // 10, *args, **kwargs):
+                nonlocal countdown
+                countdown -= 1
+                if countdown == 0:
+                    sample()
+                    access(key)
+                return cache_put(key, value, ttl_sec, *args, **kwargs)
+
+        cache.get = get
+        cache.put = put
+        return self
+
+    def detach(self) -> None:
+        """stop counting, the cache gets back its methods, detach in the reverse
+        order of attach if the cache has other hooks"""
+        if self.cache is not None:
+            for name, method in self._saved.items():
+                if method is None:
+                    delattr(self.cache, name)
+                else:
+                    setattr(self.cache, name, method)
+            self.cache = None
+
+    def top_keys(self, k: int = 10) -> List[Tuple[Any, float, float]]:
+        """the k most requested keys
+
+        Returns:
+            List[Tuple[Any, float, float]]: (key, count, error) tuples, the most requested first,
+                the number of requests in the current decayed window is between count - error and
+                count, up to the sampling error, counts are scaled by 1 / sample_rate
+        """
+        if time.monotonic() >= self.window_end:
+            self._decay()
+        scale = 1 / self.sample_rate
+        top = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [(key, count * scale, error * scale) for key, (count, error) in top]
+
+    def threshold(self) -> float:
+        """keys that are not tracked have been requested at most this many times"""
+        if len(self.counters) < self.capacity:
+            return 0.0
+        return self.min_count / self.sample_rate
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.buckets.clear()
+        self.min_count = 0
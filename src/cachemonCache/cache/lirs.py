@@ -0,0 +1,243 @@
+"""
+    LIRS, low inter-reference recency set [Jiang and Zhang, SIGMETRICS'02]
+
+    most of the cache holds the LIR objects, the ones with a small reuse
+    distance, the rest (1% by default) holds resident HIR objects in the FIFO
+    queue Q, which is where evictions come from, the stack S orders LIR and
+    recent HIR objects (resident or not) by recency, a HIR object that is hit
+    while it is still in S has a smaller reuse distance than the oldest LIR
+    object, so they swap status, S is pruned so that its bottom is always LIR
+
+    S and Q are OrderedDicts (the oldest key first), the number of non-resident
+    HIR keys in S is capped, the table maps a resident key to a (value, exp_time)
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS
+from .fast import _TupleCache
+
+
+class LIRS(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        hir_ratio: float = 0.01,
+        nonresident_ratio: float = 2.0,
+        *args,
+        **kwargs
+    ):
+        """create a LIRS cache
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+            hir_ratio (float, optional): the fraction of the cache for resident HIR objects. Defaults to 0.01.
+            nonresident_ratio (float, optional): the max non-resident HIR keys in S relative to the cache. Defaults to 2.0.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            "LIRS",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        self.hir_ratio = hir_ratio
+        self.nonresident_ratio = nonresident_ratio
+        self._resize_queues(cache_size)
+        self.stack = OrderedDict()
+        self.queue = OrderedDict()
+        self.lir = set()
+        # the non-resident HIR keys in the stack, the oldest first
+        self.nonresident = OrderedDict()
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def _prune(self) -> None:
+        """remove HIR keys from the bottom of the stack until it is a LIR key"""
+        stack, lir = self.stack, self.lir
+        while len(stack) > 0:
+            key = next(iter(stack))
+            if key in lir:
+                return
+            del stack[key]
+            if key in self.nonresident:
+                del self.nonresident[key]
+
+    def _demote_bottom_lir(self) -> None:
+        """the oldest LIR object becomes a resident HIR object"""
+        key, _ = self.stack.popitem(last=False)
+        self.lir.discard(key)
+        self.queue[key] = None
+        self._prune()
+
+    def _hit(self, key: Any) -> None:
+        stack = self.stack
+        if key in self.lir:
+            at_bottom = next(iter(stack)) == key
+            stack.move_to_end(key)
+            if at_bottom:
+                self._prune()
+        elif key in stack:
+            # a HIR object with a reuse distance shorter than the oldest LIR object
+            stack.move_to_end(key)
+            del self.queue[key]
+            self.lir.add(key)
+            self._demote_bottom_lir()
+        else:
+            stack[key] = None
+            self.queue.move_to_end(key)
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        table = self.table
+        entry = (value, time.time() + ttl_sec)
+        if key in table:
+            table[key] = entry
+            self._hit(key)
+            return
+
+        if len(table) >= self.cache_size:
+            self.evict()
+
+        stack, nonresident = self.stack, self.nonresident
+        if key in nonresident:
+            del nonresident[key]
+            stack.move_to_end(key)
+            self.lir.add(key)
+            if len(self.lir) > self.n_lir_max:
+                self._demote_bottom_lir()
+        elif len(self.lir) < self.n_lir_max:
+            # the cache is warming up
+            stack[key] = None
+            self.lir.add(key)
+        else:
+            stack[key] = None
+            self.queue[key] = None
+
+        table[key] = entry
+
+        # two keys leave while there are too many after a resize
+        for _ in range(2):
+            if len(nonresident) <= self.n_nonresident_max:
+                break
+            old_key, _ = nonresident.popitem(last=False)
+            del stack[old_key]
+
+        if self.shrinking:
+            self._shrink_step()
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            self._remove(key)
+            return default
+
+        self._hit(key)
+        self.n_hit += 1
+        return entry[0]
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key, None if the cache is empty
+        """
+
+        if len(self.lir) > self.n_lir_max:
+            # the cache has shrunk, the LIR set shrinks with it
+            self._demote_bottom_lir()
+
+        if len(self.queue) > 0:
+            key, _ = self.queue.popitem(last=False)
+            if key in self.stack:
+                self.nonresident[key] = None
+        elif len(self.lir) > 0:
+            # no resident HIR object, e.g., after deletes, evict the oldest LIR object
+            key, _ = self.stack.popitem(last=False)
+            self.lir.discard(key)
+            self._prune()
+        else:
+            return None
+
+        self.n_evict += 1
+        value, _ = self.table.pop(key)
+        if self.eviction_callback is not None:
+            self.eviction_callback(key, value)
+
+        return key
+
+    def _resize_queues(self, new_size: int) -> None:
+        self.n_lir_max = max(1, new_size - max(1, int(new_size * self.hir_ratio)))
+        self.n_nonresident_max = max(1, int(new_size * self.nonresident_ratio))
+
+    def _remove(self, key: Any) -> None:
+        del self.table[key]
+        if key in self.lir:
+            self.lir.discard(key)
+        else:
+            del self.queue[key]
+        if key in self.stack:
+            del self.stack[key]
+            self._prune()
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        self._remove(key)
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the LIR keys from the top of the stack, then the resident HIR keys, the most recent first"""
+        lir = self.lir
+        return [key for key in reversed(self.stack) if key in lir] + list(
+            reversed(self.queue)
+        )
+
+    def clear(self):
+        for queue in (self.table, self.stack, self.queue, self.lir, self.nonresident):
+            queue.clear()
+
+    def _metadata_bytes(self) -> int:
+        return super()._metadata_bytes() + sum(
+            sys.getsizeof(queue)
+            for queue in (self.stack, self.queue, self.lir, self.nonresident)
+        )
@@ -36,7 +36,7 @@ import time
 
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
-from .cache import Cache
+from .cache import Cache, _MISS
 
 
 # Class for the doubly-linked-list node objects.
@@ -115,8 +115,8 @@ class LRU(Cache):
 
         self.n_put += 1
 
-        if key in self.table:
-            node = self.table[key]
+        node = self.table.get(key, _MISS)
+        if node is not _MISS:
 
             # Replace the value.
             node.key = key
@@ -141,18 +141,21 @@ class LRU(Cache):
 
         if len(self.table) > self.cache_size:
             self.evict()
+            if self.shrinking:
+                self._shrink_step()
 
     def get(self, key, default=None):
         self.n_get += 1
 
-        if key not in self.table:
+        node = self.table.get(key, _MISS)
+        if node is _MISS:
             return default
-
-        node = self.table[key]
         self.remove_from_list(node)
 
         if node.exp_time < time.time():
-            del self[key]
+            self.n_expire += 1
+            self._on_remove(key, node.value, "expire")
+            self._remove(key)
             return default
 
         self.prepend_to_head(node)
@@ -194,10 +197,26 @@ class LRU(Cache):
         self.n_delete += 1
 
         node = self.table[key]
+        self._on_remove(key, node.value, "delete")
+        self._remove(key)
 
-        if node is not None:
-            self.remove_from_list(node)
-            del self.table[key]
+    def _remove(self, key: Any) -> None:
+        node = self.table.pop(key)
+        self.remove_from_list(node)
+
+    def clear(self):
+        self.table.clear()
+        self.head = None
+        self.tail = None
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the keys from the head to the tail"""
+        keys = []
+        node = self.head
+        while node is not None:
+            keys.append(node.key)
+            node = node.next
+        return keys
 
     # Increases the size of the cache by inserting n empty nodes at the tail
     # of the list.
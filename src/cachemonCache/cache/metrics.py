@@ -0,0 +1,258 @@
+"""
+    export cache counters in the Prometheus / OpenMetrics text format
+
+    caches are registered by name, nothing is added to their request path, the
+    counters stay plain integer attributes of the cache and are only read when
+    the registry is rendered (at scrape time), latency histograms are optional
+    and are fed by the caller with Histogram.observe
+
+    registry = MetricsRegistry()
+    registry.register("sessions", cache)
+    registry.start_http_server(9100)        # GET /metrics
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache
+from .wrapper import CacheWrapper
+from .evictionQueue import DeferredEvictionCallback
+
+
+# seconds, from 1 us to 1 s
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class Histogram(object):
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """a latency histogram with fixed buckets, observe costs a bisect and
+        two increments, the cumulative counts are computed at scrape time
+
+        Args:
+            buckets (Tuple[float, ...], optional): the sorted upper bounds in seconds. Defaults to 1 us ... 1 s.
+        """
+        self.buckets = tuple(sorted(buckets))
+        # the last slot counts the observations above the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        """a context manager that observes the time spent in its block"""
+        return _Timer(self)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, count of observations <= bound) pairs, the last bound is +Inf"""
+        out, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), list(self.counts)):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+class _Timer(object):
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start_time)
+        return False
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: Union[int, float]) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+def _innermost(cache: Cache) -> Cache:
+    while isinstance(cache, CacheWrapper):
+        cache = cache.cache
+    return cache
+
+
+class MetricsRegistry(object):
+    def __init__(self, prefix: str = "cachemon", with_memory: bool = True) -> None:
+        """a set of named caches to export
+
+        Args:
+            prefix (str, optional): the prefix of all metric names. Defaults to "cachemon".
+            with_memory (bool, optional): export the memory_usage() estimate, it samples the cache on each scrape. Defaults to True.
+        """
+        self.prefix = prefix
+        self.with_memory = with_memory
+        self.caches = {}
+        self.histograms = {}
+        self.http_server = None
+
+    def register(self, name: str, cache: Cache) -> None:
+        """export a cache under the label cache="name"
+
+        Raises:
+            ValueError: the name is taken
+        """
+        if name in self.caches:
+            raise ValueError("cache {} is already registered".format(name))
+        self.caches[name] = cache
+
+    def unregister(self, name: str) -> None:
+        self.caches.pop(name, None)
+        self.histograms.pop(name, None)
+
+    def histogram(self, name: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """the request latency histogram of a registered cache, created on first use"""
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(buckets)
+        return self.histograms[name]
+
+    def collect(self) -> List[Tuple[str, str, str, List[Tuple[str, Dict[str, str], Union[int, float]]]]]:
+        """read the counters of all caches
+
+        Returns:
+            a list of (name, type, help, samples) families, a sample is (suffix, labels, value)
+        """
+        requests, puts, deletes, evictions = [], [], [], []
+        objects, capacity, memory = [], [], []
+        queue_depth, queue_dropped, refresh_inflight = [], [], []
+
+        for name, cache in list(self.caches.items()):
+            label = {"cache": name}
+            requests.append(("_total", dict(label, result="hit"), cache.n_hit))
+            requests.append(("_total", dict(label, result="miss"), cache.n_get - cache.n_hit))
+            puts.append(("_total", label, cache.n_put))
+            deletes.append(("_total", label, cache.n_delete))
+            evictions.append(("_total", dict(label, reason="evict"), cache.n_evict))
+            evictions.append(
+                ("_total", dict(label, reason="expire"), getattr(_innermost(cache), "n_expire", 0))
+            )
+            objects.append(("", label, cache._n_object()))
+            capacity.append(("", label, cache.cache_size))
+
+            if self.with_memory:
+                try:
+                    usage = cache.memory_usage(n_sample=100)
+                except RuntimeError:
+                    # the table changed size while it was sampled, skip this scrape
+                    usage = None
+                if usage is not None:
+                    for kind in ("metadata", "key", "value"):
+                        memory.append(("", dict(label, kind=kind), usage[kind + "_bytes"]))
+
+            callback = cache.eviction_callback
+            if isinstance(callback, DeferredEvictionCallback):
+                queue_depth.append(("", label, callback.pending()))
+                queue_dropped.append(("_total", label, callback.n_drop))
+            if cache.refresher is not None:
+                refresh_inflight.append(("", label, len(cache.refresher.inflight)))
+
+        latency = []
+        for name, histogram in list(self.histograms.items()):
+            label = {"cache": name}
+            count = 0
+            for bound, count in histogram.cumulative():
+                latency.append(("_bucket", dict(label, le=_format_value(float(bound))), count))
+            latency.append(("_count", label, count))
+            latency.append(("_sum", label, histogram.sum))
+
+        p = self.prefix
+        families = [
+            (p + "_requests", "counter", "get requests by result", requests),
+            (p + "_puts", "counter", "put requests", puts),
+            (p + "_deletes", "counter", "delete requests", deletes),
+            (p + "_evictions", "counter", "objects removed by eviction or expiration", evictions),
+            (p + "_objects", "gauge", "cached objects", objects),
+            (p + "_capacity_objects", "gauge", "the cache size in objects", capacity),
+            (p + "_memory_bytes", "gauge", "estimated memory by kind", memory),
+            (p + "_eviction_queue_depth", "gauge", "pending deferred eviction callbacks", queue_depth),
+            (p + "_eviction_queue_dropped", "counter", "deferred eviction callbacks dropped on overflow", queue_dropped),
+            (p + "_refresh_inflight", "gauge", "background reloads in flight", refresh_inflight),
+            (p + "_request_duration_seconds", "histogram", "request latency", latency),
+        ]
+        return [family for family in families if len(family[3]) > 0]
+
+    def render(self, openmetrics: bool = False) -> str:
+        """render all caches in the Prometheus text format, or in OpenMetrics
+
+        Args:
+            openmetrics (bool, optional): use the OpenMetrics format. Defaults to False.
+        """
+        lines = []
+        for name, metric_type, help_text, samples in self.collect():
+            # prometheus names counters with their _total suffix
+            family = name if openmetrics or metric_type != "counter" else name + "_total"
+            lines.append("# HELP {} {}".format(family, help_text))
+            lines.append("# TYPE {} {}".format(family, metric_type))
+            for suffix, labels, value in samples:
+                label_str = ",".join(
+                    '{}="{}"'.format(k, _escape(str(v))) for k, v in labels.items()
+                )
+                lines.append("{}{}{{{}}} {}".format(name, suffix, label_str, _format_value(value)))
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int = 9100, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """serve GET /metrics on a daemon thread, the format follows the Accept header
+
+        Args:
+            port (int, optional): the port, 0 picks a free one. Defaults to 9100.
+            addr (str, optional): the address to listen on. Defaults to "127.0.0.1".
+
+        Returns:
+            ThreadingHTTPServer: the server, server_address has the port
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = registry.render(openmetrics).encode()
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type",
+                    OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE,
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.http_server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        self.http_server.daemon_threads = True
+        threading.Thread(
+            target=self.http_server.serve_forever, name="cachemon-metrics", daemon=True
+        ).start()
+        return self.http_server
+
+    def stop_http_server(self) -> None:
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
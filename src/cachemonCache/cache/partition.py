@@ -0,0 +1,208 @@
+"""
+    a cache shared by many tenants, each tenant gets a namespace
+
+    every namespace is a cache of its own with a guaranteed quota, namespaces
+    may grow past their quota while the global budget has room, i.e., they
+    borrow the quota that idle namespaces do not use, when the global budget is
+    exceeded, the namespace that borrows the most evicts first (in the order
+    of its own policy), so a tenant that scans can only evict borrowed space and
+    never the quota of other tenants
+"""
+
+import sys
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache, _MISS
+from .wrapper import CacheWrapper
+from .s3fifo import S3FIFO
+
+
+class Namespace(CacheWrapper):
+    def __init__(self, partition, name: str, cache: Cache, quota: int) -> None:
+        """a namespace of a PartitionedCache, created by PartitionedCache.add_namespace"""
+        super().__init__(name, cache)
+
+        self.partition = partition
+        self.quota = quota
+        self.by_bytes = partition.by_bytes
+
+        # bytes mode only, key -> size
+        self.sizes = {}
+        self.used_bytes = 0
+
+    def used(self) -> int:
+        """the space used, in objects or in bytes"""
+        if self.by_bytes:
+            return self.used_bytes
+        return self.cache._n_object()
+
+    def _forget(self, key: Any) -> None:
+        if self.by_bytes:
+            size = self.sizes.pop(key, None)
+            if size is not None:
+                self.used_bytes -= size
+                self.partition.used_bytes -= size
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        self.cache.put(key, value, ttl_sec)
+        if self.by_bytes:
+            self._forget(key)
+            size = self.partition.sizeof(value)
+            self.sizes[key] = size
+            self.used_bytes += size
+            self.partition.used_bytes += size
+
+        self.partition._enforce(self)
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        value = self.cache.get(key, _MISS)
+        if value is _MISS:
+            # the wrapped cache reports expirations to _on_evict, this only catches
+            # a cache that drops them without calling _on_remove
+            if self.by_bytes and key in self.sizes:
+                self._forget(key)
+            return default
+
+        self.n_hit += 1
+        return value
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+        self.n_delete += 1
+        self.cache.delete(key)
+        self._forget(key)
+
+    def clear(self):
+        while self.used() > 0 and self.cache.evict() is not None:
+            pass
+
+    def hit_ratio(self) -> float:
+        return self.n_hit / max(self.n_get, 1)
+
+    def __repr__(self):
+        return "Namespace({}, {}, used: {}/{})".format(
+            self.name, self.cache.name, self.used(), self.quota
+        )
+
+
+class PartitionedCache(object):
+    def __init__(
+        self,
+        total_size: int,
+        by_bytes: bool = False,
+        sizeof: Callable = sys.getsizeof,
+        default_policy: type = S3FIFO,
+    ) -> None:
+        """create a cache partitioned into namespaces
+
+        Args:
+            total_size (int): the global budget, in objects, or in bytes if by_bytes
+            by_bytes (bool, optional): account quotas in bytes of values instead of objects. Defaults to False.
+            sizeof (Callable, optional): the size of a value in bytes mode. Defaults to sys.getsizeof.
+            default_policy (type, optional): the policy of namespaces created without one. Defaults to S3FIFO.
+        """
+        self.total_size = total_size
+        self.by_bytes = by_bytes
+        self.sizeof = sizeof
+        self.default_policy = default_policy
+
+        self.namespaces = {}
+        self.used_bytes = 0
+        self.n_reclaim = 0
+
+    def add_namespace(
+        self,
+        name: str,
+        quota: int,
+        policy: type = None,
+        max_size: int = None,
+        **policy_kwargs
+    ) -> Namespace:
+        """create a namespace
+
+        Args:
+            name (str): the name of the namespace
+            quota (int): the guaranteed space, in objects or bytes
+            policy (type, optional): the eviction policy. Defaults to default_policy.
+            max_size (int, optional): the max number of objects the namespace can grow to by borrowing,
+                it is the cache_size of its policy (Clock preallocates it). Defaults to total_size in object mode.
+
+        Raises:
+            ValueError: the namespace exists or the quotas exceed the global budget
+
+        Returns:
+            Namespace: the namespace, it has the Cache interface
+        """
+        if name in self.namespaces:
+            raise ValueError("namespace {} exists".format(name))
+        if quota + sum(ns.quota for ns in self.namespaces.values()) > self.total_size:
+            raise ValueError("the quotas exceed the total size {}".format(self.total_size))
+
+        if max_size is None:
+            if self.by_bytes:
+                raise ValueError("max_size (in objects) is required in bytes mode")
+            max_size = self.total_size
+
+        policy = policy if policy is not None else self.default_policy
+        namespace = Namespace(self, name, policy(max_size, **policy_kwargs), quota)
+        self.namespaces[name] = namespace
+        return namespace
+
+    def __getitem__(self, name: str) -> Namespace:
+        return self.namespaces[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.namespaces
+
+    def used(self) -> int:
+        if self.by_bytes:
+            return self.used_bytes
+        return sum(ns.used() for ns in self.namespaces.values())
+
+    def _pick_victim(self, inserting: Namespace) -> Namespace:
+        """the namespace that borrows the most, or the inserting one if no one borrows"""
+        victim, max_borrowed = inserting, 0
+        for ns in self.namespaces.values():
+            borrowed = ns.used() - ns.quota
+            if borrowed > max_borrowed:
+                victim, max_borrowed = ns, borrowed
+        return victim
+
+    def _enforce(self, inserting: Namespace) -> None:
+        while self.used() > self.total_size:
+            victim = self._pick_victim(inserting)
+            if victim is not inserting:
+                self.n_reclaim += 1
+            if victim.cache.evict() is None:
+                break
+
+    def stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """per-namespace stats"""
+        return {
+            name: {
+                "n_get": ns.n_get,
+                "n_hit": ns.n_hit,
+                "hit_ratio": ns.hit_ratio(),
+                "used": ns.used(),
+                "quota": ns.quota,
+                "borrowed": max(0, ns.used() - ns.quota),
+                "n_evict": ns.n_evict,
+            }
+            for name, ns in self.namespaces.items()
+        }
+
+    def __repr__(self):
+        return "PartitionedCache(used: {}/{}, namespaces: {})".format(
+            self.used(), self.total_size, list(self.namespaces.keys())
+        )
@@ -0,0 +1,123 @@
+"""
+    get_or_load with refresh-ahead
+
+    a hit on an entry that is about to expire triggers a background reload
+    using probabilistic early expiration (XFetch), an entry is refreshed early when
+        now - delta * beta * log(rand()) >= exp_time
+    where delta is the observed load time of the key, so expensive and hot keys
+    are refreshed earlier and popular keys do not all expire at the same moment
+
+    the reload runs in a thread pool, the caller keeps getting the old value and
+    the new value is written into the cache as soon as the load finishes, with
+    the ttl counted from that moment, the write-back and get_or_load hold the
+    lock of the refresher, pass the lock that guards the cache if other threads
+    use it directly
+"""
+
+import math
+import time
+import random
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+_MISS = object()
+
+
+class RefreshAheadLoader(object):
+    def __init__(self, cache, max_workers: int = 4, lock: threading.RLock = None) -> None:
+        """create a refresher for a cache
+
+        Args:
+            cache (Cache): the cache to load into
+            max_workers (int, optional): the number of threads that run background reloads. Defaults to 4.
+            lock (threading.RLock, optional): held while the cache is read or written, it must be reentrant. Defaults to a new RLock.
+        """
+
+        self.cache = cache
+        self.lock = lock if lock is not None else threading.RLock()
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="cachemon-refresh"
+        )
+        # key -> the duration of the last load in seconds
+        self.delta = {}
+        # key -> future of a background reload
+        self.inflight = {}
+
+        self.n_load = 0
+        self.n_refresh = 0
+        self.n_refresh_error = 0
+
+    @staticmethod
+    def _load(key: Any, loader: Callable) -> Tuple[Any, float, float]:
+        """returns (value, load time, the time the load finished)"""
+        start_time = time.time()
+        value = loader(key)
+        end_time = time.time()
+        return value, end_time - start_time, end_time
+
+    def _store(self, key: Any, value: Any, delta: float, ttl_sec: float) -> None:
+        """the caller holds the lock"""
+        self.cache.put(key, value, ttl_sec)
+        self.delta[key] = delta
+
+        # drop the load time of keys that have left the cache
+        if len(self.delta) > 2 * self.cache.cache_size:
+            self.delta = {k: d for k, d in self.delta.items() if k in self.cache}
+
+    def _finish(self, key: Any, ttl_sec: int, future) -> None:
+        """the done-callback of a background reload, writes the result into the cache,
+        the ttl starts when the load finished"""
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            try:
+                value, delta, end_time = future.result()
+            except Exception:
+                self.n_refresh_error += 1
+                return
+
+            remaining = ttl_sec - (time.time() - end_time)
+            if remaining > 0:
+                self._store(key, value, delta, remaining)
+
+    def get_or_load(
+        self, key: Any, loader: Callable, ttl_sec: int, beta: float = 1.0
+    ) -> Any:
+        with self.lock:
+            value = self.cache.get(key, _MISS)
+            future = self.inflight.get(key)
+
+            if value is not _MISS:
+                if beta > 0 and future is None:
+                    delta = self.delta.get(key)
+                    if delta is not None:
+                        exp_time = self.cache.get_exp_time(key)
+                        # 1 - random() is in (0, 1], log of it is <= 0
+                        gap = -delta * beta * math.log(1.0 - random.random())
+                        if time.time() + gap >= exp_time:
+                            self.n_refresh += 1
+                            future = self.executor.submit(self._load, key, loader)
+                            self.inflight[key] = future
+                            future.add_done_callback(partial(self._finish, key, ttl_sec))
+                return value
+
+        if future is not None:
+            # a reload is already running, wait for it instead of loading twice,
+            # without the lock, the done-callback takes it
+            try:
+                return future.result()[0]
+            except Exception:
+                pass
+
+        self.n_load += 1
+        value, delta, _ = self._load(key, loader)
+        with self.lock:
+            self._store(key, value, delta, ttl_sec)
+        return value
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
@@ -8,7 +8,7 @@ import time
 from collections import deque
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
-from .cache import Cache
+from .cache import Cache, _MISS
 
 
 # Class for the doubly-linked-list node objects.
@@ -40,6 +40,7 @@ class S3FIFO(Cache):
         flash_path: str = None,
         ttl_sec: int = sys.maxsize // 10,
         eviction_callback: Callable = None,
+        max_evict_scan: int = None,
         *args,
         **kwargs
     ):
@@ -52,6 +53,8 @@ class S3FIFO(Cache):
             flash_path (str, optional): path to a file on the flash. Defaults to None.
             ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
             eviction_callback (Callable, optional): eviction callback. Defaults to None.
+            max_evict_scan (int, optional): the max number of objects an eviction moves within a queue before it
+                evicts the next object regardless of its frequency, it bounds the work of a put. Defaults to None (unbounded).
 
         Raises:
             ValueError: _description_
@@ -76,6 +79,9 @@ class S3FIFO(Cache):
         if self.small_fifo_size < 10:
             raise RuntimeError("S3FIFO needs at least 100 cache size")
 
+        self.max_evict_scan = max_evict_scan
+        self._evict_budget = max_evict_scan if max_evict_scan is not None else sys.maxsize
+
         self.small_fifo = deque()
         self.main_fifo = deque()
         self.ghost_fifo = deque()
@@ -91,8 +97,8 @@ class S3FIFO(Cache):
 
         self.n_put += 1
 
-        if key in self.table:
-            node = self.table[key]
+        node = self.table.get(key, _MISS)
+        if node is not _MISS:
             assert node.key == key
 
             # if key in the table, but freq is -1, it means the key is in the ghost
@@ -127,20 +133,24 @@ class S3FIFO(Cache):
             self.small_fifo.append(new_node)
             self.curr_size += 1
 
-        while self.curr_size > self.cache_size:
+        if self.curr_size > self.cache_size:
             self.evict()
+            if self.shrinking:
+                self._shrink_step()
 
     def evict_small(self) -> Any:
+        budget = self._evict_budget
         while len(self.small_fifo) > 0:
             node = self.small_fifo.popleft()
             if node.freq == -1:
-                # deleted entry
+                # deleted entry, it is no longer in the table
                 assert node.key is None
                 assert node.value is None
-                del self.table[node.key]
+                continue
 
-            elif node.freq >= self.small_to_main_threshold:
+            elif node.freq >= self.small_to_main_threshold and budget > 0:
                 # insert to the main
+                budget -= 1
                 node.freq = 0
                 self.main_fifo.append(node)
                 if len(self.main_fifo) > self.main_fifo_size:
@@ -152,7 +162,11 @@ class S3FIFO(Cache):
                 node.freq = -1
                 node.value = None
                 self.ghost_fifo.append(node)
-                while len(self.ghost_fifo) > self.main_fifo_size:
+                # one ghost leaves per ghost that enters, two while the ghost
+                # queue is over its size after a resize
+                for _ in range(2):
+                    if len(self.ghost_fifo) <= self.main_fifo_size:
+                        break
                     ghost_to_evict = self.ghost_fifo.popleft()
                     if ghost_to_evict.key is not None:
                         del self.table[ghost_to_evict.key]
@@ -160,15 +174,19 @@ class S3FIFO(Cache):
                 return node.key
 
     def evict_large(self) -> Any:
+        # past the budget, the object at the head is evicted, the frequencies
+        # decremented so far are kept, so the demotion is spread over puts
+        budget = self._evict_budget
         while len(self.main_fifo) > 0:
             node = self.main_fifo.popleft()
             if node.freq == -1:
-                # deleted entry
+                # deleted entry, it is no longer in the table
                 assert node.key is None
                 assert node.value is None
-                del self.table[node.key]
+                continue
 
-            elif node.freq >= 1:
+            elif node.freq >= 1 and budget > 0:
+                budget -= 1
                 node.freq -= 1
                 self.main_fifo.append(node)
 
@@ -201,26 +219,66 @@ class S3FIFO(Cache):
         # )
         # print(self.main_fifo)
 
-        self.curr_size -= 1
-        if len(self.small_fifo) > self.small_fifo_size:
-            return self.evict_small()
+        if len(self.small_fifo) > self.small_fifo_size or len(self.main_fifo) == 0:
+            key = self.evict_small()
+            if key is None:
+                # every object in the small queue was moved to the main queue
+                key = self.evict_large()
         else:
-            return self.evict_large()
+            key = self.evict_large()
+
+        if key is not None:
+            self.curr_size -= 1
+        return key
+
+    def _resize_queues(self, new_size: int) -> None:
+        small_fifo_size = int(new_size * self.small_fifo_size_ratio)
+        if small_fifo_size < 10:
+            raise RuntimeError("S3FIFO needs at least 100 cache size")
+        self.small_fifo_size = small_fifo_size
+        self.main_fifo_size = new_size - small_fifo_size
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the main queue, then the small queue, each by frequency and the most recent
+        first, ghost and deleted entries are skipped"""
+        table = self.table
+        keys = []
+        for queue in (self.main_fifo, self.small_fifo):
+            nodes = [
+                node
+                for node in reversed(queue)
+                if node.freq >= 0 and table.get(node.key) is node
+            ]
+            # sorted is stable, equal frequencies keep the most recent first
+            nodes.sort(key=lambda node: node.freq, reverse=True)
+            keys.extend(node.key for node in nodes)
+        return keys
+
+    def _n_object(self) -> int:
+        return self.curr_size
+
+    def _metadata_bytes(self) -> int:
+        # the table also holds the ghost entries
+        return (
+            super()._metadata_bytes()
+            + sys.getsizeof(self.small_fifo)
+            + sys.getsizeof(self.main_fifo)
+            + sys.getsizeof(self.ghost_fifo)
+        )
 
     def get(self, key, default=None):
         self.n_get += 1
 
-        if key not in self.table:
+        node = self.table.get(key, _MISS)
+        if node is _MISS:
             return default
 
-        node = self.table[key]
-
         if node.exp_time < time.time():
-            del self[key]
-            node.freq = -1
-            node.value = None
-            node.key = None
-            self.curr_size -= 1
+            # a ghost was never resident, it is not counted as an expiration
+            if node.freq != -1:
+                self.n_expire += 1
+                self._on_remove(key, node.value, "expire")
+            self._remove(key)
             return default
 
         if node.freq == -1:
@@ -238,13 +296,27 @@ class S3FIFO(Cache):
             key (Any): the key to remove
         """
 
-        self.n_delete += 1
-
         node = self.table[key]
+        if node.freq != -1:
+            self.n_delete += 1
+            self._on_remove(key, node.value, "delete")
+        self._remove(key)
 
-        if node is not None:
-            del self.table[key]
-            node.value = None
-            node.freq = -1
+    def _remove(self, key: Any) -> None:
+        node = self.table.pop(key)
+
+        if node.freq == -1:
+            # a ghost entry, not in the cache
             node.key = None
-            self.curr_size -= 1
+            return
+
+        node.value = None
+        node.freq = -1
+        node.key = None
+        self.curr_size -= 1
+
+    def clear(self):
+        # the ghosts are in the table too
+        for queue in (self.table, self.small_fifo, self.main_fifo, self.ghost_fifo):
+            queue.clear()
+        self.curr_size = 0
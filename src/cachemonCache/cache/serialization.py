@@ -0,0 +1,170 @@
+"""
+    serializers for values that leave the python heap
+
+    a serializer is an (encode, decode) pair registered by name, encode
+    returns a list of frames (bytes-like objects) that are written one after
+    the other, so a large buffer is never concatenated with a header, decode
+    takes the frames joined in one bytes-like object (e.g., a memoryview of
+    the region they were written to) and returns the value
+
+    * raw: bytes-like values are passed through, get returns bytes
+    * pickle: pickle protocol 5, buffers that support out-of-band pickling
+      (numpy arrays, pickle.PickleBuffer) are not copied into the pickle
+      stream, they are separate frames, and decode rebuilds them from slices
+      of the input, so a numpy array is written from and read into its memory
+      without an intermediate copy (the array shares the memory of the input,
+      pass a bytearray to get a writable array)
+    * auto: bytes are passed through, anything else is pickled, a tag byte
+      records which
+    * msgpack: if msgpack is installed
+
+    the frames of pickle are
+    +-----------+-------------+---------------------+---------+----------+-----+
+    | n_buffers | payload len | n_buffers * buf len | payload | buffer 0 | ... |
+    +-----------+-------------+---------------------+---------+----------+-----+
+"""
+
+import pickle
+import struct
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# n_buffers, payload length
+_PICKLE_HEADER = struct.Struct("<IQ")
+
+_TAG_RAW = b"r"
+_TAG_PICKLE = b"p"
+
+# pickle 5 is the first protocol with out-of-band buffers
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def frame_size(frames: List[Any]) -> int:
+    """the number of bytes of a list of frames"""
+    size = 0
+    for frame in frames:
+        size += frame.nbytes if isinstance(frame, memoryview) else len(frame)
+    return size
+
+
+def _raw_encode(value: Any) -> List[Any]:
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        raise TypeError("the raw serializer takes bytes-like values, not {}".format(type(value)))
+    if isinstance(value, memoryview) and (value.format != "B" or value.ndim != 1):
+        # e.g., a view of an array of doubles
+        value = value.cast("B") if value.c_contiguous else memoryview(value.tobytes())
+    return [value]
+
+
+def _raw_decode(data: Any) -> bytes:
+    return data if isinstance(data, bytes) else bytes(data)
+
+
+def _pickle_encode(value: Any) -> List[Any]:
+    buffers = []
+    if _PROTOCOL >= 5:
+        payload = pickle.dumps(value, protocol=_PROTOCOL, buffer_callback=buffers.append)
+    else:
+        payload = pickle.dumps(value, protocol=_PROTOCOL)
+
+    frames = [_PICKLE_HEADER.pack(len(buffers), len(payload))]
+    if len(buffers) == 0:
+        frames.append(payload)
+        return frames
+
+    views = []
+    for buffer in buffers:
+        try:
+            views.append(buffer.raw())
+        except BufferError:
+            # not contiguous, the only case that copies
+            views.append(memoryview(bytes(buffer)))
+    frames.append(struct.pack("<{}Q".format(len(views)), *[view.nbytes for view in views]))
+    frames.append(payload)
+    frames.extend(views)
+    return frames
+
+
+def _pickle_decode(data: Any) -> Any:
+    view = memoryview(data)
+    n_buffers, payload_len = _PICKLE_HEADER.unpack_from(view, 0)
+    pos = _PICKLE_HEADER.size
+    if n_buffers == 0:
+        return pickle.loads(view[pos : pos + payload_len])
+
+    lengths = struct.unpack_from("<{}Q".format(n_buffers), view, pos)
+    pos += 8 * n_buffers
+    payload = view[pos : pos + payload_len]
+    pos += payload_len
+    buffers = []
+    for length in lengths:
+        buffers.append(view[pos : pos + length])
+        pos += length
+    return pickle.loads(payload, buffers=buffers)
+
+
+def _auto_encode(value: Any) -> List[Any]:
+    if isinstance(value, bytes):
+        return [_TAG_RAW, value]
+    return [_TAG_PICKLE] + _pickle_encode(value)
+
+
+def _auto_decode(data: Any) -> Any:
+    view = memoryview(data)
+    if view[:1] == _TAG_RAW:
+        return bytes(view[1:])
+    return _pickle_decode(view[1:])
+
+
+# name -> (encode, decode)
+SERIALIZERS = {
+    "raw": (_raw_encode, _raw_decode),
+    "pickle": (_pickle_encode, _pickle_decode),
+    "auto": (_auto_encode, _auto_decode),
+}
+
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = (
+        lambda value: [msgpack.packb(value, use_bin_type=True)],
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+def register_serializer(name: str, encode: Callable, decode: Callable) -> None:
+    """register a serializer, encode returns a list of bytes-like frames,
+    decode takes the frames joined in one bytes-like object"""
+    SERIALIZERS[name] = (encode, decode)
+
+
+def get_serializer(serializer: Union[str, Tuple[Callable, Callable]]) -> Tuple[Callable, Callable]:
+    """the (encode, decode) pair of a registered name, a (dumps, loads) pair is
+    wrapped so that dumps returns one frame
+
+    Raises:
+        ValueError: unknown serializer
+    """
+    if isinstance(serializer, str):
+        if serializer not in SERIALIZERS:
+            raise ValueError("unknown serializer {}".format(serializer))
+        return SERIALIZERS[serializer]
+    dumps, loads = serializer
+    return (lambda value: [dumps(value)]), loads
+
+
+def dumps(value: Any, serializer: str = "auto") -> bytes:
+    """encode a value into one bytes object"""
+    frames = SERIALIZERS[serializer][0](value)
+    if len(frames) == 1 and isinstance(frames[0], bytes):
+        return frames[0]
+    return b"".join(frames)
+
+
+def loads(data: Any, serializer: str = "auto") -> Any:
+    """decode a value encoded by dumps"""
+    return SERIALIZERS[serializer][1](data)
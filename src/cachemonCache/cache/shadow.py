@@ -0,0 +1,164 @@
+"""
+    estimate the miss ratio of other policies and sizes on live traffic
+
+    a small fraction of the keys, chosen by hash, is replayed into shadow
+    caches that only keep metadata (the values are None), a shadow of size
+    S * rate sees the keys of a cache of size S sampled at rate, so its miss
+    ratio estimates the miss ratio of the full cache [Waldspurger et al.,
+    SHARDS, FAST'15], [Carra et al., miniature simulations, ATC'17]
+
+    memory and CPU are proportional to the sampling rate, a request of a key
+    that is not sampled costs one hash, shadows smaller than min_shadow_size
+    are too small to be accurate and are skipped
+"""
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS
+from .fifo import FIFO
+from .lru import LRU
+from .clock import Clock
+from .s3fifo import S3FIFO
+from .sieve import Sieve
+
+
+# a key is sampled if hash((key,)) mod a prime is below a threshold, hashing
+# the tuple mixes the bits, hash(int) is the int itself and the keys of
+# nearby blocks would be sampled together
+_SAMPLE_MODULUS = 10007
+
+
+class ShadowSimulator(object):
+    def __init__(
+        self,
+        cache_sizes: List[int],
+        policies: List[type] = (FIFO, LRU, Clock, S3FIFO, Sieve),
+        sample_rate: float = 0.01,
+        min_shadow_size: int = 100,
+    ) -> None:
+        """create shadow caches for each (policy, size)
+
+        Args:
+            cache_sizes (List[int]): the cache sizes (in objects) to estimate
+            policies (List[type], optional): the policies to estimate. Defaults to FIFO, LRU, Clock, S3FIFO and Sieve.
+            sample_rate (float, optional): the fraction of keys to simulate. Defaults to 0.01.
+            min_shadow_size (int, optional): sizes whose shadow would be smaller are skipped. Defaults to 100.
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+
+        self.sample_rate = sample_rate
+        self.threshold = max(1, round(sample_rate * _SAMPLE_MODULUS))
+        # the rate that is actually sampled
+        self.rate = self.threshold / _SAMPLE_MODULUS
+
+        self.shadows = {}
+        for policy in policies:
+            for cache_size in sorted(cache_sizes):
+                shadow_size = int(cache_size * self.rate)
+                if shadow_size >= min_shadow_size:
+                    self.shadows[(policy.__name__, cache_size)] = policy(shadow_size)
+        if len(self.shadows) == 0:
+            raise ValueError(
+                "all shadows are smaller than {} objects, use larger sizes or a higher sample_rate".format(
+                    min_shadow_size
+                )
+            )
+
+        self.cache = None
+        self.n_req = 0
+        self.n_sampled = 0
+
+    def access(self, key: Any) -> None:
+        """feed a request to the shadows if the key is sampled"""
+        self.n_req += 1
+        if hash((key,)) % _SAMPLE_MODULUS < self.threshold:
+            self._simulate(key)
+
+    def _simulate(self, key: Any) -> None:
+        self.n_sampled += 1
+        for shadow in self.shadows.values():
+            if shadow.get(key, _MISS) is _MISS:
+                shadow.put(key, None)
+
+    def attach(self, cache) -> "ShadowSimulator":
+        """feed the gets of a live cache to the shadows, the get of the instance is replaced"""
+        if self.cache is not None:
+            raise RuntimeError("the simulator is attached to {}".format(self.cache.name))
+        self.cache = cache
+        self._saved_get = cache.__dict__.get("get")
+
+        cache_get = cache.get
+        threshold = self.threshold
+        simulate = self._simulate
+
+        def get(key, default=None):
+            self.n_req += 1
+            if hash((key,)) % _SAMPLE_MODULUS < threshold:
+                simulate(key)
+            return cache_get(key, default)
+
+        cache.get = get
+        return self
+
+    def detach(self) -> None:
+        """stop feeding the shadows, detach in the reverse order of attach if the
+        cache has other hooks (e.g., a TraceRecorder)"""
+        if self.cache is not None:
+            if self._saved_get is None:
+                del self.cache.get
+            else:
+                self.cache.get = self._saved_get
+            self.cache = None
+
+    def miss_ratios(self) -> Dict[Tuple[str, int], float]:
+        """the estimated miss ratio of each (policy, cache size), the misses are divided
+        by the expected number of sampled requests instead of the sampled ones, which
+        corrects for sampling more or fewer popular keys than expected (SHARDS-adj)"""
+        expected = self.n_req * self.rate
+        if self.n_sampled == 0 or expected == 0:
+            return {}
+        return {
+            key: min(1.0, (shadow.n_get - shadow.n_hit) / expected)
+            for key, shadow in self.shadows.items()
+        }
+
+    def recommend(self, max_miss_ratio: float = None) -> Dict[str, Any]:
+        """summarize the shadows
+
+        Args:
+            max_miss_ratio (float, optional): the target, if given, the smallest (policy, size) that meets it is picked.
+                Defaults to None, which picks the lowest miss ratio at the largest size.
+
+        Returns:
+            Dict: "miss_ratio": {(policy, size): miss ratio}, "best": (policy, size) or None,
+                "n_sampled": the sampled requests, "memory_bytes": the metadata of the shadows
+        """
+        miss_ratios = self.miss_ratios()
+
+        best = None
+        if max_miss_ratio is None:
+            if len(miss_ratios) > 0:
+                max_size = max(size for _, size in miss_ratios)
+                best = min(
+                    (key for key in miss_ratios if key[1] == max_size),
+                    key=lambda key: miss_ratios[key],
+                )
+        else:
+            meets = [key for key, mr in miss_ratios.items() if mr <= max_miss_ratio]
+            if len(meets) > 0:
+                best = min(meets, key=lambda key: (key[1], miss_ratios[key]))
+
+        return {
+            "miss_ratio": miss_ratios,
+            "best": best,
+            "n_sampled": self.n_sampled,
+            "memory_bytes": sum(
+                shadow._metadata_bytes() for shadow in self.shadows.values()
+            ),
+        }
+
+    def __repr__(self):
+        return "\n".join(
+            "{:8} {:>10} miss ratio {:.4f}".format(policy, size, mr)
+            for (policy, size), mr in self.miss_ratios().items()
+        )
@@ -0,0 +1,512 @@
+"""
+    a cache shared by all processes on a host, e.g., pre-fork gunicorn/uwsgi workers
+
+    the whole cache lives in one multiprocessing.shared_memory segment
+    +--------+----------+----------------+------------------+---------------------------+
+    | header | capacity | bucket heads   | slot headers     | value arena               |
+    |        | u4       | n_buckets * i4 | n_slots * SLOT   | n_slots * item_size bytes |
+    +--------+----------+----------------+------------------+---------------------------+
+
+    * the hash index is a fixed array of bucket heads, each bucket is a chain of
+      slots linked through the slot header
+    * the value arena is a single slab class, slot i owns the bytes
+      [i * item_size, (i + 1) * item_size), which holds the encoded key followed
+      by the value
+    * readers take the striped lock of the bucket only, writers take the
+      allocation lock and then at most one striped lock at a time
+    * eviction runs Clock over the slots
+    * the capacity is the max number of objects, at most n_slots, resize
+      changes it in the segment, so every process sees it, a put over the
+      capacity evicts up to resize_batch objects more than it needs
+
+    the cache must be created before the workers are forked so that the
+    segment and the locks are inherited by the children
+
+    values are written with a serializer of cache.serialization, frame by
+    frame, so with "pickle" the buffer of a numpy array is copied once, from
+    the array into the slot, and once back on get
+"""
+
+import sys
+import time
+import pickle
+import struct
+import zlib
+import multiprocessing
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache
+from .serialization import get_serializer, frame_size
+
+
+_MAGIC = b"CMSHM002"
+# magic, n_slots, item_size, n_buckets, n_items, clock_hand, free_head
+_HEADER = struct.Struct("<8sIIIIii")
+# the logical capacity, written by resize only
+_CAPACITY = struct.Struct("<I")
+# next, hash, exp_time, key_len, value_len, used, visited
+_SLOT = struct.Struct("<iIdIIBB2x")
+
+_KEY_BYTES = b"b"
+_KEY_STR = b"s"
+_KEY_PICKLE = b"p"
+
+
+def _encode_key(key: Any) -> bytes:
+    """encode a key into bytes that compare equal in every process,
+    the builtin hash is randomized per interpreter so it cannot be used"""
+
+    if isinstance(key, bytes):
+        return _KEY_BYTES + key
+    if isinstance(key, str):
+        return _KEY_STR + key.encode("utf-8")
+    return _KEY_PICKLE + pickle.dumps(key, protocol=4)
+
+
+def _decode_key(data: bytes) -> Any:
+    tag, payload = data[:1], data[1:]
+    if tag == _KEY_BYTES:
+        return payload
+    if tag == _KEY_STR:
+        return payload.decode("utf-8")
+    return pickle.loads(payload)
+
+
+class SharedMemoryCache(Cache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        item_size: int = 1024,
+        n_locks: int = 64,
+        shm_name: str = None,
+        serializer: Union[str, Tuple[Callable, Callable]] = None,
+        *args,
+        **kwargs
+    ):
+        """create a cache in shared memory, evicting with Clock
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback, called in the process that evicts. Defaults to None.
+            item_size (int, optional): the max size of the encoded key plus the value in bytes. Defaults to 1024.
+            n_locks (int, optional): the number of striped bucket locks. Defaults to 64.
+            shm_name (str, optional): the name of the shared memory segment, a random name is used if None. Defaults to None.
+            serializer (Union[str, Tuple[Callable, Callable]], optional): the name of a registered serializer,
+                e.g., "pickle", or a (dumps, loads) pair, for values that are not bytes-like,
+                without it only bytes-like values are accepted and get returns bytes. Defaults to None.
+
+        Raises:
+            ValueError: flash is not supported
+            RuntimeError: shared memory is not available
+        """
+        super().__init__(
+            "SharedMemory",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+        if shared_memory is None:
+            raise RuntimeError("SharedMemoryCache requires python 3.8+")
+
+        self.item_size = item_size
+        self.n_slots = cache_size
+        self.n_buckets = max(1, cache_size * 2)
+        self.serializer = serializer
+        self._encode, self._decode = get_serializer(
+            serializer if serializer is not None else "raw"
+        )
+        # named serializers decode from a writable copy, so out-of-band buffers
+        # (e.g., numpy arrays) are writable and not copied again, raw returns
+        # bytes, which it would copy out of a bytearray
+        self._copy = bytes if serializer in (None, "raw") or not isinstance(serializer, str) else bytearray
+
+        self.bucket_offset = _HEADER.size + _CAPACITY.size
+        self.slot_offset = self.bucket_offset + self.n_buckets * 4
+        self.arena_offset = self.slot_offset + self.n_slots * _SLOT.size
+        total_size = self.arena_offset + self.n_slots * item_size
+
+        self.shm = shared_memory.SharedMemory(
+            name=shm_name, create=True, size=total_size
+        )
+        self.shm_name = self.shm.name
+        self.buf = self.shm.buf
+
+        # the allocation lock serializes writers, striped locks protect bucket chains
+        self.alloc_lock = multiprocessing.Lock()
+        self.locks = [multiprocessing.Lock() for _ in range(n_locks)]
+
+        self._init_segment()
+
+    def _init_segment(self, capacity: int = None) -> None:
+        buf = self.buf
+        _HEADER.pack_into(
+            buf, 0, _MAGIC, self.n_slots, self.item_size, self.n_buckets, 0, 0, 0
+        )
+        _CAPACITY.pack_into(buf, _HEADER.size, self.n_slots if capacity is None else capacity)
+        struct.pack_into("<{}i".format(self.n_buckets), buf, self.bucket_offset, *([-1] * self.n_buckets))
+        # all slots start on the free list, chained through next
+        for idx in range(self.n_slots):
+            nxt = idx + 1 if idx + 1 < self.n_slots else -1
+            _SLOT.pack_into(buf, self.slot_offset + idx * _SLOT.size, nxt, 0, 0.0, 0, 0, 0, 0)
+
+    # header fields that writers update, always under alloc_lock
+    def _get_header(self) -> tuple:
+        return _HEADER.unpack_from(self.buf, 0)
+
+    def _set_header(self, n_items: int, clock_hand: int, free_head: int) -> None:
+        _HEADER.pack_into(
+            self.buf, 0, _MAGIC, self.n_slots, self.item_size, self.n_buckets,
+            n_items, clock_hand, free_head,
+        )
+
+    def _get_capacity(self) -> int:
+        return _CAPACITY.unpack_from(self.buf, _HEADER.size)[0]
+
+    def _bucket_head(self, bucket: int) -> int:
+        return struct.unpack_from("<i", self.buf, self.bucket_offset + bucket * 4)[0]
+
+    def _set_bucket_head(self, bucket: int, idx: int) -> None:
+        struct.pack_into("<i", self.buf, self.bucket_offset + bucket * 4, idx)
+
+    def _read_slot(self, idx: int) -> tuple:
+        return _SLOT.unpack_from(self.buf, self.slot_offset + idx * _SLOT.size)
+
+    def _write_slot(self, idx, nxt, h, exp_time, key_len, value_len, used, visited):
+        _SLOT.pack_into(
+            self.buf, self.slot_offset + idx * _SLOT.size,
+            nxt, h, exp_time, key_len, value_len, used, visited,
+        )
+
+    def _set_next(self, idx: int, nxt: int) -> None:
+        struct.pack_into("<i", self.buf, self.slot_offset + idx * _SLOT.size, nxt)
+
+    def _set_visited(self, idx: int, visited: int) -> None:
+        # visited is the last byte before the padding
+        struct.pack_into("B", self.buf, self.slot_offset + idx * _SLOT.size + _SLOT.size - 3, visited)
+
+    def _lock_of(self, bucket: int):
+        return self.locks[bucket % len(self.locks)]
+
+    def _find(self, bucket: int, h: int, kbytes: bytes) -> Tuple[int, int]:
+        """find the slot of a key in a bucket chain, the caller holds the bucket lock
+
+        Returns:
+            (idx, prev_idx), idx is -1 if the key is not found
+        """
+        prev, idx = -1, self._bucket_head(bucket)
+        klen = len(kbytes)
+        while idx != -1:
+            nxt, slot_h, _, key_len, _, _, _ = self._read_slot(idx)
+            if slot_h == h and key_len == klen:
+                start = self.arena_offset + idx * self.item_size
+                if self.buf[start : start + klen] == kbytes:
+                    return idx, prev
+            prev, idx = idx, nxt
+        return -1, prev
+
+    def _unlink(self, bucket: int, idx: int, prev: int) -> None:
+        nxt = self._read_slot(idx)[0]
+        if prev == -1:
+            self._set_bucket_head(bucket, nxt)
+        else:
+            self._set_next(prev, nxt)
+
+    def _encode_value(self, value: Any) -> List[Any]:
+        """the frames of a value"""
+        if self.serializer is None and not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError(
+                "SharedMemoryCache stores bytes-like values, provide a serializer for {}".format(
+                    type(value)
+                )
+            )
+        return self._encode(value)
+
+    def _decode_value(self, data: bytes) -> Any:
+        return self._decode(data)
+
+    def _write_frames(self, start: int, frames: List[Any]) -> None:
+        buf = self.buf
+        for frame in frames:
+            size = frame.nbytes if isinstance(frame, memoryview) else len(frame)
+            buf[start : start + size] = frame
+            start += size
+
+    def _hash(self, kbytes: bytes) -> Tuple[int, int]:
+        h = zlib.crc32(kbytes)
+        return h, h % self.n_buckets
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        kbytes = _encode_key(key)
+        h, bucket = self._hash(kbytes)
+        with self._lock_of(bucket):
+            idx, _ = self._find(bucket, h, kbytes)
+            if idx == -1:
+                return default
+            _, _, exp_time, key_len, value_len, _, _ = self._read_slot(idx)
+            if exp_time < time.time():
+                expired = True
+            else:
+                expired = False
+                self._set_visited(idx, 1)
+                start = self.arena_offset + idx * self.item_size + key_len
+                data = self._copy(self.buf[start : start + value_len])
+
+        if expired:
+            self.n_expire += 1
+            self._remove(key, expired_only=True)
+            return default
+
+        self.n_hit += 1
+        return self._decode_value(data)
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        kbytes = _encode_key(key)
+        frames = self._encode_value(value)
+        value_len = frame_size(frames)
+        if len(kbytes) + value_len > self.item_size:
+            raise ValueError(
+                "key and value ({} bytes) do not fit in item_size {}".format(
+                    len(kbytes) + value_len, self.item_size
+                )
+            )
+        h, bucket = self._hash(kbytes)
+        exp_time = time.time() + ttl_sec
+
+        with self.alloc_lock:
+            with self._lock_of(bucket):
+                idx, _ = self._find(bucket, h, kbytes)
+                if idx != -1:
+                    # Replace the value.
+                    nxt = self._read_slot(idx)[0]
+                    self._write_slot(idx, nxt, h, exp_time, len(kbytes), value_len, 1, 1)
+                    start = self.arena_offset + idx * self.item_size + len(kbytes)
+                    self._write_frames(start, frames)
+                    return
+
+            _, _, _, _, n_items, clock_hand, free_head = self._get_header()
+            capacity = self._get_capacity()
+            # one eviction makes room, up to resize_batch more shrink a cache over its capacity
+            n_evict = 0
+            while n_items >= capacity and n_evict <= self.resize_batch:
+                _, idx, clock_hand = self._evict_locked(clock_hand)
+                self._write_slot(idx, free_head, 0, 0.0, 0, 0, 0, 0)
+                free_head = idx
+                n_items -= 1
+                n_evict += 1
+
+            idx = free_head
+            free_head = self._read_slot(idx)[0]
+
+            start = self.arena_offset + idx * self.item_size
+            self.buf[start : start + len(kbytes)] = kbytes
+            self._write_frames(start + len(kbytes), frames)
+
+            with self._lock_of(bucket):
+                self._write_slot(
+                    idx, self._bucket_head(bucket), h, exp_time,
+                    len(kbytes), value_len, 1, 0,
+                )
+                self._set_bucket_head(bucket, idx)
+
+            self._set_header(n_items + 1, clock_hand, free_head)
+        self.shrinking = n_items + 1 > capacity
+
+    def _evict_locked(self, clock_hand: int) -> Tuple[Any, int, int]:
+        """run the clock hand until an unvisited slot is found and free it,
+        the caller holds alloc_lock
+
+        Returns:
+            (evicted key, freed slot idx, new clock hand)
+        """
+
+        self.n_evict += 1
+
+        while True:
+            _, h, _, key_len, value_len, used, visited = self._read_slot(clock_hand)
+            if used and not visited:
+                break
+            if visited:
+                self._set_visited(clock_hand, 0)
+            clock_hand = (clock_hand + 1) % self.n_slots
+
+        idx = clock_hand
+        bucket = h % self.n_buckets
+        start = self.arena_offset + idx * self.item_size
+        with self._lock_of(bucket):
+            kbytes = bytes(self.buf[start : start + key_len])
+            found, prev = self._find(bucket, h, kbytes)
+            assert found == idx
+            if self.eviction_callback is not None:
+                vbytes = bytes(self.buf[start + key_len : start + key_len + value_len])
+            self._unlink(bucket, idx, prev)
+            self._write_slot(idx, -1, 0, 0.0, 0, 0, 0, 0)
+
+        key_to_evict = _decode_key(kbytes)
+        if self.eviction_callback is not None:
+            self.eviction_callback(key_to_evict, self._decode_value(vbytes))
+
+        return key_to_evict, idx, (clock_hand + 1) % self.n_slots
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key
+        """
+
+        with self.alloc_lock:
+            _, _, _, _, n_items, clock_hand, free_head = self._get_header()
+            if n_items == 0:
+                return None
+            key_to_evict, idx, clock_hand = self._evict_locked(clock_hand)
+            self._write_slot(idx, free_head, 0, 0.0, 0, 0, 0, 0)
+            self._set_header(n_items - 1, clock_hand, idx)
+
+        return key_to_evict
+
+    def _resize_queues(self, new_size: int) -> None:
+        # the segment is not resized, the capacity can shrink and grow back up to n_slots
+        if new_size > self.n_slots:
+            raise ValueError(
+                "SharedMemoryCache has {} slots, it cannot grow to {}".format(self.n_slots, new_size)
+            )
+        with self.alloc_lock:
+            _CAPACITY.pack_into(self.buf, _HEADER.size, new_size)
+
+    def _remove(self, key: Any, expired_only: bool = False) -> bool:
+        kbytes = _encode_key(key)
+        h, bucket = self._hash(kbytes)
+        with self.alloc_lock:
+            with self._lock_of(bucket):
+                idx, prev = self._find(bucket, h, kbytes)
+                if idx == -1:
+                    return False
+                _, _, exp_time, key_len, value_len, _, _ = self._read_slot(idx)
+                # another process may have refreshed the key after we saw it expire
+                if expired_only and exp_time >= time.time():
+                    return False
+                report = getattr(self.eviction_callback, "takes_reason", False)
+                if report:
+                    start = self.arena_offset + idx * self.item_size + key_len
+                    vbytes = bytes(self.buf[start : start + value_len])
+                self._unlink(bucket, idx, prev)
+            _, _, _, _, n_items, clock_hand, free_head = self._get_header()
+            self._write_slot(idx, free_head, 0, 0.0, 0, 0, 0, 0)
+            self._set_header(n_items - 1, clock_hand, idx)
+        if report:
+            self._on_remove(key, self._decode_value(vbytes), "expire" if expired_only else "delete")
+        return True
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        if not self._remove(key):
+            raise KeyError(key)
+
+    def get_exp_time(self, key, default=None):
+        kbytes = _encode_key(key)
+        h, bucket = self._hash(kbytes)
+        with self._lock_of(bucket):
+            idx, _ = self._find(bucket, h, kbytes)
+            if idx == -1:
+                return default
+            return self._read_slot(idx)[2]
+
+    def _metadata_bytes(self) -> int:
+        # header, bucket heads and slot headers, all in shared memory
+        return self.arena_offset
+
+    def _iter_slots(self):
+        """yield (key, value) of used slots, a best-effort snapshot"""
+        for idx in range(self.n_slots):
+            _, _, _, key_len, value_len, used, _ = self._read_slot(idx)
+            if not used:
+                continue
+            start = self.arena_offset + idx * self.item_size
+            kbytes = bytes(self.buf[start : start + key_len])
+            vbytes = bytes(self.buf[start + key_len : start + key_len + value_len])
+            yield _decode_key(kbytes), vbytes
+
+    def __len__(self):
+        return self._get_header()[4]
+
+    def __contains__(self, key):
+        kbytes = _encode_key(key)
+        h, bucket = self._hash(kbytes)
+        with self._lock_of(bucket):
+            return self._find(bucket, h, kbytes)[0] != -1
+
+    def __iter__(self):
+        for key, _ in self._iter_slots():
+            yield key
+
+    def keys(self):
+        for key, _ in self._iter_slots():
+            yield key
+
+    def items(self):
+        for key, vbytes in self._iter_slots():
+            yield key, self._decode_value(vbytes)
+
+    def values(self):
+        for _, vbytes in self._iter_slots():
+            yield self._decode_value(vbytes)
+
+    def clear(self):
+        with self.alloc_lock:
+            for lock in self.locks:
+                lock.acquire()
+            try:
+                self._init_segment(self._get_capacity())
+            finally:
+                for lock in self.locks:
+                    lock.release()
+
+    def close(self) -> None:
+        """detach this process from the segment"""
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """destroy the segment, call once from the process that created it"""
+        self.shm.unlink()
+
+    def __repr__(self):
+        return "SharedMemoryCache(name: {}, slots: {}, item_size: {}, items: {})".format(
+            self.shm_name, self.n_slots, self.item_size, len(self)
+        )
@@ -3,17 +3,18 @@ import time
 
 
 from typing import Callable, Optional, Any, List, Tuple, Dict, Union
-from .cache import Cache
+from .cache import Cache, _MISS
 
 
 # Class for the doubly-linked-list node objects.
 class SieveValueNode():
-    __slots__ = ("key", "value", "exp_time", "next", "prev")
+    __slots__ = ("key", "value", "exp_time", "visited", "next", "prev")
 
     def __init__(self):
         self.key = None
         self.value = None
         self.exp_time = sys.maxsize
+        self.visited = False
         self.next = None
         self.prev = None
 
@@ -30,7 +31,9 @@ class Sieve(Cache):
         *args,
         **kwargs
     ):
-        """ create a Sieve cache
+        """create a Sieve cache, objects are kept in insertion order, a hit marks
+        an object visited, a hand moves from the tail to the head and evicts the
+        first object that is not visited, clearing the visited bits it passes
 
         Args:
             cache_size (int): cache size in objects
@@ -57,6 +60,7 @@ class Sieve(Cache):
 
         self.head = None
         self.tail = None
+        self.hand = None
 
         if flash_size_mb > 0 or flash_path is not None:
             raise ValueError("Sieve is the only supported flash cache")
@@ -65,9 +69,10 @@ class Sieve(Cache):
         """insert a key value pair into the cache
         if the key is in the cache, the value will be updated
         """
+        self.n_put += 1
 
-        if key in self.table:
-            node = self.table[key]
+        node = self.table.get(key, _MISS)
+        if node is not _MISS:
 
             # Replace the value.
             node.key = key
@@ -88,6 +93,8 @@ class Sieve(Cache):
 
         if len(self.table) > self.cache_size:
             self.evict()
+            if self.shrinking:
+                self._shrink_step()
 
     def evict(self) -> Any:
         """evict an object from the cache
@@ -96,32 +103,41 @@ class Sieve(Cache):
             the evicted key
         """
 
-        assert self.tail is not None
+        if self.tail is None:
+            return None
 
-        key_to_evict = self.tail.key
+        node = self.hand if self.hand is not None else self.tail
+        while node.visited:
+            node.visited = False
+            node = node.prev if node.prev is not None else self.tail
+
+        self.n_evict += 1
+        self.hand = node.prev
+
+        key_to_evict = node.key
         if self.eviction_callback is not None:
-            self.eviction_callback(self.tail.key, self.tail.value)
+            self.eviction_callback(node.key, node.value)
 
         del self.table[key_to_evict]
-        self.tail = self.tail.prev
-        if self.tail is not None:
-            self.tail.next = None
-        else:
-            self.head = None
+        self.remove_from_list(node)
 
         return key_to_evict
 
     def get(self, key, default=None):
-        if key not in self.table:
-            return default
+        self.n_get += 1
 
-        node = self.table[key]
+        node = self.table.get(key, _MISS)
+        if node is _MISS:
+            return default
 
         if node.exp_time < time.time():
-            del self[key]
-            self.remove_from_list(node)
+            self.n_expire += 1
+            self._on_remove(key, node.value, "expire")
+            self._remove(key)
             return default
 
+        node.visited = True
+        self.n_hit += 1
         return node.value
 
     def delete(self, key: Any) -> None:
@@ -131,11 +147,23 @@ class Sieve(Cache):
             key (Any): the key to remove
         """
 
-        node = self.table[key]
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key].value, "delete")
+        self._remove(key)
 
-        if node is not None:
-            self.remove_from_list(node)
-            del self.table[key]
+    def _remove(self, key: Any) -> None:
+        node = self.table.pop(key)
+        self.remove_from_list(node)
+
+    def keys_by_hotness(self) -> List[Any]:
+        """the visited keys, then the others, each from the head to the tail"""
+        visited, others = [], []
+        node = self.head
+        while node is not None:
+            (visited if node.visited else others).append(node.key)
+            node = node.next
+        return visited + others
 
     # Increases the size of the cache by inserting n empty nodes at the tail
     # of the list.
@@ -155,13 +183,23 @@ class Sieve(Cache):
         self.head = node
 
     def remove_from_list(self, node):
-        if node.prev is not None and node.next is not None:
-            node.prev.next = node.next
-            node.next.prev = node.prev
+        if self.hand is node:
+            self.hand = node.prev
 
-        if self.head == node:
+        if node.prev is not None:
+            node.prev.next = node.next
+        else:
             self.head = node.next
-        if self.tail == node:
+        if node.next is not None:
+            node.next.prev = node.prev
+        else:
             self.tail = node.prev
 
+        node.prev = None
+        node.next = None
 
+    def clear(self):
+        self.table.clear()
+        self.head = None
+        self.tail = None
+        self.hand = None
@@ -0,0 +1,282 @@
+"""
+    keep bytes values off the python heap in a slab arena
+
+    the arena is one anonymous mmap (or bytearray) cut into pages, a page is
+    assigned to a size class on demand and split into chunks of that size,
+    each size class keeps a free list of chunk offsets, the cache only stores
+    a small (offset, length, size class) handle per object and get returns a
+    memoryview of the chunk without copying
+
+    evicted chunks go back to the free list of their class, pages that become
+    empty are given back to the page pool (and to the OS with madvise) when a
+    class runs out of chunks, so the arena size is a hard memory ceiling
+"""
+
+import sys
+import mmap
+from bisect import bisect_left
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache, _MISS
+from .wrapper import CacheWrapper
+
+
+class SlabAllocator(object):
+    def __init__(
+        self,
+        arena_size: int,
+        page_size: int = 1024 * 1024,
+        min_chunk_size: int = 64,
+        growth_factor: float = 1.25,
+        use_mmap: bool = True,
+    ) -> None:
+        """create a slab allocator
+
+        Args:
+            arena_size (int): the size of the arena in bytes, rounded down to pages
+            page_size (int, optional): the size of a page, also the largest chunk. Defaults to 1 MB.
+            min_chunk_size (int, optional): the smallest chunk size. Defaults to 64.
+            growth_factor (float, optional): the ratio between consecutive chunk sizes. Defaults to 1.25.
+            use_mmap (bool, optional): use an anonymous mmap instead of a bytearray. Defaults to True.
+
+        Raises:
+            ValueError: the arena is smaller than a page
+        """
+        self.page_size = page_size
+        self.n_pages = arena_size // page_size
+        if self.n_pages == 0:
+            raise ValueError("arena_size must be at least one page")
+
+        self.arena_size = self.n_pages * page_size
+        if use_mmap:
+            self.arena = mmap.mmap(-1, self.arena_size)
+        else:
+            self.arena = bytearray(self.arena_size)
+        self.view = memoryview(self.arena)
+
+        self.chunk_sizes = []
+        size = min_chunk_size
+        while size < page_size:
+            self.chunk_sizes.append(size)
+            # keep chunks 8-byte aligned
+            size = max(size + 8, int(size * growth_factor) // 8 * 8)
+        self.chunk_sizes.append(page_size)
+
+        self.free_chunks = [[] for _ in self.chunk_sizes]
+        # pop() hands out the lowest page first
+        self.free_pages = list(range(self.n_pages - 1, -1, -1))
+        self.page_class = [-1] * self.n_pages
+        self.page_used = [0] * self.n_pages
+
+        self.used_bytes = 0
+        self.n_reclaim = 0
+
+    def size_class(self, length: int) -> int:
+        cls = bisect_left(self.chunk_sizes, length)
+        if cls == len(self.chunk_sizes):
+            raise ValueError(
+                "value of {} bytes is larger than page size {}".format(
+                    length, self.page_size
+                )
+            )
+        return cls
+
+    def alloc(self, length: int) -> Optional[Tuple[int, int]]:
+        """allocate a chunk for length bytes
+
+        Returns:
+            (offset, size class), or None if the arena is full
+        """
+        cls = self.size_class(length)
+        free = self.free_chunks[cls]
+        if len(free) == 0 and not self._new_page(cls):
+            return None
+
+        offset = free.pop()
+        self.page_used[offset // self.page_size] += 1
+        self.used_bytes += self.chunk_sizes[cls]
+        return offset, cls
+
+    def free(self, offset: int, cls: int) -> None:
+        self.free_chunks[cls].append(offset)
+        self.page_used[offset // self.page_size] -= 1
+        self.used_bytes -= self.chunk_sizes[cls]
+
+    def _new_page(self, cls: int) -> bool:
+        if len(self.free_pages) == 0:
+            self._reclaim_empty_pages()
+            if len(self.free_pages) == 0:
+                return False
+
+        page = self.free_pages.pop()
+        self.page_class[page] = cls
+        chunk_size = self.chunk_sizes[cls]
+        base = page * self.page_size
+        n_chunk = self.page_size // chunk_size
+        # pop() hands out the lowest offset first
+        self.free_chunks[cls].extend(
+            range(base + (n_chunk - 1) * chunk_size, base - 1, -chunk_size)
+        )
+        return True
+
+    def _reclaim_empty_pages(self) -> None:
+        """move pages without live chunks back to the page pool,
+        this lets a size class that runs dry take memory from the others"""
+        empty = set()
+        for page in range(self.n_pages):
+            if self.page_class[page] != -1 and self.page_used[page] == 0:
+                empty.add(page)
+        if len(empty) == 0:
+            return
+
+        self.n_reclaim += 1
+        page_size = self.page_size
+        for cls in {self.page_class[page] for page in empty}:
+            self.free_chunks[cls] = [
+                offset
+                for offset in self.free_chunks[cls]
+                if offset // page_size not in empty
+            ]
+
+        for page in empty:
+            self.page_class[page] = -1
+            self.free_pages.append(page)
+            if isinstance(self.arena, mmap.mmap) and hasattr(self.arena, "madvise"):
+                self.arena.madvise(mmap.MADV_DONTNEED, page * page_size, page_size)
+
+
+class SlabCache(CacheWrapper):
+    def __init__(
+        self,
+        cache: Cache,
+        arena_size_mb: int,
+        page_size: int = 1024 * 1024,
+        min_chunk_size: int = 64,
+        growth_factor: float = 1.25,
+        use_mmap: bool = True,
+    ) -> None:
+        """store the bytes values of a cache in a slab arena
+
+        Args:
+            cache (Cache): the cache that stores the handles and decides what to evict
+            arena_size_mb (int): the arena size in MB, the memory ceiling of the values
+            page_size (int, optional): the size of a page, also the largest value. Defaults to 1 MB.
+            min_chunk_size (int, optional): the smallest chunk size. Defaults to 64.
+            growth_factor (float, optional): the ratio between consecutive chunk sizes. Defaults to 1.25.
+            use_mmap (bool, optional): use an anonymous mmap instead of a bytearray. Defaults to True.
+        """
+        super().__init__("Slab" + cache.name, cache)
+
+        self.allocator = SlabAllocator(
+            arena_size_mb * 1024 * 1024,
+            page_size,
+            min_chunk_size,
+            growth_factor,
+            use_mmap,
+        )
+        # key -> (offset, length, size class)
+        self.handles = {}
+
+    def _decode(self, stored: Tuple[int, int, int]) -> memoryview:
+        offset, length, _ = stored
+        return self.allocator.view[offset : offset + length]
+
+    def _forget(self, key: Any) -> None:
+        handle = self.handles.pop(key, None)
+        if handle is not None:
+            self.allocator.free(handle[0], handle[2])
+
+    def _on_evict(self, key: Any, stored: Any, reason: str = "evict") -> None:
+        if reason == "evict":
+            self.n_evict += 1
+        if self.eviction_callback is not None:
+            # the chunk is reused after this, give the callback a copy
+            value = bytes(self._decode(stored))
+            self._forget(key)
+            if reason == "evict":
+                self.eviction_callback(key, value)
+            else:
+                self._on_remove(key, value, reason)
+        else:
+            self._forget(key)
+
+    _on_evict.takes_reason = True
+
+    def _alloc(self, length: int) -> Tuple[int, int]:
+        while True:
+            chunk = self.allocator.alloc(length)
+            if chunk is not None:
+                return chunk
+            if len(self.handles) == 0 or self.cache.evict() is None:
+                raise MemoryError("slab arena is full")
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError("SlabCache stores bytes-like values, not {}".format(type(value)))
+
+        self.n_put += 1
+
+        length = len(value)
+        offset, cls = self._alloc(length)
+        self.allocator.view[offset : offset + length] = value
+        handle = (offset, length, cls)
+
+        self.cache.put(key, handle, ttl_sec)
+        # the old chunk of the key, unless it was evicted while allocating
+        self._forget(key)
+        self.handles[key] = handle
+
+    def get(self, key, default=None):
+        """return a memoryview of the value, it is valid until the key is updated or evicted"""
+        self.n_get += 1
+
+        handle = self.cache.get(key, _MISS)
+        if handle is _MISS:
+            # the wrapped cache reports expirations to _on_evict, this only catches
+            # a cache that drops them without calling _on_remove
+            if key in self.handles:
+                self._forget(key)
+            return default
+
+        self.n_hit += 1
+        offset, length, _ = handle
+        return self.allocator.view[offset : offset + length]
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+        self.n_delete += 1
+        self.cache.delete(key)
+        self._forget(key)
+
+    def _metadata_bytes(self) -> int:
+        # the handle tuple is shared by the wrapped cache and handles
+        allocator = self.allocator
+        n_free_chunk = sum(len(free) for free in allocator.free_chunks)
+        return (
+            super()._metadata_bytes()
+            + sys.getsizeof(self.handles)
+            + len(self.handles) * sys.getsizeof((0, 0, 0))
+            + n_free_chunk * (8 + sys.getsizeof(self.allocator.arena_size))
+        )
+
+    def _payload_bytes(self, n_sample: int) -> Tuple[int, int]:
+        key_bytes, _ = super()._payload_bytes(n_sample)
+        # the chunks in use, including the unused tail of each chunk
+        return key_bytes, self.allocator.used_bytes
+
+    def clear(self):
+        self.cache.clear()
+        for key in list(self.handles.keys()):
+            self._forget(key)
+
+    def __repr__(self):
+        return "SlabCache({}, used: {}/{} bytes)".format(
+            self.cache.name, self.allocator.used_bytes, self.allocator.arena_size
+        )
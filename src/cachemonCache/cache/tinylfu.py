@@ -0,0 +1,279 @@
+"""
+    W-TinyLFU [Einziger et al., TinyLFU: a highly efficient cache admission
+    policy, ToS'17], the policy of Caffeine
+
+    new objects enter a small LRU window (1% of the cache), an object evicted
+    from the window is admitted to the main SLRU only if it is requested more
+    often than the object the main cache would evict, frequencies come from a
+    count-min sketch of 4 rows whose counters saturate at 15 and are halved
+    every 10 * cache_size increments, so old popularity fades
+
+    the main cache is a segmented LRU, probation (20%) and protected (80%), a
+    hit in probation moves the object to protected, the LRU of protected is
+    demoted back to probation, all queues are OrderedDicts (the least recent
+    key first), the table maps a resident key to a (value, exp_time) tuple
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS
+from .fast import _TupleCache
+
+
+_MASK32 = (1 << 32) - 1
+
+
+class FrequencySketch(object):
+    def __init__(self, cache_size: int, sample_factor: int = 10) -> None:
+        """a count-min sketch of 4 rows of small saturating counters
+
+        Args:
+            cache_size (int): the number of objects whose frequency is tracked
+            sample_factor (int, optional): counters are halved every sample_factor * cache_size increments. Defaults to 10.
+        """
+        width = 1
+        while width < cache_size:
+            width <<= 1
+        self.width = width
+        self.mask = width - 1
+        self.table = [0] * (width * 4)
+        self.sample_size = max(16, sample_factor * cache_size)
+        self.n_increment = 0
+
+    def _indexes(self, key: Any) -> Tuple[int, int, int, int]:
+        # row i uses h1 + i * h2 (Kirsch and Mitzenmacher), hashing the tuple mixes the bits
+        h = hash((key,))
+        h1, h2 = h & _MASK32, ((h >> 32) & _MASK32) | 1
+        mask, width = self.mask, self.width
+        return (
+            h1 & mask,
+            width + ((h1 + h2) & mask),
+            2 * width + ((h1 + 2 * h2) & mask),
+            3 * width + ((h1 + 3 * h2) & mask),
+        )
+
+    def increment(self, key: Any) -> None:
+        table = self.table
+        i0, i1, i2, i3 = self._indexes(key)
+        if table[i0] < 15:
+            table[i0] += 1
+        if table[i1] < 15:
+            table[i1] += 1
+        if table[i2] < 15:
+            table[i2] += 1
+        if table[i3] < 15:
+            table[i3] += 1
+
+        self.n_increment += 1
+        if self.n_increment >= self.sample_size:
+            self.table = [count >> 1 for count in table]
+            self.n_increment //= 2
+
+    def frequency(self, key: Any) -> int:
+        table = self.table
+        i0, i1, i2, i3 = self._indexes(key)
+        return min(table[i0], table[i1], table[i2], table[i3])
+
+
+class WTinyLFU(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        window_ratio: float = 0.01,
+        protected_ratio: float = 0.8,
+        *args,
+        **kwargs
+    ):
+        """create a W-TinyLFU cache
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+            window_ratio (float, optional): the size of the window relative to the cache. Defaults to 0.01.
+            protected_ratio (float, optional): the size of protected relative to the main cache. Defaults to 0.8.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            "WTinyLFU",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        self.window_ratio = window_ratio
+        self.protected_ratio = protected_ratio
+        self._resize_queues(cache_size)
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = FrequencySketch(cache_size)
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def _hit(self, key: Any) -> None:
+        probation, protected = self.probation, self.protected
+        if key in probation:
+            del probation[key]
+            protected[key] = None
+            if len(protected) > self.protected_size:
+                demoted, _ = protected.popitem(last=False)
+                probation[demoted] = None
+        elif key in protected:
+            protected.move_to_end(key)
+        else:
+            self.window.move_to_end(key)
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        table = self.table
+        entry = (value, time.time() + ttl_sec)
+        if key in table:
+            table[key] = entry
+            self._hit(key)
+            return
+
+        table[key] = entry
+        window = self.window
+        window[key] = None
+        if len(window) > self.window_size:
+            candidate, _ = window.popitem(last=False)
+            self._admit(candidate)
+        elif len(table) > self.cache_size:
+            # the window is not full, e.g., after deletes from the window
+            self.evict()
+        if self.shrinking:
+            self._shrink_step()
+
+    def _admit(self, candidate: Any) -> None:
+        """move the candidate from the window to probation, or evict it if it is
+        not requested more often than the victim of the main cache"""
+        probation = self.probation
+        if len(probation) + len(self.protected) < self.main_size:
+            probation[candidate] = None
+            return
+
+        victim_queue = probation if len(probation) > 0 else self.protected
+        victim = next(iter(victim_queue))
+        sketch = self.sketch
+        if sketch.frequency(candidate) > sketch.frequency(victim):
+            del victim_queue[victim]
+            probation[candidate] = None
+            self._evict_key(victim)
+        else:
+            self._evict_key(candidate)
+
+    def _evict_key(self, key: Any) -> Any:
+        self.n_evict += 1
+        value, _ = self.table.pop(key)
+        if self.eviction_callback is not None:
+            self.eviction_callback(key, value)
+        return key
+
+    def get(self, key, default=None):
+        self.n_get += 1
+        self.sketch.increment(key)
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            self._remove(key)
+            return default
+
+        self._hit(key)
+        self.n_hit += 1
+        return entry[0]
+
+    def evict(self) -> Any:
+        """evict an object from the cache, the LRU of probation first
+
+        Returns:
+            the evicted key, None if the cache is empty
+        """
+
+        # after the cache shrinks, the window and protected shrink with it
+        queues = (self.probation, self.protected, self.window)
+        if len(self.window) > self.window_size:
+            queues = (self.window,)
+        elif len(self.protected) > self.protected_size:
+            demoted, _ = self.protected.popitem(last=False)
+            self.probation[demoted] = None
+        for queue in queues:
+            if len(queue) > 0:
+                key, _ = queue.popitem(last=False)
+                return self._evict_key(key)
+        return None
+
+    def _resize_queues(self, new_size: int) -> None:
+        self.window_size = max(1, int(new_size * self.window_ratio))
+        self.main_size = max(1, new_size - self.window_size)
+        self.protected_size = max(1, int(self.main_size * self.protected_ratio))
+
+    def _remove(self, key: Any) -> None:
+        del self.table[key]
+        for queue in (self.window, self.probation, self.protected):
+            if key in queue:
+                del queue[key]
+                return
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        self._remove(key)
+
+    def keys_by_hotness(self) -> List[Any]:
+        """protected, probation, then the window, each the most recent first"""
+        return [
+            key
+            for queue in (self.protected, self.probation, self.window)
+            for key in reversed(queue)
+        ]
+
+    def clear(self):
+        for queue in (self.table, self.window, self.probation, self.protected):
+            queue.clear()
+
+    def _metadata_bytes(self) -> int:
+        return (
+            super()._metadata_bytes()
+            + sum(
+                sys.getsizeof(queue)
+                for queue in (self.window, self.probation, self.protected)
+            )
+            # the counters are small ints, which are shared
+            + sys.getsizeof(self.sketch.table)
+        )
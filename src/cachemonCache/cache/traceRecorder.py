@@ -0,0 +1,322 @@
+"""
+    record the requests of a live cache as an oracleGeneral trace
+
+    a recorder is attached to a cache instance, it replaces get and put of the
+    instance (not of the class) so caches without a recorder are unaffected,
+    a sampled request is packed as a (timestamp, obj_id, size, next_access)
+    record into a preallocated buffer, full buffers are written to the file
+    by a background thread and handed back for reuse, when both buffers are
+    in flight records are dropped rather than blocking the request
+
+    keys are mapped to 64-bit object ids that are the same in every process
+    (hash() of str and bytes is randomized per process), int keys keep their
+    value, str and bytes keys and the repr of other keys are hashed with
+    blake2b, so the traces of several runs or workers can be compared and
+    merged, spatial sampling keeps all requests of a subset of the keys, so the
+    sampled trace has the reuse pattern of the full one, see [Waldspurger et
+    al., SHARDS, FAST'15], the size of a miss is filled in by the put that
+    follows it, next_access is unknown online, it is -1 until the file is
+    annotated with annotate_next_access
+
+    the file can be read by bench/trace_reader.py traceReaderLibcachesim
+"""
+
+import sys
+import time
+import queue
+import hashlib
+import random
+import struct
+import threading
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+_MISS = object()
+
+# timestamp, obj_id, size, next_access_vtime
+_RECORD = struct.Struct("<IQIQ")
+_SIZE = struct.Struct("<I")
+_SIZE_OFFSET = 12
+
+_MASK64 = (1 << 64) - 1
+_MAX_SIZE = (1 << 32) - 1
+_NO_NEXT_ACCESS = _MASK64
+# spatial sampling keeps a key if its mixed object id mod a prime is below a
+# threshold, the id of an int is the int itself and the keys of nearby blocks
+# would be sampled together without the multiplicative mix
+_SAMPLE_MODULUS = 10007
+_GOLDEN64 = 0x9E3779B97F4A7C15
+# the max number of keys whose sampling decision is memoized, the memo is
+# cleared when it is full
+_MAX_MEMO = 1 << 16
+
+
+def _obj_id(key: Any) -> int:
+    """the 64-bit object id of a key, the same in every process"""
+    type_ = type(key)
+    if type_ is int:
+        return key & _MASK64
+    if type_ is str:
+        data = b"s" + key.encode("utf-8", "surrogatepass")
+    elif type_ is bytes:
+        data = b"b" + key
+    else:
+        # e.g., tuples, the repr of the usual key types does not depend on the process
+        data = b"r" + repr(key).encode("utf-8", "surrogatepass")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class TraceRecorder(object):
+    def __init__(
+        self,
+        trace_path: str,
+        sample_rate: float = 1.0,
+        spatial: bool = True,
+        buffer_size: int = 65536,
+        flush_interval_sec: float = 1.0,
+        sizeof: Callable = sys.getsizeof,
+    ) -> None:
+        """create a recorder that writes to trace_path
+
+        Args:
+            trace_path (str): the .oracleGeneral.bin file, it is truncated
+            sample_rate (float, optional): the fraction of requests (or of keys if spatial) to record. Defaults to 1.0.
+            spatial (bool, optional): sample by key hash instead of at random. Defaults to True.
+            buffer_size (int, optional): the number of records per buffer. Defaults to 65536.
+            flush_interval_sec (float, optional): the max delay before a partially filled buffer is written. Defaults to 1.0.
+            sizeof (Callable, optional): the size of a value. Defaults to sys.getsizeof.
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+
+        self.trace_path = trace_path
+        self.sample_rate = sample_rate
+        self.spatial = spatial
+        self.threshold = max(1, round(sample_rate * _SAMPLE_MODULUS))
+        self.capacity = buffer_size
+        self.flush_interval_sec = flush_interval_sec
+        self.sizeof = sizeof
+
+        self.file = open(trace_path, "wb")
+        self.start_time = time.time()
+
+        self.buf = bytearray(buffer_size * _RECORD.size)
+        self.pos = 0
+        self.free_buffers = queue.Queue()
+        self.free_buffers.put(bytearray(buffer_size * _RECORD.size))
+        self.full_buffers = queue.Queue()
+        # obj_id -> the slot of a sampled miss in the current buffer
+        self.miss_slot = {}
+        self._swap_requested = False
+
+        self.cache = None
+        self.n_record = 0
+        self.n_drop = 0
+        self.n_flush = 0
+
+        self._thread = threading.Thread(
+            target=self._drain, name="cachemon-trace", daemon=True
+        )
+        self._thread.start()
+
+    def attach(self, cache) -> "TraceRecorder":
+        """start recording the requests of cache"""
+        if self.cache is not None:
+            raise RuntimeError("the recorder is attached to {}".format(self.cache.name))
+        self.cache = cache
+        self._saved = {name: cache.__dict__.get(name) for name in ("get", "put")}
+
+        cache_get = cache.get
+        cache_put = cache.put
+        threshold = self.threshold
+        rate = self.sample_rate
+        rand = random.random
+        miss_slot = self.miss_slot
+        record = self._record
+        sizeof = self.sizeof
+
+        def fill_size(key, value):
+            """the put that follows a sampled miss is the same access, fill in the size"""
+            slot = miss_slot.pop(_obj_id(key), -1)
+            if slot < 0:
+                return False
+            _SIZE.pack_into(
+                self.buf,
+                slot * _RECORD.size + _SIZE_OFFSET,
+                min(sizeof(value), _MAX_SIZE),
+            )
+            return True
+
+        def record_get(obj_id, value):
+            if value is _MISS:
+                slot = record(obj_id, 0)
+                if slot >= 0:
+                    miss_slot[obj_id] = slot
+            else:
+                record(obj_id, sizeof(value))
+
+        # the sampling test is inlined, it runs on every request, the overhead
+        # of a request that is not sampled is this extra python call
+        if self.spatial:
+
+            # key -> the object id if the key is sampled, -1 if not, the digest
+            # is computed once per key instead of on every request
+            sampled_ids = {}
+
+            def sample(key):
+                obj_id = _obj_id(key)
+                if ((obj_id * _GOLDEN64 & _MASK64) >> 32) % _SAMPLE_MODULUS >= threshold:
+                    obj_id = -1
+                if len(sampled_ids) >= _MAX_MEMO:
+                    sampled_ids.clear()
+                sampled_ids[key] = obj_id
+                return obj_id
+
+            def get(key, default=None):
+                value = cache_get(key, _MISS)
+                obj_id = sampled_ids.get(key)
+                if obj_id is None:
+                    obj_id = sample(key)
+                if obj_id >= 0:
+                    record_get(obj_id, value)
+                return default if value is _MISS else value
+
+            def put(key, value, ttl_sec=sys.maxsize // 10):
+                cache_put(key, value, ttl_sec)
+                obj_id = sampled_ids.get(key)
+                if obj_id is None:
+                    obj_id = sample(key)
+                if obj_id >= 0:
+                    if not (miss_slot and fill_size(key, value)):
+                        record(obj_id, sizeof(value))
+
+        else:
+
+            def get(key, default=None):
+                value = cache_get(key, _MISS)
+                if rand() < rate:
+                    record_get(_obj_id(key), value)
+                return default if value is _MISS else value
+
+            def put(key, value, ttl_sec=sys.maxsize // 10):
+                cache_put(key, value, ttl_sec)
+                if miss_slot and fill_size(key, value):
+                    return
+                if rand() < rate:
+                    record(_obj_id(key), sizeof(value))
+
+        cache.get = get
+        cache.put = put
+        return self
+
+    def detach(self) -> None:
+        """stop recording, the cache gets back its methods, detach in the reverse
+        order of attach if the cache has other hooks"""
+        if self.cache is not None:
+            for name, method in self._saved.items():
+                if method is None:
+                    delattr(self.cache, name)
+                else:
+                    setattr(self.cache, name, method)
+            self.cache = None
+
+    def _record(self, obj_id: int, size: int) -> int:
+        """append a record, return its slot in the current buffer, or -1 if it is dropped"""
+        if self._swap_requested or self.pos == self.capacity:
+            self._swap()
+        if self.buf is None:
+            try:
+                self.buf = self.free_buffers.get_nowait()
+            except queue.Empty:
+                self.n_drop += 1
+                return -1
+
+        slot = self.pos
+        _RECORD.pack_into(
+            self.buf,
+            slot * _RECORD.size,
+            int(time.time() - self.start_time),
+            obj_id,
+            min(size, _MAX_SIZE),
+            _NO_NEXT_ACCESS,
+        )
+        self.pos += 1
+        self.n_record += 1
+        return slot
+
+    def _swap(self) -> None:
+        """hand the current buffer to the writer and continue in the spare one"""
+        self._swap_requested = False
+        if self.buf is None or self.pos == 0:
+            return
+        self.full_buffers.put((self.buf, self.pos))
+        self.miss_slot.clear()
+        self.pos = 0
+        try:
+            self.buf = self.free_buffers.get_nowait()
+        except queue.Empty:
+            self.buf = None
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                item = self.full_buffers.get(timeout=self.flush_interval_sec)
+            except queue.Empty:
+                # the next request hands over the partially filled buffer
+                self._swap_requested = True
+                continue
+
+            if item is None:
+                self.full_buffers.task_done()
+                return
+            buf, n_record = item
+            self.file.write(memoryview(buf)[: n_record * _RECORD.size])
+            self.file.flush()
+            self.n_flush += 1
+            self.free_buffers.put(buf)
+            self.full_buffers.task_done()
+
+    def flush(self) -> None:
+        """write the recorded requests, call it from the thread that uses the cache"""
+        self._swap()
+        self.full_buffers.join()
+
+    def close(self, annotate: bool = False) -> None:
+        """detach, write the remaining records and close the file
+
+        Args:
+            annotate (bool, optional): fill in next_access with annotate_next_access. Defaults to False.
+        """
+        self.detach()
+        self.flush()
+        self.full_buffers.put(None)
+        self._thread.join()
+        self.file.close()
+        if annotate:
+            annotate_next_access(self.trace_path)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "n_record": self.n_record,
+            "n_drop": self.n_drop,
+            "n_flush": self.n_flush,
+        }
+
+
+def annotate_next_access(trace_path: str) -> None:
+    """fill in the next_access_vtime field of a trace in place, it is the index of
+    the next request to the same object, or -1 if there is none"""
+    with open(trace_path, "r+b") as f:
+        data = bytearray(f.read())
+        n_req = len(data) // _RECORD.size
+        next_access = {}
+        for i in range(n_req - 1, -1, -1):
+            offset = i * _RECORD.size
+            ts, obj_id, size, _ = _RECORD.unpack_from(data, offset)
+            _RECORD.pack_into(
+                data, offset, ts, obj_id, size, next_access.get(obj_id, _NO_NEXT_ACCESS)
+            )
+            next_access[obj_id] = i
+        f.seek(0)
+        f.write(data)
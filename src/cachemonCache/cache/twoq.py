@@ -0,0 +1,183 @@
+"""
+    2Q [Johnson and Shasha, VLDB'94], the full version
+
+    new objects enter A1in, a FIFO of 25% of the cache, objects evicted from
+    A1in are remembered in the ghost FIFO A1out (50% of the cache), an object
+    that is requested again while its key is in A1out is inserted into Am, an
+    LRU that holds the rest of the cache, so a scan only flushes A1in
+
+    the queues are OrderedDicts (the oldest key first), the table maps a
+    resident key to a (value, exp_time) tuple
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import _MISS
+from .fast import _TupleCache
+
+
+class TwoQ(_TupleCache):
+    def __init__(
+        self,
+        cache_size: int,
+        dram_size_mb: int = 0,
+        flash_size_mb: int = 0,
+        flash_path: str = None,
+        ttl_sec: int = sys.maxsize // 10,
+        eviction_callback: Callable = None,
+        kin_ratio: float = 0.25,
+        kout_ratio: float = 0.5,
+        *args,
+        **kwargs
+    ):
+        """create a 2Q cache
+
+        Args:
+            cache_size (int): cache size in objects
+            dram_size_mb (int, optional): dram size in MB, if specified, cache_size will be ignored, currently not used. Defaults to 0.
+            flash_size_mb (int, optional): flash size in MB. Defaults to 0.
+            flash_path (str, optional): path to a file on the flash. Defaults to None.
+            ttl_sec (int, optional): the default retention time. Defaults to sys.maxsize // 10.
+            eviction_callback (Callable, optional): eviction callback. Defaults to None.
+            kin_ratio (float, optional): the size of A1in relative to the cache. Defaults to 0.25.
+            kout_ratio (float, optional): the number of A1out ghosts relative to the cache. Defaults to 0.5.
+
+        Raises:
+            ValueError: flash is not supported
+        """
+        super().__init__(
+            "2Q",
+            cache_size,
+            dram_size_mb,
+            flash_size_mb,
+            flash_path,
+            ttl_sec,
+            eviction_callback,
+            *args,
+            **kwargs
+        )
+
+        self.kin_ratio = kin_ratio
+        self.kout_ratio = kout_ratio
+        self.kin = max(1, int(cache_size * kin_ratio))
+        self.kout = max(1, int(cache_size * kout_ratio))
+        self.a1in = OrderedDict()
+        self.a1out = OrderedDict()
+        self.am = OrderedDict()
+
+        if flash_size_mb > 0 or flash_path is not None:
+            raise ValueError("S3FIFO is the only supported flash cache")
+
+    def put(self, key: Any, value: Any, ttl_sec: int = sys.maxsize // 10) -> None:
+        """insert a key value pair into the cache
+        if the key is in the cache, the value will be updated
+        """
+        self.n_put += 1
+
+        table = self.table
+        entry = (value, time.time() + ttl_sec)
+        if key in table:
+            table[key] = entry
+            if key in self.am:
+                self.am.move_to_end(key)
+            return
+
+        if len(table) >= self.cache_size:
+            self.evict()
+
+        a1out = self.a1out
+        if key in a1out:
+            del a1out[key]
+            self.am[key] = None
+        else:
+            self.a1in[key] = None
+        table[key] = entry
+        if self.shrinking:
+            self._shrink_step()
+
+    def get(self, key, default=None):
+        self.n_get += 1
+
+        entry = self.table.get(key, _MISS)
+        if entry is _MISS:
+            return default
+
+        if entry[1] < time.time():
+            self.n_expire += 1
+            self._on_remove(key, entry[0], "expire")
+            self._remove(key)
+            return default
+
+        # a hit in a1in does not change its position
+        am = self.am
+        if key in am:
+            am.move_to_end(key)
+        self.n_hit += 1
+        return entry[0]
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key, None if the cache is empty
+        """
+
+        a1in, am = self.a1in, self.am
+        if len(a1in) > self.kin or (len(am) == 0 and len(a1in) > 0):
+            key, _ = a1in.popitem(last=False)
+            a1out = self.a1out
+            a1out[key] = None
+            # two ghosts leave while a1out is over its size after a resize
+            for _ in range(2):
+                if len(a1out) > self.kout:
+                    a1out.popitem(last=False)
+        elif len(am) > 0:
+            key, _ = am.popitem(last=False)
+        else:
+            return None
+
+        self.n_evict += 1
+        value, _ = self.table.pop(key)
+        if self.eviction_callback is not None:
+            self.eviction_callback(key, value)
+
+        return key
+
+    def _resize_queues(self, new_size: int) -> None:
+        self.kin = max(1, int(new_size * self.kin_ratio))
+        self.kout = max(1, int(new_size * self.kout_ratio))
+
+    def _remove(self, key: Any) -> None:
+        del self.table[key]
+        if key in self.am:
+            del self.am[key]
+        else:
+            del self.a1in[key]
+
+    def delete(self, key: Any) -> None:
+        """remove the key from the cache
+
+        Args:
+            key (Any): the key to remove
+        """
+
+        self.n_delete += 1
+
+        self._on_remove(key, self.table[key][0], "delete")
+        self._remove(key)
+
+    def keys_by_hotness(self) -> List[Any]:
+        """Am (requested again), then A1in, each the most recent first"""
+        return list(reversed(self.am)) + list(reversed(self.a1in))
+
+    def clear(self):
+        for queue in (self.table, self.a1in, self.a1out, self.am):
+            queue.clear()
+
+    def _metadata_bytes(self) -> int:
+        return super()._metadata_bytes() + sum(
+            sys.getsizeof(queue) for queue in (self.a1in, self.a1out, self.am)
+        )
@@ -0,0 +1,321 @@
+"""
+    warm up a cache after a restart from the keys that were hot before it
+
+    values cannot always be snapshotted (they may be unpicklable or too large),
+    the keys can, a HotKeyPersister periodically writes the resident keys in
+    the order of keys_by_hotness (e.g., the main queue of S3FIFO by frequency,
+    the head of LRU, the visited objects of Clock) to a file with a serializer
+    of cache.serialization, the write goes to a temporary file that replaces
+    the old one, so a crash never leaves a partial list, the cache is not
+    thread-safe, pass the lock that guards it if it is serving
+
+    on startup a Preloader calls a loader for the saved keys, the hottest
+    first, on a bounded thread pool and at most max_per_sec loads per second,
+    so the origin sees a steady trickle instead of a miss storm, the results
+    are inserted by the thread that runs the preloader, a batch of keys at a
+    time as soon as its loads are done, and the coldest first in a batch, so
+    the cache fills as the loads progress and the hottest key of a batch is
+    the last one FIFO, LRU or S3FIFO evict among it, keys that the traffic has
+    inserted in the meantime are not overwritten, the cache is not
+    thread-safe, so run the preloader before serving, or pass the lock that
+    guards the cache
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .serialization import get_serializer
+
+
+def save_hot_keys(
+    cache,
+    path: str,
+    max_keys: int = None,
+    serializer: str = "pickle",
+    lock: threading.Lock = None,
+) -> int:
+    """write the cached keys, the hottest first, to path
+
+    Args:
+        cache (Cache): the cache
+        path (str): the file, replaced atomically
+        max_keys (int, optional): keep only the hottest max_keys. Defaults to None (all).
+        serializer (str, optional): a registered serializer, e.g., "msgpack" for str keys. Defaults to "pickle".
+        lock (threading.Lock, optional): held while the keys are listed, if the cache is serving. Defaults to None.
+
+    Returns:
+        int: the number of keys written
+    """
+    if lock is not None:
+        lock.acquire()
+    try:
+        keys = cache.keys_by_hotness()
+    finally:
+        if lock is not None:
+            lock.release()
+    if max_keys is not None:
+        keys = keys[:max_keys]
+
+    tmp_path = "{}.tmp.{}".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.writelines(get_serializer(serializer)[0](keys))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def load_hot_keys(path: str, serializer: str = "pickle") -> List[Any]:
+    """the keys written by save_hot_keys, the hottest first, an empty list if there is no file"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    return list(get_serializer(serializer)[1](data))
+
+
+class HotKeyPersister(object):
+    def __init__(
+        self,
+        cache,
+        path: str,
+        interval_sec: float = 60.0,
+        max_keys: int = None,
+        serializer: str = "pickle",
+        lock: threading.Lock = None,
+    ) -> None:
+        """periodically save the hot keys of a cache, call start
+
+        Args:
+            cache (Cache): the cache
+            path (str): the file
+            interval_sec (float, optional): the time between two saves. Defaults to 60.0.
+            max_keys (int, optional): keep only the hottest max_keys. Defaults to None (all).
+            serializer (str, optional): a registered serializer. Defaults to "pickle".
+            lock (threading.Lock, optional): held while the keys are listed, if the cache is serving. Defaults to None.
+        """
+        self.cache = cache
+        self.path = path
+        self.interval_sec = interval_sec
+        self.max_keys = max_keys
+        self.serializer = serializer
+        self.lock = lock
+
+        self.n_save = 0
+        self.n_key = 0
+        self.n_error = 0
+        self.last_error = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def save(self) -> int:
+        """save the hot keys now"""
+        self.n_key = save_hot_keys(
+            self.cache, self.path, self.max_keys, self.serializer, self.lock
+        )
+        self.n_save += 1
+        return self.n_key
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self.save()
+            except Exception as e:
+                # e.g., the disk is full, the next save retries
+                self.n_error += 1
+                self.last_error = e
+
+    def start(self) -> "HotKeyPersister":
+        """start the background thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="cachemon-hot-keys", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, save: bool = True) -> None:
+        """stop the background thread, and save the hot keys a last time if save,
+        call it on shutdown"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if save:
+            self.save()
+
+
+class Preloader(object):
+    def __init__(
+        self,
+        cache,
+        loader: Callable,
+        max_workers: int = 4,
+        max_per_sec: float = None,
+        ttl_sec: int = None,
+        lock: threading.Lock = None,
+        batch_size: int = 64,
+    ) -> None:
+        """load keys into a cache, call run or start
+
+        Args:
+            cache (Cache): the cache
+            loader (Callable): computes the value of a key, exceptions skip the key
+            max_workers (int, optional): the max number of concurrent loads. Defaults to 4.
+            max_per_sec (float, optional): the max number of loads started per second. Defaults to None (no limit).
+            ttl_sec (int, optional): the retention time of loaded values. Defaults to the cache ttl.
+            lock (threading.Lock, optional): held while inserting, if the cache is already serving. Defaults to None.
+            batch_size (int, optional): the number of loaded values inserted together, the coldest first. Defaults to 64.
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if max_per_sec is not None and max_per_sec <= 0:
+            raise ValueError("max_per_sec must be positive")
+
+        self.cache = cache
+        self.loader = loader
+        self.max_workers = max_workers
+        self.max_per_sec = max_per_sec
+        self.ttl_sec = cache.ttl_sec if ttl_sec is None else ttl_sec
+        self.lock = lock
+        self.batch_size = batch_size
+
+        self.n_load = 0
+        self.n_insert = 0
+        self.n_skip = 0
+        self.n_error = 0
+        self.last_error = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _insert(self, key: Any, value: Any) -> None:
+        cache = self.cache
+        if self.lock is not None:
+            self.lock.acquire()
+        try:
+            if key in cache:
+                # the traffic has inserted a fresher value
+                self.n_skip += 1
+            else:
+                cache.put(key, value, self.ttl_sec)
+                self.n_insert += 1
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+
+    def _finish(self, key: Any, future, loaded: List[Tuple[Any, Any]]) -> None:
+        try:
+            value = future.result()
+        except Exception as e:
+            self.n_error += 1
+            self.last_error = e
+            return
+        loaded.append((key, value))
+        if len(loaded) >= self.batch_size:
+            self._insert_batch(loaded)
+
+    def _insert_batch(self, loaded: List[Tuple[Any, Any]]) -> None:
+        # in reverse, a hot key inserted first would be the first evicted
+        for key, value in reversed(loaded):
+            self._insert(key, value)
+        loaded.clear()
+
+    def run(self, keys: List[Any], max_keys: int = None) -> Dict[str, int]:
+        """load the keys, the hottest first, and insert them in batches, the coldest of a batch
+        first, returns when all are inserted or stop is called
+
+        Args:
+            keys (List[Any]): the keys, the hottest first, e.g., from load_hot_keys
+            max_keys (int, optional): load at most max_keys. Defaults to the cache size.
+
+        Returns:
+            Dict[str, int]: stats
+        """
+        if max_keys is None:
+            max_keys = self.cache.cache_size
+        keys = keys[:max_keys]
+
+        # the loads of the next keys run while the oldest is waited for,
+        # at most 2 * max_workers loads are in flight
+        window = deque()
+        loaded = []
+        interval = 1 / self.max_per_sec if self.max_per_sec is not None else 0
+        next_start = time.monotonic()
+        with ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="cachemon-preload"
+        ) as executor:
+            for key in keys:
+                if self._stop.is_set():
+                    break
+                if len(window) >= 2 * self.max_workers:
+                    self._finish(*window.popleft(), loaded)
+                if interval > 0:
+                    delay = next_start - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                    next_start = max(next_start, time.monotonic() - interval) + interval
+                window.append((key, executor.submit(self.loader, key)))
+                self.n_load += 1
+
+            while len(window) > 0:
+                self._finish(*window.popleft(), loaded)
+
+        self._insert_batch(loaded)
+        return self.stats()
+
+    def start(self, keys: List[Any], max_keys: int = None) -> "Preloader":
+        """run in a background thread, pass a lock if the cache is serving"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self.run,
+                args=(keys, max_keys),
+                name="cachemon-warmup",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """stop starting loads, the loads in flight are inserted"""
+        self._stop.set()
+        self.wait()
+
+    def wait(self, timeout: float = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "n_load": self.n_load,
+            "n_insert": self.n_insert,
+            "n_skip": self.n_skip,
+            "n_error": self.n_error,
+        }
+
+
+def warm_up(
+    cache,
+    path: str,
+    loader: Callable,
+    max_workers: int = 4,
+    max_per_sec: float = None,
+    ttl_sec: int = None,
+    serializer: str = "pickle",
+) -> Dict[str, int]:
+    """load the keys saved in path into the cache, the hottest first, see Preloader"""
+    return Preloader(cache, loader, max_workers, max_per_sec, ttl_sec).run(
+        load_hot_keys(path, serializer)
+    )
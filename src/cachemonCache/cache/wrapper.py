@@ -0,0 +1,97 @@
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+from .cache import Cache
+
+
+class CacheWrapper(Cache):
+    """a cache that keeps its entries in another cache, which decides what to evict,
+    subclasses change how values are stored by overriding _decode and _forget"""
+
+    def __init__(self, name: str, cache: Cache) -> None:
+        super().__init__(
+            name,
+            cache.cache_size,
+            0,
+            0,
+            None,
+            cache.ttl_sec,
+            cache.eviction_callback,
+        )
+
+        self.cache = cache
+        # the wrapped cache reports its evictions to us
+        self.cache.add_eviction_callback(self._on_evict)
+
+    def _decode(self, stored: Any) -> Any:
+        """turn a stored value into the value returned to the user"""
+        return stored
+
+    def _forget(self, key: Any) -> None:
+        """release what the wrapper keeps for a key that left the cache"""
+        pass
+
+    def _on_evict(self, key: Any, stored: Any, reason: str = "evict") -> None:
+        if reason != "evict":
+            # an expiration or a delete in the wrapped cache
+            if self.eviction_callback is not None:
+                self._on_remove(key, self._decode(stored), reason)
+            self._forget(key)
+            return
+
+        self.n_evict += 1
+        if self.eviction_callback is not None:
+            value = self._decode(stored)
+            self._forget(key)
+            self.eviction_callback(key, value)
+        else:
+            self._forget(key)
+
+    _on_evict.takes_reason = True
+
+    def add_eviction_callback(self, eviction_callback):
+        # keep our own callback on the wrapped cache
+        self.eviction_callback = eviction_callback
+
+    def _n_object(self) -> int:
+        return self.cache._n_object()
+
+    def _metadata_bytes(self) -> int:
+        return self.cache._metadata_bytes()
+
+    def evict(self) -> Any:
+        """evict an object from the cache
+
+        Returns:
+            the evicted key
+        """
+        return self.cache.evict()
+
+    def resize(self, new_size: int, evict_batch: int = 64, defer: bool = False) -> None:
+        """change the capacity of the wrapped cache, see Cache.resize"""
+        self.cache.resize(new_size, evict_batch, defer)
+        self.cache_size = new_size
+
+    def get_exp_time(self, key, default=None):
+        return self.cache.get_exp_time(key, default)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __iter__(self):
+        return iter(self.cache)
+
+    def keys(self):
+        return self.cache.keys()
+
+    def keys_by_hotness(self) -> List[Any]:
+        return self.cache.keys_by_hotness()
+
+    def items(self):
+        for key, stored in self.cache.items():
+            yield key, self._decode(stored)
+
+    def values(self):
+        for stored in self.cache.values():
+            yield self._decode(stored)
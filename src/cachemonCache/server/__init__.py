@@ -0,0 +1 @@
+from .memcached import MemcachedServer
@@ -0,0 +1,319 @@
+"""
+    serve any cache over the memcached text protocol
+
+    supported commands: get, gets (multi-key), set, add, replace, delete, touch,
+    stats, version, flush_all, quit
+
+    the server listens on a unix domain socket or on a local TCP port, every
+    read from a connection is parsed into as many commands as it holds
+    (pipelining) and the responses to them are written back in one write
+
+    usage: python3 memcached.py [--policy S3FIFO] [--size 100000] [--port 11211 | --unix PATH]
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+from typing import Callable, Optional, Any, List, Tuple, Dict, Union
+
+
+_MISS = object()
+
+# exptime larger than 30 days is a unix timestamp
+_RELATIVE_EXPTIME_MAX = 30 * 24 * 3600
+_MAX_KEY_LEN = 250
+_MAX_LINE_LEN = 2048
+
+_STORED = b"STORED\r\n"
+_NOT_STORED = b"NOT_STORED\r\n"
+_DELETED = b"DELETED\r\n"
+_TOUCHED = b"TOUCHED\r\n"
+_NOT_FOUND = b"NOT_FOUND\r\n"
+_END = b"END\r\n"
+_ERROR = b"ERROR\r\n"
+_OK = b"OK\r\n"
+
+VERSION = "cachemonCache-0.1"
+
+
+class MemcachedProtocol(asyncio.Protocol):
+    def __init__(self, server) -> None:
+        self.server = server
+        self.buf = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+        self.server.n_conn_total += 1
+        self.server.n_conn_curr += 1
+
+    def connection_lost(self, exc) -> None:
+        self.server.n_conn_curr -= 1
+
+    def data_received(self, data: bytes) -> None:
+        server = self.server
+        server.bytes_read += len(data)
+        buf = self.buf
+        buf += data
+
+        out = []
+        pos = 0
+        close = False
+        while True:
+            eol = buf.find(b"\r\n", pos)
+            if eol == -1:
+                if len(buf) - pos > _MAX_LINE_LEN:
+                    out.append(b"CLIENT_ERROR line too long\r\n")
+                    close = True
+                break
+
+            parts = bytes(buf[pos:eol]).split()
+            if len(parts) == 0:
+                out.append(_ERROR)
+                pos = eol + 2
+                continue
+
+            cmd = parts[0]
+            if cmd in (b"set", b"add", b"replace"):
+                if len(parts) < 5 or not parts[4].isdigit():
+                    out.append(b"CLIENT_ERROR bad command line format\r\n")
+                    pos = eol + 2
+                    continue
+                n_byte = int(parts[4])
+                end = eol + 2 + n_byte + 2
+                if len(buf) < end:
+                    # wait for the rest of the data block
+                    break
+                if buf[end - 2 : end] != b"\r\n":
+                    out.append(b"CLIENT_ERROR bad data chunk\r\n")
+                else:
+                    resp = server.handle_store(cmd, parts, bytes(buf[eol + 2 : end - 2]))
+                    if resp is not None:
+                        out.append(resp)
+                pos = end
+                continue
+
+            pos = eol + 2
+            if cmd == b"quit":
+                close = True
+                break
+            resp = server.handle_command(cmd, parts)
+            if resp is not None:
+                out.append(resp)
+
+        del buf[:pos]
+        if len(out) > 0:
+            resp = b"".join(out)
+            server.bytes_written += len(resp)
+            self.transport.write(resp)
+        if close:
+            self.transport.close()
+
+
+class MemcachedServer(object):
+    def __init__(
+        self,
+        cache,
+        host: str = "127.0.0.1",
+        port: int = 11211,
+        unix_path: str = None,
+    ) -> None:
+        """create a memcached server for a cache, values are stored as (flags, data, cas) tuples
+
+        Args:
+            cache (Cache): the cache to serve
+            host (str, optional): the address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): the TCP port. Defaults to 11211.
+            unix_path (str, optional): listen on this unix domain socket instead of TCP. Defaults to None.
+        """
+        self.cache = cache
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.server = None
+
+        self.start_time = time.time()
+        self.cas_unique = 0
+
+        self.n_conn_total = 0
+        self.n_conn_curr = 0
+        self.n_cmd_get = 0
+        self.n_cmd_set = 0
+        self.n_cmd_delete = 0
+        self.n_cmd_touch = 0
+        self.n_get_hit = 0
+        self.n_get_miss = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _ttl(self, exptime: int) -> float:
+        if exptime == 0:
+            return self.cache.ttl_sec
+        if exptime < 0:
+            return -1
+        if exptime > _RELATIVE_EXPTIME_MAX:
+            return exptime - time.time()
+        return exptime
+
+    def handle_store(self, cmd: bytes, parts: List[bytes], data: bytes) -> Optional[bytes]:
+        """set, add and replace, parts is "cmd key flags exptime bytes [noreply]" """
+        self.n_cmd_set += 1
+        key = parts[1]
+        try:
+            flags = int(parts[2])
+            exptime = int(parts[3])
+        except ValueError:
+            return b"CLIENT_ERROR bad command line format\r\n"
+        if len(key) > _MAX_KEY_LEN:
+            return b"CLIENT_ERROR key too long\r\n"
+
+        noreply = len(parts) > 5 and parts[5] == b"noreply"
+        if cmd != b"set":
+            exists = self.cache.get(key, _MISS) is not _MISS
+            if (cmd == b"add") == exists:
+                return None if noreply else _NOT_STORED
+
+        self.cas_unique += 1
+        self.cache.put(key, (flags, data, self.cas_unique), self._ttl(exptime))
+        return None if noreply else _STORED
+
+    def handle_command(self, cmd: bytes, parts: List[bytes]) -> Optional[bytes]:
+        cache = self.cache
+
+        if cmd == b"get" or cmd == b"gets":
+            out = []
+            with_cas = cmd == b"gets"
+            for key in parts[1:]:
+                self.n_cmd_get += 1
+                entry = cache.get(key, _MISS)
+                if entry is _MISS:
+                    self.n_get_miss += 1
+                    continue
+                self.n_get_hit += 1
+                flags, data, cas = entry
+                if with_cas:
+                    out.append(b"VALUE %s %d %d %d\r\n" % (key, flags, len(data), cas))
+                else:
+                    out.append(b"VALUE %s %d %d\r\n" % (key, flags, len(data)))
+                out.append(data)
+                out.append(b"\r\n")
+            out.append(_END)
+            return b"".join(out)
+
+        noreply = parts[-1] == b"noreply"
+
+        if cmd == b"delete":
+            self.n_cmd_delete += 1
+            if len(parts) < 2:
+                return _ERROR
+            key = parts[1]
+            # delete also succeeds on ghost entries (e.g., of S3FIFO) and expired objects
+            if cache.get(key, _MISS) is _MISS:
+                resp = _NOT_FOUND
+            else:
+                cache.delete(key)
+                resp = _DELETED
+            return None if noreply else resp
+
+        if cmd == b"touch":
+            self.n_cmd_touch += 1
+            if len(parts) < 3:
+                return _ERROR
+            key = parts[1]
+            try:
+                exptime = int(parts[2])
+            except ValueError:
+                return b"CLIENT_ERROR bad command line format\r\n"
+            entry = cache.get(key, _MISS)
+            if entry is _MISS:
+                resp = _NOT_FOUND
+            else:
+                cache.put(key, entry, self._ttl(exptime))
+                resp = _TOUCHED
+            return None if noreply else resp
+
+        if cmd == b"stats":
+            return b"".join(
+                b"STAT %s %s\r\n" % (name.encode(), str(value).encode())
+                for name, value in self.stats().items()
+            ) + _END
+
+        if cmd == b"version":
+            return b"VERSION %s\r\n" % VERSION.encode()
+
+        if cmd == b"flush_all":
+            cache.clear()
+            return None if noreply else _OK
+
+        return _ERROR
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """server and cache counters, in the names used by memcached"""
+        cache = self.cache
+        return {
+            "pid": os.getpid(),
+            "uptime": int(time.time() - self.start_time),
+            "version": VERSION,
+            "policy": cache.name,
+            "curr_connections": self.n_conn_curr,
+            "total_connections": self.n_conn_total,
+            "cmd_get": self.n_cmd_get,
+            "cmd_set": self.n_cmd_set,
+            "cmd_delete": self.n_cmd_delete,
+            "cmd_touch": self.n_cmd_touch,
+            "get_hits": self.n_get_hit,
+            "get_misses": self.n_get_miss,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "curr_items": len(cache),
+            "limit_items": cache.cache_size,
+            "evictions": cache.n_evict,
+        }
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.unix_path is not None:
+            self.server = await loop.create_unix_server(
+                lambda: MemcachedProtocol(self), self.unix_path
+            )
+        else:
+            self.server = await loop.create_server(
+                lambda: MemcachedProtocol(self), self.host, self.port
+            )
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def run(self) -> None:
+        """serve until the process is stopped"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    BASEPATH = os.path.dirname(os.path.abspath(__file__)) + "/../"
+    sys.path.append(BASEPATH)
+    from cache import *
+
+    parser = argparse.ArgumentParser(description="memcached server backed by a cachemonCache policy")
+    parser.add_argument("--policy", default="S3FIFO", help="FIFO, LRU, FastLRU, Clock, S3FIFO")
+    parser.add_argument("--size", type=int, default=100000, help="cache size in objects")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11211)
+    parser.add_argument("--unix", default=None, help="path of a unix domain socket")
+    args = parser.parse_args()
+
+    cache = globals()[args.policy](args.size)
+    MemcachedServer(cache, args.host, args.port, args.unix).run()
@@ -129,6 +129,34 @@ class TestLRUCacheBasic(unittest.TestCase):
         self.assertTrue("test" in self.cache)
 
 
+class TestFastLRUCacheBasic(TestLRUCacheBasic):
+    def setUp(self):
+        self.cache = FastLRU(self.cache_size)
+
+
+class TestFastCaches(unittest.TestCase):
+    cache_size = 20
+
+    def test_cache_basic(self):
+        for cache_type in [FastFIFO, FastLRU]:
+            test_cache_basic(cache_type(self.cache_size), self.cache_size)
+            test_cache_callback(cache_type(self.cache_size), self.cache_size)
+
+    def test_same_order(self):
+        # the fast engines evict exactly like the linked-list ones
+        random.seed(0)
+        for fast_type, ref_type in [(FastFIFO, FIFO), (FastLRU, LRU)]:
+            fast, ref = fast_type(50), ref_type(50)
+            for _ in range(5000):
+                key = random.randint(0, 200)
+                if fast.get(key) is None:
+                    fast.put(key, key)
+                if ref.get(key) is None:
+                    ref.put(key, key)
+            self.assertEqual(sorted(fast.keys()), sorted(ref.keys()))
+            self.assertEqual(fast.n_hit, ref.n_hit)
+
+
 class TestClockCacheBasic(unittest.TestCase):
     cache_size = 8
 
@@ -143,6 +171,1260 @@ class TestClockCacheBasic(unittest.TestCase):
         pass
 
 
+class TestSharedMemoryCache(unittest.TestCase):
+    cache_size = 8
+
+    def setUp(self):
+        self.cache = SharedMemoryCache(self.cache_size, item_size=64)
+
+    def tearDown(self):
+        self.cache.close()
+        self.cache.unlink()
+
+    def test_cache_semantics(self):
+        for i in range(self.cache_size):
+            self.cache.put(i, str(i).encode())
+        for i in range(self.cache_size):
+            self.assertEqual(self.cache.get(i), str(i).encode())
+
+        self.cache.put("new", b"new")
+        self.assertEqual(len(self.cache), self.cache_size)
+        self.assertEqual(self.cache["new"], b"new")
+
+        self.cache.delete("new")
+        self.assertFalse("new" in self.cache)
+        self.assertRaises(TypeError, self.cache.put, "str", "not bytes")
+        self.assertRaises(ValueError, self.cache.put, "big", b"x" * 64)
+
+    def test_cross_process(self):
+        import multiprocessing
+
+        ctx = multiprocessing.get_context("fork")
+        self.cache.put("parent", b"p")
+        proc = ctx.Process(target=self.cache.put, args=("child", b"c"))
+        proc.start()
+        proc.join()
+        self.assertEqual(self.cache.get("child"), b"c")
+
+    def test_resize(self):
+        import multiprocessing
+
+        for i in range(self.cache_size):
+            self.cache.put(i, b"v")
+        self.cache.resize(4, defer=True)
+        self.assertEqual(len(self.cache), self.cache_size)
+
+        # the capacity is in the segment, a put in another process shrinks the cache
+        ctx = multiprocessing.get_context("fork")
+        proc = ctx.Process(target=self.cache.put, args=("child", b"c"))
+        proc.start()
+        proc.join()
+        self.assertEqual(len(self.cache), 4)
+        self.assertEqual(self.cache.get("child"), b"c")
+
+        self.cache.resize(self.cache_size)
+        for i in range(100, 100 + self.cache_size):
+            self.cache.put(i, b"v")
+        self.assertEqual(len(self.cache), self.cache_size)
+        self.assertRaises(ValueError, self.cache.resize, self.cache_size + 1)
+
+
+class TestDeferredEviction(unittest.TestCase):
+    cache_size = 8
+
+    def test_batched_delivery(self):
+        batches = []
+        cache = FIFO(self.cache_size)
+        cache.add_deferred_eviction_callback(batches.append, batch_size=4)
+
+        for i in range(self.cache_size * 2):
+            cache.put(i, i)
+        cache.flush()
+
+        events = [event for batch in batches for event in batch]
+        self.assertEqual(events, [(i, i, "evict") for i in range(self.cache_size)])
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+
+    def test_reasons(self):
+        for cache_type in [FIFO, LRU, Clock, Sieve, S3FIFO, FastLRU, ARC, TwoQ, LIRS, WTinyLFU, GDSF]:
+            batches = []
+            cache = cache_type(100)
+            cache.add_deferred_eviction_callback(batches.append)
+            cache.put("expired", "e", -1)
+            cache.put("deleted", "d")
+            self.assertIsNone(cache.get("expired"))
+            cache.delete("deleted")
+            for i in range(200):
+                cache.put(i, i)
+            cache.flush()
+
+            events = [event for batch in batches for event in batch]
+            self.assertEqual(events[:2], [("expired", "e", "expire"), ("deleted", "d", "delete")], cache.name)
+            self.assertTrue(all(reason == "evict" for _, _, reason in events[2:]), cache.name)
+            self.assertEqual(len(events) - 2, cache.n_evict, cache.name)
+            self.assertEqual(cache.n_delete, 1, cache.name)
+
+        # the ghosts of S3FIFO were never resident, they do not count as expired or deleted
+        for cache_type in [FIFO, LRU, Clock, Sieve, S3FIFO]:
+            cache = cache_type(100)
+            for i in range(200):
+                cache.put(i, i, 0.05)
+            cache.delete(199)
+            time.sleep(0.1)
+            for i in range(200):
+                cache.get(i)
+            self.assertEqual(cache._n_object(), 0, cache.name)
+            self.assertEqual(cache.n_put, cache.n_evict + cache.n_delete + cache.n_expire, cache.name)
+
+        # a wrapper reports the decoded value
+        batches = []
+        cache = CompressedCache(LRU(4), threshold=4)
+        cache.add_deferred_eviction_callback(batches.append)
+        cache.put("deleted", "d" * 100)
+        cache.delete("deleted")
+        cache.flush()
+        self.assertEqual(batches, [[("deleted", "d" * 100, "delete")]])
+        self.assertEqual(cache.stored_size, {})
+
+    def test_overflow(self):
+        import threading
+
+        release = threading.Event()
+        delivered = []
+
+        def slow_callback(batch):
+            release.wait()
+            delivered.extend(batch)
+
+        callback = DeferredEvictionCallback(
+            slow_callback, max_queue_size=2, batch_size=1, overflow="drop"
+        )
+        for i in range(10):
+            callback(i, i)
+        release.set()
+        callback.close()
+        self.assertGreater(callback.n_drop, 0)
+        self.assertEqual(len(delivered) + callback.n_drop, 10)
+
+
+class TestGetOrLoad(unittest.TestCase):
+    cache_size = 8
+
+    def test_load_and_refresh(self):
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            return len(calls)
+
+        for cache_type in [FIFO, LRU, Clock]:
+            calls.clear()
+            cache = cache_type(self.cache_size)
+            self.assertEqual(cache.get_or_load("a", loader, ttl_sec=100), 1)
+            self.assertEqual(cache.get_or_load("a", loader, ttl_sec=100), 1)
+            self.assertEqual(len(calls), 1)
+
+            # a huge beta always refreshes early, the old value is served meanwhile
+            cache.refresher.delta["a"] = 1.0
+            self.assertEqual(cache.get_or_load("a", loader, 100, beta=1e12), 1)
+            # the reload is written back by its done-callback
+            cache.refresher.executor.submit(lambda: None).result()
+            while len(cache.refresher.inflight) > 0:
+                time.sleep(0.001)
+            self.assertEqual(cache.get("a"), 2)
+            self.assertEqual(cache.get_or_load("a", loader, 100, beta=0), 2)
+            self.assertEqual(cache.refresher.n_refresh, 1)
+
+    def test_refresh_ttl(self):
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            return time.time()
+
+        cache = LRU(self.cache_size)
+        cache.get_or_load("a", loader, ttl_sec=0.2)
+        cache.refresher.delta["a"] = 1.0
+        cache.get_or_load("a", loader, 0.2, beta=1e12)
+        time.sleep(0.5)
+        self.assertEqual(len(cache.refresher.inflight), 0)
+        # the reloaded value expired 0.2 s after its load, it is not served
+        self.assertGreater(cache.get_or_load("a", loader, 0.2, beta=0), time.time() - 0.1)
+        self.assertEqual(len(calls), 3)
+
+
+class TestStaleDecorator(unittest.TestCase):
+    def test_stale_while_revalidate(self):
+        calls = []
+
+        @cacheDecorator(100, eviction="LRU", ttl_sec=0.05, stale_ttl=10)
+        def f(x):
+            calls.append(x)
+            return len(calls)
+
+        self.assertEqual(f(1), 1)
+        time.sleep(0.1)
+        self.assertEqual(f(1), 1)
+        # the recomputation is written back by its done-callback
+        while len(f.decorator.inflight) > 0:
+            time.sleep(0.001)
+        self.assertEqual(f(1), 2)
+        self.assertEqual(f.decorator.n_stale_hit, 1)
+
+    def test_revalidated_ttl(self):
+        @cacheDecorator(100, eviction="LRU", ttl_sec=0.2, stale_ttl=0.2)
+        def f(x):
+            return time.time()
+
+        f(1)
+        time.sleep(0.25)
+        f(1)
+        time.sleep(0.3)
+        self.assertEqual(len(f.decorator.inflight), 0)
+        # the recomputed result was fresh until 0.2 s after it finished, it is served as stale
+        f(1)
+        self.assertEqual(f.decorator.n_stale_hit, 2)
+
+    def test_stale_if_error(self):
+        calls = []
+
+        @cacheDecorator(100, eviction="FIFO", ttl_sec=0.05, stale_if_error=10)
+        def f(x):
+            calls.append(x)
+            if len(calls) > 1:
+                raise RuntimeError("backend down")
+            return x
+
+        self.assertEqual(f(1), 1)
+        time.sleep(0.1)
+        self.assertEqual(f(1), 1)
+        self.assertEqual(len(calls), 2)
+        self.assertRaises(RuntimeError, f, 2)
+
+    def test_callback_value(self):
+        evicted = []
+
+        @cacheDecorator(2, eviction="FIFO", ttl_sec=0.05, stale_ttl=10, callback=lambda key, value: evicted.append(value))
+        def f(x):
+            return x * 10
+
+        for x in range(3):
+            f(x)
+        # the freshness of a result is not part of the value
+        self.assertEqual(evicted, [0])
+        self.assertEqual(sorted(f.cache.values()), [10, 20])
+        time.sleep(0.1)
+        self.assertEqual(f(2), 20)
+        self.assertEqual(f.decorator.n_stale_hit, 1)
+
+
+class TestNoneValues(unittest.TestCase):
+    cache_size = 8
+
+    def test_none_value(self):
+        for cache_type in [FIFO, LRU, Clock]:
+            cache = cache_type(self.cache_size)
+            cache.put("none", None)
+            self.assertIsNone(cache["none"])
+            self.assertIsNone(cache.get("none", "default"))
+            self.assertRaises(KeyError, cache.__getitem__, "missing")
+
+    def test_decorator_negative_caching(self):
+        calls = []
+
+        @cacheDecorator(100, eviction="LRU", cache_exceptions=(KeyError,))
+        def lookup(x):
+            calls.append(x)
+            if x < 0:
+                raise KeyError(x)
+            return None
+
+        for _ in range(3):
+            self.assertIsNone(lookup(1))
+            self.assertRaises(KeyError, lookup, -1)
+        self.assertEqual(calls, [1, -1])
+
+
+class TestCompressedCache(unittest.TestCase):
+    def test_compression(self):
+        values = {i: (str(i) * 1000).encode() for i in range(100)}
+        cache = CompressedCache(LRU(1000), threshold=100, max_bytes=20000)
+        for i, value in values.items():
+            cache.put(i, value)
+            self.assertEqual(cache.get(i), value)
+
+        # 100 values of 1000+ bytes fit into 20000 bytes once compressed
+        self.assertEqual(len(cache), 100)
+        self.assertLessEqual(cache.curr_bytes, 20000)
+        self.assertGreater(cache.compression_ratio(), 4)
+
+        cache.put("str", "x" * 1000)
+        self.assertEqual(cache["str"], "x" * 1000)
+        cache.delete("str")
+        self.assertFalse("str" in cache)
+
+    def test_byte_capacity(self):
+        evicted = []
+        cache = CompressedCache(
+            FIFO(1000), threshold=10, max_bytes=1000, side_cache_size=4
+        )
+        cache.add_eviction_callback(lambda key, value: evicted.append((key, value)))
+        for i in range(10):
+            cache.put(i, os.urandom(200))
+        self.assertLessEqual(cache.curr_bytes, 1000)
+        self.assertEqual([key for key, _ in evicted], list(range(10 - len(cache))))
+
+
+class TestSlabCache(unittest.TestCase):
+    def test_zero_copy(self):
+        cache = SlabCache(LRU(1000), arena_size_mb=1, page_size=64 * 1024)
+        for i in range(100):
+            cache.put(i, str(i).encode() * 10)
+        for i in range(100):
+            value = cache.get(i)
+            self.assertIsInstance(value, memoryview)
+            self.assertEqual(bytes(value), str(i).encode() * 10)
+
+        cache.put(0, b"updated")
+        self.assertEqual(bytes(cache[0]), b"updated")
+        cache.delete(0)
+        self.assertFalse(0 in cache)
+        self.assertRaises(TypeError, cache.put, "str", "not bytes")
+
+    def test_memory_ceiling(self):
+        evicted = []
+        cache = SlabCache(FIFO(1000), arena_size_mb=1, page_size=64 * 1024)
+        cache.add_eviction_callback(lambda key, value: evicted.append(key))
+        for i in range(100):
+            cache.put(i, os.urandom(30 * 1024))
+        self.assertLessEqual(cache.allocator.used_bytes, 1024 * 1024)
+        self.assertEqual(evicted, list(range(len(evicted))))
+        self.assertEqual(len(cache) + len(evicted), 100)
+
+        # small values take the pages freed by the large ones
+        for i in range(100, 20000):
+            cache.put(i, b"x" * 100)
+        self.assertGreater(cache.allocator.n_reclaim, 0)
+
+
+class TestMemoryUsage(unittest.TestCase):
+    def test_estimate_close_to_traced(self):
+        import tracemalloc
+
+        keys = list(range(1000, 1000 + 20000))
+        for cache_type in [FIFO, LRU, FastLRU, Clock, S3FIFO]:
+            tracemalloc.start()
+            cache = cache_type(10000)
+            for key in keys:
+                cache.put(key, None)
+            traced, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            usage = cache.memory_usage()
+            self.assertEqual(usage["n_object"], 10000)
+            self.assertAlmostEqual(usage["metadata_bytes"] / traced, 1, delta=0.1)
+            self.assertEqual(
+                usage["total_bytes"],
+                usage["metadata_bytes"] + usage["key_bytes"] + usage["value_bytes"],
+            )
+
+
+class TestPartitionedCache(unittest.TestCase):
+    def test_borrow_and_reclaim(self):
+        cache = PartitionedCache(100, default_policy=FIFO)
+        a = cache.add_namespace("a", quota=50)
+        b = cache.add_namespace("b", quota=50, policy=LRU)
+        self.assertRaises(ValueError, cache.add_namespace, "c", quota=1)
+
+        # a borrows the idle quota of b
+        for i in range(100):
+            a.put(i, i)
+        self.assertEqual(a.used(), 100)
+
+        # b takes its quota back from a
+        for i in range(30):
+            b[i] = i
+        self.assertEqual((a.used(), b.used()), (70, 30))
+
+        # a scan in b cannot evict the quota of a
+        for i in range(1000):
+            b.put(i, i)
+        self.assertEqual((a.used(), b.used()), (50, 50))
+        self.assertEqual(a.get(99), 99)
+        self.assertEqual(cache.stats()["a"]["hit_ratio"], 1.0)
+
+    def test_bytes_quota(self):
+        cache = PartitionedCache(10000, by_bytes=True, sizeof=len)
+        a = cache.add_namespace("a", quota=5000, policy=FIFO, max_size=1000)
+        b = cache.add_namespace("b", quota=5000, policy=Clock, max_size=1000)
+        for i in range(100):
+            a.put(i, b"x" * 100)
+            b.put(i, b"y" * 100)
+        self.assertEqual((a.used(), b.used()), (5000, 5000))
+        self.assertLessEqual(cache.used(), 10000)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        cache = LRU(10)
+        for i in range(20):
+            cache.put(i, i)
+        cache.get(19)
+        cache.get(0)
+        cache.put("expired", 1, -1)
+        cache.get("expired")
+
+        registry = MetricsRegistry()
+        registry.register("lru", cache)
+        self.assertRaises(ValueError, registry.register, "lru", cache)
+        registry.histogram("lru").observe(0.002)
+
+        text = registry.render()
+        self.assertIn('cachemon_requests_total{cache="lru",result="hit"} 1\n', text)
+        self.assertIn('cachemon_requests_total{cache="lru",result="miss"} 2\n', text)
+        self.assertIn('cachemon_evictions_total{cache="lru",reason="evict"} 11\n', text)
+        self.assertIn('cachemon_evictions_total{cache="lru",reason="expire"} 1\n', text)
+        self.assertIn('cachemon_objects{cache="lru"} 9\n', text)
+        self.assertIn('cachemon_request_duration_seconds_bucket{cache="lru",le="0.001"} 0\n', text)
+        self.assertIn('cachemon_request_duration_seconds_bucket{cache="lru",le="0.0025"} 1\n', text)
+        self.assertIn("# TYPE cachemon_requests_total counter\n", text)
+
+        text = registry.render(openmetrics=True)
+        self.assertIn("# TYPE cachemon_requests counter\n", text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+    def test_http(self):
+        import urllib.request
+
+        registry = MetricsRegistry()
+        registry.register("fifo", FIFO(10))
+        server = registry.start_http_server(0)
+        url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+        try:
+            body = urllib.request.urlopen(url).read().decode()
+            self.assertIn('cachemon_capacity_objects{cache="fifo"} 10\n', body)
+        finally:
+            registry.stop_http_server()
+
+
+class TestTraceRecorder(unittest.TestCase):
+    def test_record(self):
+        import struct
+        import tempfile
+
+        path = os.path.join(tempfile.mkdtemp(), "test.oracleGeneral.bin")
+        cache = LRU(100)
+        recorder = TraceRecorder(path, sizeof=len).attach(cache)
+        self.assertIsNone(cache.get(1))
+        cache.put(1, b"abc")
+        self.assertEqual(cache.get(1), b"abc")
+        cache.put(2, b"xy")
+        self.assertEqual(cache[2], b"xy")
+        recorder.close(annotate=True)
+        # the class methods are back
+        self.assertNotIn("get", cache.__dict__)
+
+        with open(path, "rb") as f:
+            data = f.read()
+        records = list(struct.iter_unpack("<IQIQ", data))
+        no_next = (1 << 64) - 1
+        self.assertEqual(
+            [r[1:] for r in records],
+            [(1, 3, 1), (1, 3, no_next), (2, 2, 3), (2, 2, no_next)],
+        )
+        self.assertEqual(recorder.stats()["n_record"], 4)
+
+    def test_spatial_sampling(self):
+        import tempfile
+
+        path = os.path.join(tempfile.mkdtemp(), "test.oracleGeneral.bin")
+        cache = FIFO(1000)
+        recorder = TraceRecorder(path, sample_rate=0.1).attach(cache)
+        for i in range(20000):
+            if cache.get(i % 10000) is None:
+                cache.put(i % 10000, i)
+        recorder.close()
+
+        with open(path, "rb") as f:
+            n_record = len(f.read()) // 24
+        # every sampled key is recorded twice, a miss and its put are one record
+        self.assertTrue(1800 < n_record < 2200, n_record)
+
+    def test_stable_ids(self):
+        import subprocess
+
+        # hash() of str and bytes depends on PYTHONHASHSEED, the object ids do not
+        code = (
+            "from cache.traceRecorder import _obj_id;"
+            "print(_obj_id(7), _obj_id('user:1'), _obj_id(b'user:1'), _obj_id(('a', 1)))"
+        )
+        outputs = set()
+        for seed in ["1", "2"]:
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.pathsep.join(sys.path))
+            outputs.add(subprocess.check_output([sys.executable, "-c", code], env=env))
+        self.assertEqual(len(outputs), 1)
+        ids = outputs.pop().split()
+        self.assertEqual(ids[0], b"7")
+        self.assertEqual(len(set(ids)), 4)
+
+
+class TestSieve(unittest.TestCase):
+    def test_eviction(self):
+        cache = Sieve(3)
+        for key in "abc":
+            cache.put(key, key)
+        cache.get("a")
+        # a is visited, b is the first unvisited object from the tail
+        cache.put("d", "d")
+        self.assertEqual(sorted(cache.keys()), ["a", "c", "d"])
+        # the hand continues from where it stopped, a stays until the hand wraps around
+        cache.put("e", "e")
+        self.assertEqual(sorted(cache.keys()), ["a", "d", "e"])
+        cache.put("f", "f")
+        self.assertEqual(sorted(cache.keys()), ["a", "e", "f"])
+        cache.put("g", "g")
+        self.assertEqual(sorted(cache.keys()), ["a", "f", "g"])
+        cache.delete("f")
+        self.assertEqual(sorted(cache.keys()), ["a", "g"])
+        test_cache_callback(Sieve(20), 20)
+
+
+class TestScanResistantPolicies(unittest.TestCase):
+    policies = [ARC, TwoQ, LIRS, WTinyLFU]
+
+    def test_cache_basic(self):
+        for cache_type in [ARC, TwoQ]:
+            test_cache_basic(cache_type(20), 20)
+            test_cache_callback(cache_type(20), 20)
+
+    def test_scan(self):
+        for cache_type in self.policies:
+            cache = cache_type(100)
+            hot = list(range(50))
+            cold = iter(range(10000, 20000))
+            for _ in range(10):
+                for key in hot:
+                    if cache.get(key) is None:
+                        cache.put(key, key)
+                for _ in range(30):
+                    key = next(cold)
+                    if cache.get(key) is None:
+                        cache.put(key, key)
+            # a scan of keys that are never reused, LRU would keep none of the hot keys
+            for key in range(1000, 2000):
+                if cache.get(key) is None:
+                    cache.put(key, key)
+            n_hot = sum(1 for key in hot if key in cache)
+            self.assertEqual(n_hot, 50, cache.name)
+            self.assertLessEqual(len(cache), 100)
+
+    def test_random_ops(self):
+        random.seed(1)
+        for cache_type in self.policies:
+            evicted = []
+            cache = cache_type(50, eviction_callback=lambda k, v, evicted=evicted: evicted.append(k))
+            n_delete = 0
+            for _ in range(20000):
+                key = int(random.paretovariate(1.0)) % 300
+                op = random.random()
+                if op < 0.05 and key in cache:
+                    cache.delete(key)
+                    n_delete += 1
+                elif cache.get(key) is None:
+                    cache.put(key, key, 1000 if op < 0.9 else -1)
+                self.assertLessEqual(len(cache), 50, cache.name)
+            self.assertEqual(len(evicted), cache.n_evict)
+            self.assertEqual(cache.n_put - len(cache), cache.n_evict + n_delete + cache.n_expire)
+            while cache.evict() is not None:
+                pass
+            self.assertEqual(len(cache), 0)
+
+    def test_ttl(self):
+        caches = [cache_type(20) for cache_type in self.policies]
+        for cache in caches:
+            cache.put("short", 1, 0.5)
+            cache.put("long", 2, 20)
+        time.sleep(0.6)
+        for cache in caches:
+            self.assertIsNone(cache.get("short"), cache.name)
+            self.assertEqual(cache.get("long"), 2)
+            self.assertEqual((cache.n_expire, len(cache)), (1, 1))
+
+    def test_tinylfu_admission(self):
+        cache = WTinyLFU(100)
+        for _ in range(3):
+            for key in range(100):
+                if cache.get(key) is None:
+                    cache.put(key, key)
+        # a new key is only admitted once it is requested more often than the victim
+        for _ in range(4):
+            cache.get("new")
+        cache.put("new", 1)
+        cache.put("other", 1)
+        self.assertIn("new", cache)
+        self.assertEqual(len(cache), 100)
+
+
+class TestShadowSimulator(unittest.TestCase):
+    def test_estimate(self):
+        random.seed(0)
+        keys = [int(random.paretovariate(0.8)) for _ in range(50000)]
+
+        truth = {}
+        for policy in [LRU, S3FIFO]:
+            for cache_size in [2000, 4000]:
+                cache = policy(cache_size)
+                for key in keys:
+                    if cache.get(key) is None:
+                        cache.put(key, key)
+                truth[(policy.__name__, cache_size)] = 1 - cache.n_hit / cache.n_get
+
+        cache = FIFO(1000)
+        simulator = ShadowSimulator([2000, 4000], [LRU, S3FIFO], sample_rate=0.25).attach(cache)
+        for key in keys:
+            if cache.get(key) is None:
+                cache.put(key, key)
+        simulator.detach()
+        self.assertNotIn("get", cache.__dict__)
+
+        result = simulator.recommend()
+        self.assertEqual(set(result["miss_ratio"]), set(truth))
+        for key, miss_ratio in result["miss_ratio"].items():
+            self.assertAlmostEqual(miss_ratio, truth[key], delta=0.02)
+        self.assertEqual(result["best"][1], 4000)
+        self.assertIsNone(simulator.recommend(max_miss_ratio=0)["best"])
+
+
+class TestSimulator(unittest.TestCase):
+    def test_same_hits_as_caches(self):
+        random.seed(0)
+        keys = [int(random.paretovariate(0.5)) for _ in range(20000)]
+        simulator = Simulator(keys)
+
+        for policy in [FIFO, LRU, Clock, S3FIFO, Sieve]:
+            for cache_size in [100, 1000]:
+                cache = policy(cache_size)
+                hits = bytearray(len(keys))
+                for i, key in enumerate(keys):
+                    if cache.get(key) is None:
+                        cache.put(key, key)
+                    else:
+                        hits[i] = 1
+
+                result = simulator.run(policy.__name__, cache_size)
+                self.assertEqual(bytes(result["hits"]), bytes(hits), policy.__name__)
+                self.assertEqual(result["n_hit"], cache.n_hit)
+                self.assertAlmostEqual(result["miss_ratio"], 1 - cache.n_hit / cache.n_get)
+
+        with self.assertRaises(ValueError):
+            simulator.run("ARC", 100)
+
+
+class TestResize(unittest.TestCase):
+    def test_shrink_and_grow(self):
+        for cache_type in [FIFO, LRU, Clock, FastFIFO, FastLRU, S3FIFO, Sieve, ARC, TwoQ, LIRS, WTinyLFU]:
+            cache = cache_type(1000)
+            for i in range(1000):
+                cache.put(i, i)
+
+            # the first batch is evicted by resize, the rest by the following puts
+            cache.resize(200, evict_batch=100)
+            self.assertEqual(cache._n_object(), 900, cache_type.__name__)
+            self.assertTrue(cache.shrinking)
+            for i in range(1000, 1008):
+                cache.put(i, i)
+            self.assertFalse(cache.shrinking)
+            self.assertEqual(cache._n_object(), 200, cache_type.__name__)
+
+            random.seed(0)
+            for _ in range(2000):
+                key = random.randint(0, 2000)
+                if cache.get(key) is None:
+                    cache.put(key, key)
+                self.assertLessEqual(cache._n_object(), 200)
+            # the keys of S3FIFO include the ghosts
+            if cache_type is not S3FIFO:
+                for key in list(cache.keys()):
+                    self.assertEqual(cache.get(key), key)
+
+            cache.resize(500)
+            for i in range(3000, 4000):
+                cache.put(i, i)
+            self.assertEqual(cache._n_object(), 500, cache_type.__name__)
+
+        # a deferred shrink, the hand of Clock is past the new size
+        cache = Clock(100)
+        for i in range(95):
+            cache.put(i, i)
+        cache.resize(50, evict_batch=10, defer=True)
+        self.assertEqual(len(cache), 95)
+        for i in range(10):
+            cache.put(("new", i), i)
+            self.assertIn(("new", i), cache)
+        self.assertFalse(cache.shrinking)
+        self.assertEqual(len(cache), 50)
+        self.assertLess(cache.clock_pointer, 50)
+
+        cache = S3FIFO(1000)
+        cache.resize(300)
+        self.assertEqual((cache.small_fifo_size, cache.main_fifo_size), (30, 270))
+        with self.assertRaises(RuntimeError):
+            cache.resize(50)
+
+
+class TestMemoryGovernor(unittest.TestCase):
+    def test_watermarks(self):
+        used = [0]
+        governor = MemoryGovernor(100, 200, probe=lambda: used[0], evict_batch=1000)
+        low, high = LRU(1000), FIFO(1000)
+        governor.register(low, priority=0).register(high, priority=1)
+        for i in range(1000):
+            low.put(i, i)
+            high.put(i, i)
+
+        # the governor only lowers the capacity, the next put evicts
+        used[0] = 150
+        self.assertEqual(governor.check(), "soft")
+        self.assertEqual((low.cache_size, high.cache_size), (950, 1000))
+        self.assertEqual(len(low), 1000)
+        low.put("new", 0)
+        self.assertEqual(len(low), 950)
+
+        used[0] = 250
+        self.assertEqual(governor.check(), "hard")
+        self.assertEqual((low.cache_size, high.cache_size), (760, 800))
+        high.put("new", 0)
+        self.assertEqual(len(high), 800)
+
+        used[0] = 50
+        self.assertEqual(governor.check(), "ok")
+        self.assertEqual((low.cache_size, high.cache_size), (810, 850))
+        stats = governor.stats()
+        self.assertEqual((stats["n_soft"], stats["n_hard"], stats["n_restore"]), (1, 1, 2))
+        self.assertEqual(stats["n_shed"], 50 + 190 + 200)
+
+    def test_thread(self):
+        calls = []
+
+        def probe():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("probe failed")
+            return 0
+
+        governor = MemoryGovernor(100, 200, probe=probe, interval_sec=0.01).start()
+        time.sleep(0.1)
+        governor.stop()
+        self.assertGreater(governor.stats()["n_check"], 0)
+        self.assertEqual(governor.n_error, 1)
+
+    def test_resize_error(self):
+        class Broken(LRU):
+            def resize(self, new_size, evict_batch=64, defer=False):
+                raise NotImplementedError("no resize")
+
+        governor = MemoryGovernor(100, 200, probe=lambda: 250)
+        broken, cache = Broken(1000), LRU(1000)
+        governor.register(broken, priority=0).register(cache, priority=1)
+        for i in range(1000):
+            broken.put(i, i)
+            cache.put(i, i)
+
+        # the cache after the one that fails still sheds
+        self.assertEqual(governor.check(), "hard")
+        self.assertEqual((broken.cache_size, cache.cache_size), (1000, 800))
+        self.assertEqual(governor.n_error, 1)
+        self.assertIsInstance(governor.last_error, NotImplementedError)
+        self.assertEqual(governor.stats()["n_shed"], 200)
+
+
+class TestBoundedEviction(unittest.TestCase):
+    def test_clock(self):
+        cache = Clock(100, max_evict_scan=10)
+        for i in range(100):
+            cache.put(i, i)
+        for i in range(100):
+            cache.get(i)
+
+        # an unbounded put would clear all 100 bits and evict 0
+        cache.put(100, 100)
+        self.assertEqual(cache.clock_pointer, 11)
+        self.assertNotIn(10, cache)
+        self.assertEqual(sum(node.visited for node in cache.clock_buffer), 89)
+
+    def test_s3fifo(self):
+        cache = S3FIFO(100, max_evict_scan=5)
+        for i in range(200):
+            cache.put(i % 100, i)
+            cache.get(i % 100)
+        for i in range(100):
+            cache.get(i)
+        freq = sum(node.freq for node in cache.main_fifo)
+
+        cache.put("new", 0)
+        self.assertEqual(len(cache.main_fifo) + len(cache.small_fifo), 100)
+        self.assertGreaterEqual(sum(node.freq for node in cache.main_fifo), freq - 5 - 3)
+
+        random.seed(0)
+        for cache_type in [Clock, S3FIFO]:
+            cache = cache_type(200, max_evict_scan=2)
+            for _ in range(5000):
+                key = int(random.paretovariate(0.5))
+                if cache.get(key) is None:
+                    cache.put(key, key)
+                self.assertLessEqual(cache._n_object(), 200)
+
+
+class TestGDSF(unittest.TestCase):
+    def test_cost(self):
+        cache = GDSF(10)
+        for i in range(5):
+            cache.put(("expensive", i), i, cost=100.0)
+        for i in range(200):
+            cache.put(i, i, cost=1.0)
+        for i in range(5):
+            self.assertEqual(cache.get(("expensive", i)), i)
+        self.assertEqual(cache.get_cost(("expensive", 0)), 100.0)
+        self.assertEqual(len(cache), 10)
+
+        # objects that are not requested again age out however expensive
+        for i in range(5000):
+            cache.put(i, i, cost=1.0)
+        self.assertNotIn(("expensive", 0), cache)
+
+        random.seed(0)
+        cache = GDSF(100)
+        for _ in range(5000):
+            key = random.randint(0, 300)
+            if random.random() < 0.1 and key in cache:
+                cache.delete(key)
+            elif cache.get(key) is None:
+                cache.put(key, key, cost=random.random())
+            self.assertLessEqual(len(cache), 100)
+        self.assertLessEqual(len(cache.heap), 2 * len(cache) + 65)
+
+    def test_decorator(self):
+        @cacheDecorator(10, eviction="GDSF")
+        def f(x):
+            time.sleep(0.01 if x < 0 else 0)
+            return x
+
+        for _ in range(3):
+            for x in range(-3, 50):
+                f(x)
+        for x in range(-3, 0):
+            self.assertIn(((x,), ()), f.decorator.cache)
+        stats = f.stats()
+        self.assertGreater(stats["time_saved_sec"], 0.03)
+        self.assertGreater(stats["compute_time_sec"], 0.03)
+        self.assertEqual(stats["n_call"], 3 * 53)
+
+    def test_callback_value(self):
+        for eviction in ["LRU", "GDSF"]:
+            evicted = []
+
+            @cacheDecorator(2, eviction=eviction, callback=lambda key, value: evicted.append((key, value)))
+            def f(x):
+                return x * 10
+
+            for x in range(3):
+                f(x)
+            # the callback and the cache see the results, not their costs
+            self.assertEqual(len(evicted), 1, eviction)
+            (key, value), = evicted
+            self.assertEqual(value, key[0][0] * 10)
+            self.assertEqual(sorted(f.cache.values()), sorted({0, 10, 20} - {value}))
+            self.assertEqual(len(f.decorator.meta), 2)
+            f.clear()
+            self.assertEqual(len(f.decorator.meta), 0)
+
+
+class TestTraceAnalyzer(unittest.TestCase):
+    def test_exact(self):
+        analyzer = TraceAnalyzer(window_size=4, rate_interval_sec=10)
+        # a b c a b d: the second a and b each have 2 distinct objects in between
+        analyzer.feed([0, 1, 2, 3], ["a", "b", "c", "a"], [1, 2, 4, 1])
+        analyzer.feed([14, 15], ["b", "d"], [2, 8])
+        report = analyzer.report()
+
+        self.assertEqual(report["n_req"], 6)
+        self.assertEqual(report["n_bytes"], 18)
+        self.assertEqual(report["n_obj_estimate"], 4)
+        self.assertEqual(report["reuse_distance_hist"], [[2, 3, 2]])
+        self.assertEqual(report["reuse_time_hist"], [[2, 3, 1], [8, 15, 1]])
+        self.assertEqual(report["one_hit_wonder_ratio"], 0.5)
+        self.assertEqual(report["one_hit_wonder_windows"], [2 / 3, 1.0])
+        self.assertEqual(report["request_rate"], [[0, 4, 8], [10, 2, 10]])
+        self.assertEqual(report["object_size_hist"], [[1, 1, 1], [2, 3, 1], [4, 7, 1], [8, 15, 1]])
+
+    def test_bounded(self):
+        hll = HyperLogLog()
+        for i in range(100000):
+            hll.add(i)
+        self.assertLess(abs(hll.estimate() - 100000) / 100000, 0.03)
+
+        random.seed(0)
+        n = 20000
+        obj_ids = [int(random.paretovariate(0.3)) for _ in range(n)]
+        full = TraceAnalyzer()
+        full.feed(list(range(n)), obj_ids, [1] * n)
+        bounded = TraceAnalyzer(max_tracked=500)
+        for i in range(0, n, 1000):
+            bounded.feed(list(range(i, i + 1000)), obj_ids[i : i + 1000], [1] * 1000)
+
+        self.assertLessEqual(len(bounded.objects), 500)
+        self.assertLess(bounded.sample_rate, 1.0)
+        report, truth = bounded.report(), full.report()
+        self.assertEqual(report["n_obj_estimate"], truth["n_obj_estimate"])
+        self.assertAlmostEqual(
+            report["one_hit_wonder_ratio"], truth["one_hit_wonder_ratio"], delta=0.1
+        )
+        self.assertGreater(truth["zipf_alpha"], 0)
+
+
+class TestHotKeys(unittest.TestCase):
+    def test_space_saving(self):
+        tracker = HotKeyTracker(capacity=10, window_sec=None)
+        for key in "aababcabcd":
+            tracker.access(key)
+        self.assertEqual(
+            tracker.top_keys(3), [("a", 4.0, 0.0), ("b", 3.0, 0.0), ("c", 2.0, 0.0)]
+        )
+
+        random.seed(0)
+        tracker = HotKeyTracker(capacity=50, window_sec=None)
+        truth = {}
+        for _ in range(20000):
+            key = int(random.paretovariate(0.5))
+            truth[key] = truth.get(key, 0) + 1
+            tracker.access(key)
+        self.assertEqual(len(tracker.counters), 50)
+        true_top = sorted(truth, key=truth.get, reverse=True)[:5]
+        top = tracker.top_keys(5)
+        self.assertEqual([key for key, _, _ in top], true_top)
+        for key, count, error in tracker.top_keys(50):
+            self.assertLessEqual(count - error, truth[key])
+            self.assertGreaterEqual(count, truth[key])
+        untracked = [count for key, count in truth.items() if key not in tracker.counters]
+        self.assertLessEqual(max(untracked), tracker.threshold())
+
+    def test_cache(self):
+        cache = LRU(100)
+        self.assertRaises(RuntimeError, cache.top_keys)
+        cache.track_hot_keys(capacity=16, window_sec=60)
+        for i in range(1000):
+            cache.get(i % 10 if i % 2 else "hot")
+            cache.put(i, i)
+        key, count, _ = cache.top_keys(1)[0]
+        self.assertEqual((key, count), ("hot", 500.0))
+
+        # the counts of old windows decay
+        cache.hot_keys.window_end = time.monotonic()
+        self.assertEqual(cache.top_keys(1)[0][:2], ("hot", 250.0))
+
+        cache.untrack_hot_keys()
+        self.assertNotIn("get", cache.__dict__)
+        self.assertRaises(RuntimeError, cache.top_keys)
+
+        cache.track_hot_keys(sample_rate=0.1, window_sec=None)
+        for i in range(20000):
+            cache.get("hot" if i % 2 else i)
+        key, count, _ = cache.top_keys(1)[0]
+        self.assertEqual(key, "hot")
+        self.assertAlmostEqual(count, 10000, delta=1500)
+
+
+class TestWarmup(unittest.TestCase):
+    def test_hot_keys(self):
+        cache = LRU(10)
+        for i in range(20):
+            cache.put(i, i)
+        cache.get(12)
+        self.assertEqual(cache.keys_by_hotness()[:3], [12, 19, 18])
+
+        cache = Clock(10)
+        for i in range(10):
+            cache.put(i, i)
+        cache.get(7)
+        self.assertEqual(cache.keys_by_hotness()[0], 7)
+
+        cache = S3FIFO(100)
+        for i in range(100):
+            cache.put(i, i)
+        for _ in range(3):
+            cache.get(42)
+        cache.put(100, 100)
+        cache.delete(5)
+        keys = cache.keys_by_hotness()
+        self.assertEqual(keys[0], 42)
+        # 0 was evicted to the ghost queue
+        self.assertEqual(sorted(keys), [k for k in range(1, 101) if k != 5])
+
+    def test_persist_and_preload(self):
+        import tempfile
+        import threading
+
+        path = os.path.join(tempfile.mkdtemp(), "hot_keys")
+        self.assertEqual(load_hot_keys(path), [])
+
+        cache = LRU(100)
+        for i in range(100):
+            cache.put(i, i)
+        persister = HotKeyPersister(cache, path, interval_sec=60, max_keys=20).start()
+        persister.stop()
+        self.assertEqual(load_hot_keys(path), list(range(99, 79, -1)))
+
+        def loader(key):
+            if key == 90:
+                raise RuntimeError("origin down")
+            return key * 2
+
+        cache = LRU(100)
+        cache.put(95, "fresh")
+        start_time = time.time()
+        stats = warm_up(cache, path, loader, max_workers=2, max_per_sec=200)
+        self.assertGreaterEqual(time.time() - start_time, 19 / 200 * 0.9)
+        self.assertEqual(stats, {"n_load": 20, "n_insert": 18, "n_skip": 1, "n_error": 1})
+        # the hottest key was inserted last
+        self.assertEqual(cache.keys_by_hotness()[:2], [99, 98])
+        self.assertEqual(cache.keys_by_hotness()[-1], 95)
+        self.assertEqual(cache.get(95), "fresh")
+        self.assertEqual(cache.get(99), 198)
+        self.assertNotIn(90, cache)
+
+        # a background preload of a serving cache takes its lock
+        lock = threading.Lock()
+        cache = LRU(100)
+        preloader = Preloader(cache, loader, lock=lock).start(list(range(50)), max_keys=10)
+        preloader.wait()
+        self.assertEqual(len(cache), 10)
+
+        # the hottest key of a batch is the last one of the batch evicted
+        for cache_type in [FIFO, LRU]:
+            cache = cache_type(100)
+            Preloader(cache, lambda key: key, batch_size=10).run(list(range(100)))
+            cache.put("new", 0)
+            self.assertIn(0, cache)
+            self.assertNotIn(9, cache)
+
+        # the cache fills while a rate-limited preload runs
+        cache = LRU(100)
+        preloader = Preloader(cache, loader, max_per_sec=200, lock=lock, batch_size=10).start(list(range(100)))
+        time.sleep(0.25)
+        with lock:
+            self.assertGreater(len(cache), 0)
+            self.assertLess(len(cache), 99)
+        preloader.wait()
+        self.assertEqual(len(cache), 99)
+
+    def test_persist_under_traffic(self):
+        import tempfile
+        import threading
+
+        path = os.path.join(tempfile.mkdtemp(), "hot_keys")
+        lock = threading.Lock()
+        cache = S3FIFO(1000)
+        persister = HotKeyPersister(cache, path, interval_sec=0.001, lock=lock).start()
+        random.seed(0)
+        for _ in range(50000):
+            key = int(random.paretovariate(0.5))
+            with lock:
+                if cache.get(key) is None:
+                    cache.put(key, key)
+        persister.stop()
+        self.assertGreater(persister.n_save, 1)
+        self.assertEqual(persister.n_error, 0)
+        self.assertEqual(sorted(load_hot_keys(path)), sorted(cache.keys_by_hotness()))
+
+
+class TestKeyDigests(unittest.TestCase):
+    def test_key_builder(self):
+        import array
+
+        builder = KeyBuilder(digest_threshold=8)
+        self.assertEqual(builder.make_key((1, "a", None), {"b": 2.0}), ((1, "a", None), (("b", 2.0),)))
+
+        big = b"x" * 100
+        key = builder.arg_key(big)
+        self.assertEqual(len(key[-1]), 16)
+        self.assertEqual(key, builder.arg_key(bytearray(big)))
+        self.assertEqual(key, builder.arg_key(memoryview(big)))
+        self.assertNotEqual(key, builder.arg_key(b"y" * 100))
+        self.assertNotEqual(
+            builder.arg_key(array.array("i", [1, 2])), builder.arg_key(array.array("h", [1, 0, 2, 0]))
+        )
+        # a non-contiguous view
+        self.assertEqual(builder.arg_key(memoryview(b"abcdef")[::2])[-1], builder.arg_key(memoryview(b"ace"))[-1])
+        self.assertEqual(builder.arg_key(("x" * 20, [1, {"k": bytearray(b"v")}]))[0], ("str", builder.arg_key("x" * 20)[1]))
+        # the insertion order of a dict is not part of its key
+        self.assertEqual(builder.arg_key({"a": 1, "b": [2]}), builder.arg_key({"b": [2], "a": 1}))
+        self.assertEqual(builder.arg_key({1: "x", "a": 2}), builder.arg_key({"a": 2, 1: "x"}))
+        self.assertNotEqual(builder.arg_key({"a": 1}), builder.arg_key({"a": 2}))
+
+        class Point(object):
+            def __init__(self, x):
+                self.x = x
+
+            __hash__ = None
+
+        self.assertRaises(TypeError, builder.arg_key, Point(1))
+        register_key_function(Point, lambda point: ("Point", point.x))
+        self.assertEqual(builder.arg_key(Point(1)), ("Point", 1))
+
+    def test_decorator(self):
+        calls = []
+
+        @cacheDecorator(100, eviction="LRU", digest_memo_size=16)
+        def checksum(data, scale=1):
+            calls.append(1)
+            return sum(data) * scale
+
+        data = bytes(range(256)) * 64
+        self.assertEqual(checksum(data), checksum(bytearray(data)))
+        self.assertEqual(checksum(data, scale=2), 2 * sum(data))
+        self.assertEqual(len(calls), 2)
+        # the table keeps a 16-byte digest instead of the 16 KB argument
+        for args, _ in checksum.cache.keys():
+            self.assertLess(len(args[0][-1]), 100)
+        self.assertGreater(checksum.decorator.key_builder.n_memo_hit, 0)
+
+
+class TestSerialization(unittest.TestCase):
+    def test_serializers(self):
+        import pickle
+        from cache.serialization import SERIALIZERS, dumps, loads
+
+        value = {"id": 7, "blob": pickle.PickleBuffer(bytearray(b"x" * 1000))}
+        frames = SERIALIZERS["pickle"][0](value)
+        # the buffer is a frame of its own, not copied into the pickle stream
+        self.assertTrue(any(isinstance(frame, memoryview) and frame.nbytes == 1000 for frame in frames))
+        decoded = loads(b"".join(frames), "pickle")
+        self.assertEqual(decoded["id"], 7)
+        self.assertEqual(bytes(decoded["blob"]), b"x" * 1000)
+
+        self.assertEqual(loads(dumps(b"abc")), b"abc")
+        self.assertEqual(loads(dumps([1, "a", None])), [1, "a", None])
+        self.assertEqual(dumps(b"abc", "raw"), b"abc")
+        self.assertRaises(TypeError, dumps, "abc", "raw")
+
+        register_serializer("upper", lambda s: [s.upper().encode()], lambda data: bytes(data).decode())
+        self.assertEqual(loads(dumps("abc", "upper"), "upper"), "ABC")
+
+    def test_shared_memory(self):
+        import array
+        import pickle
+
+        cache = SharedMemoryCache(4, item_size=256, serializer="pickle")
+        try:
+            cache.put("a", {"x": [1, 2]})
+            self.assertEqual(cache.get("a"), {"x": [1, 2]})
+            cache.put("b", pickle.PickleBuffer(bytearray(range(100))))
+            blob = cache.get("b")
+            self.assertEqual(bytes(blob), bytes(range(100)))
+            self.assertFalse(blob.readonly)
+            self.assertRaises(ValueError, cache.put, "big", b"x" * 256)
+        finally:
+            cache.close()
+            cache.unlink()
+
+        # a legacy (dumps, loads) pair and raw views of other formats
+        cache = SharedMemoryCache(4, item_size=64, serializer=(str.encode, bytes.decode))
+        try:
+            cache.put("s", "text")
+            self.assertEqual(cache.get("s"), "text")
+        finally:
+            cache.close()
+            cache.unlink()
+        cache = SharedMemoryCache(4, item_size=64)
+        try:
+            cache.put("d", memoryview(array.array("d", [1.0, 2.0])))
+            self.assertEqual(cache.get("d"), array.array("d", [1.0, 2.0]).tobytes())
+        finally:
+            cache.close()
+            cache.unlink()
+        # raw reads the value out of the segment once, as bytes
+        cache = SharedMemoryCache(4, item_size=64, serializer="raw")
+        try:
+            cache.put("b", bytearray(b"abc"))
+            self.assertIs(cache._copy, bytes)
+            self.assertEqual(type(cache.get("b")), bytes)
+        finally:
+            cache.close()
+            cache.unlink()
+
+
+class TestMemcachedServer(unittest.TestCase):
+    def test_pipelined_commands(self):
+        import asyncio
+        import socket
+        import tempfile
+        import threading
+        from server.memcached import MemcachedServer
+
+        path = os.path.join(tempfile.mkdtemp(), "test.sock")
+        server = MemcachedServer(LRU(100), unix_path=path)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(server.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        sock.sendall(
+            b"set a 5 0 3\r\nabc\r\nset b 0 0 2 noreply\r\nxy\r\n"
+            b"get a b c\r\ngets a\r\ntouch a 100\r\ntouch a soon\r\ndelete b\r\ndelete b\r\n"
+            b"add a 0 0 1\r\nz\r\nbogus\r\nquit\r\n"
+        )
+        resp = b""
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            resp += data
+        sock.close()
+
+        self.assertEqual(
+            resp,
+            b"STORED\r\nVALUE a 5 3\r\nabc\r\nVALUE b 0 2\r\nxy\r\nEND\r\n"
+            b"VALUE a 5 3 1\r\nabc\r\nEND\r\nTOUCHED\r\nCLIENT_ERROR bad command line format\r\n"
+            b"DELETED\r\nNOT_FOUND\r\n"
+            b"NOT_STORED\r\nERROR\r\n",
+        )
+        stats = server.stats()
+        self.assertEqual((stats["get_hits"], stats["get_misses"]), (3, 1))
+        self.assertEqual(stats["total_connections"], 1)
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    def test_delete_evicted(self):
+        from server.memcached import MemcachedServer
+
+        server = MemcachedServer(S3FIFO(100))
+        for i in range(200):
+            server.handle_store(b"set", [b"set", b"%d" % i, b"0", b"0", b"1"], b"x")
+        # 10 was evicted, S3FIFO keeps it as a ghost entry
+        self.assertIn(b"10", server.cache.table)
+        self.assertEqual(server.cache.table[b"10"].freq, -1)
+        self.assertEqual(server.handle_command(b"delete", [b"delete", b"10"]), b"NOT_FOUND\r\n")
+        self.assertEqual(server.handle_command(b"delete", [b"delete", b"199"]), b"DELETED\r\n")
+
+    def test_flush_all(self):
+        from server.memcached import MemcachedServer
+
+        for cache_type in [FIFO, LRU, Clock, S3FIFO]:
+            server = MemcachedServer(cache_type(100))
+            for i in range(120):
+                server.handle_store(b"set", [b"set", b"%d" % i, b"0", b"0", b"1"], b"x")
+            self.assertEqual(server.handle_command(b"flush_all", [b"flush_all"]), b"OK\r\n")
+            self.assertEqual(server.handle_command(b"get", [b"get", b"119"]), b"END\r\n")
+            # the policy queues are empty too, the next sets evict normally
+            for i in range(200):
+                server.handle_store(b"set", [b"set", b"k%d" % i, b"0", b"0", b"1"], b"x")
+            self.assertEqual(server.cache._n_object(), 100, cache_type.__name__)
+            self.assertEqual(server.handle_command(b"get", [b"get", b"k199"]), b"VALUE k199 0 1\r\nx\r\nEND\r\n")
+
+
 @cacheDecorator(100, eviction="LRU")
 def square(x):
     return x * x
@@ -158,7 +1440,7 @@ if __name__ == "__main__":
     random.seed()
 
     cache_size = 20
-    for cache_type in [FIFO, LRU, Clock, S3FIFO]:
+    for cache_type in [FIFO, LRU, FastFIFO, FastLRU, Clock, S3FIFO]:
         # for cache_type in [S3FIFO]:
         print("Testing {}".format(cache_type.__name__))
         test_cache_basic(cache_type(cache_size), cache_size)